@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 
     # Local apps
     "pricing",
+    "task_manager",
 
 ]
 
@@ -151,16 +152,98 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:6379/0"
 CELERY_RESULT_BACKEND = f"redis://{REDIS_HOST}:6379/1"
+# Redis for task status events (pub/sub + latest state); empty disables them
+TASK_EVENTS_REDIS_URL = os.getenv(
+    "TASK_EVENTS_REDIS_URL", f"redis://{REDIS_HOST}:6379/2")
+# Redis for single-flight locks of ETL triggers; empty disables coalescing
+TASK_LOCKS_REDIS_URL = os.getenv(
+    "TASK_LOCKS_REDIS_URL", f"redis://{REDIS_HOST}:6379/3")
+# Redis for cached product_pricing_features reads; empty disables the cache
+FEATURES_CACHE_REDIS_URL = os.getenv(
+    "FEATURES_CACHE_REDIS_URL", f"redis://{REDIS_HOST}:6379/4")
 CELERY_TIMEZONE = "Europe/Berlin"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 60 * 60  # 1 hour safety for learning
 
+# One queue per workload class, each served by its own worker (see
+# docker-compose.yml), so long ETL runs and short interactive tasks never
+# wait behind each other. Unrouted tasks (housekeeping) go to "celery".
+CELERY_TASK_ROUTES = {
+    "pricing.tasks.test_task": {"queue": "interactive"},
+    "pricing.tasks.nightly_product_etl": {"queue": "etl"},
+    "pricing.tasks.background_product_etl": {"queue": "etl"},
+    "pricing.tasks.partitioned_product_etl": {"queue": "etl"},
+    "pricing.tasks.product_etl_partition": {"queue": "etl"},
+    "pricing.tasks.finalize_partitioned_product_etl": {"queue": "etl"},
+    "pricing.tasks.refresh_competitor_index_job": {"queue": "etl"},
+    "pricing.tasks.refresh_aggregates_job": {"queue": "etl"},
+    "pricing.tasks.detect_price_anomalies_job": {"queue": "ml"},
+}
+# Long tasks: a worker reserves one task at a time, so a queued run is not
+# stuck behind a busy process while another worker idles. The interactive
+# worker overrides this with --prefetch-multiplier.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Admission control of the enqueue endpoints (task_manager.admission): a
+# queue holding max_depth waiting tasks rejects new ones with 429, asking to
+# retry after seconds_per_task per task that has to drain first
+TASK_QUEUE_ADMISSION = {
+    "etl": {"max_depth": int(os.getenv("ETL_QUEUE_MAX_DEPTH", 10)),
+            "seconds_per_task": 60},
+    "ml": {"max_depth": int(os.getenv("ML_QUEUE_MAX_DEPTH", 5)),
+           "seconds_per_task": 120},
+    "interactive": {"max_depth": int(os.getenv("INTERACTIVE_QUEUE_MAX_DEPTH", 100)),
+                    "seconds_per_task": 2},
+}
+# Longest test_task a client may start, in seconds
+MAX_TEST_TASK_DURATION = 300
+
 CELERY_BEAT_SCHEDULE = {
     "nightly_product_etl": {
         "task": "pricing.tasks.nightly_product_etl",
         # "schedule": crontab(hour=2, minute=0),  # 02:00 Berlin time
         "schedule": crontab(minute="*/1"),  # every 1 minute for testing
-    }
+    },
+    # Incremental runs miss prices corrected in place or deleted in the
+    # source (see etl.daily_prices_query); a weekly rebuild reconciles them.
+    "weekly_product_etl_full": {
+        "task": "pricing.tasks.nightly_product_etl",
+        "schedule": crontab(day_of_week="sun", hour=1, minute=0),
+        "kwargs": {"mode": "FULL", "skip_unchanged": False},
+    },
+    "nightly_price_anomalies": {
+        "task": "pricing.tasks.detect_price_anomalies_job",
+        "schedule": crontab(hour=3, minute=0),  # full history
+    },
+    "hourly_price_anomalies": {
+        "task": "pricing.tasks.detect_price_anomalies_job",
+        "schedule": crontab(minute=15),  # last day only
+        "kwargs": {"days": 1},
+    },
+    "nightly_aggregates": {
+        "task": "pricing.tasks.refresh_aggregates_job",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    "hourly_competitor_index": {
+        "task": "pricing.tasks.refresh_competitor_index_job",
+        "schedule": crontab(minute=45),  # only the days touched since last run
+    },
+    "job_stats_rollup": {
+        "task": "pricing.tasks.rollup_job_stats",
+        "schedule": crontab(minute="*/5"),  # buckets touched since last run
+    },
+    "job_history_retention": {
+        "task": "pricing.tasks.purge_job_history",
+        "schedule": crontab(hour=4, minute=0),
+    },
+}
+
+# Days of JobRun and task run history kept per job type ("default": all
+# others). Older runs are rolled up into JobRunSummary and deleted by
+# purge_job_history.
+JOB_RETENTION_DAYS = {
+    "default": int(os.getenv("JOB_RETENTION_DAYS", 90)),
+    "JOB_NIGHTLY_ETL": int(os.getenv("JOB_RETENTION_DAYS_NIGHTLY_ETL", 14)),
 }
 
 
@@ -9,3 +9,10 @@ DATABASES = {
 
 # Use in-memory email backend for tests
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# No Redis in tests; the tests of the Redis features patch the clients
+TASK_EVENTS_REDIS_URL = ""
+TASK_LOCKS_REDIS_URL = ""
+FEATURES_CACHE_REDIS_URL = ""
+# No broker in tests; admission tests set their own limits
+TASK_QUEUE_ADMISSION = {}
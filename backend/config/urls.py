@@ -20,5 +20,6 @@ from django.urls import include, path
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('pricing.urls')),
+    path('api/', include('task_manager.urls')),
     path('', include('testing.urls')),
 ]
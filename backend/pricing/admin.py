@@ -1,12 +1,51 @@
 from django.contrib import admin
-from .models import JobRun
+from .models import JobRun, JobRunSummary, JobStage, JobStats, SourceWatermark
 
 # Register your models here.
 
 
+class JobStageInline(admin.TabularInline):
+    model = JobStage
+    fields = ('name', 'calls', 'wall_seconds', 'cpu_seconds', 'rows_in',
+              'rows_out', 'bytes_out', 'memory_growth_bytes')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(JobRun)
 class JobRunAdmin(admin.ModelAdmin):
     list_display = ('id', 'job_type', 'job_status',
-                    'started_at', 'finished_at', 'rows_processed')
-    list_filter = ('job_type', 'job_status', 'started_at', 'finished_at')
+                    'started_at', 'finished_at', 'rows_processed',
+                    'rows_per_second', 'cache_hits', 'cache_misses',
+                    'parent', 'partition')
+    list_filter = ('job_type', 'job_status', 'mode',
+                   'started_at', 'finished_at')
     search_fields = ('celery_task_id', 'error_message')
+    inlines = [JobStageInline]
+
+
+@admin.register(JobStats)
+class JobStatsAdmin(admin.ModelAdmin):
+    list_display = ('bucket_start', 'granularity', 'job_type', 'runs',
+                    'failures', 'duration_p50', 'duration_p95',
+                    'duration_p99', 'rows_per_second', 'queue_wait_avg')
+    list_filter = ('granularity', 'job_type')
+
+
+@admin.register(JobRunSummary)
+class JobRunSummaryAdmin(admin.ModelAdmin):
+    list_display = ('day', 'source', 'job_type', 'job_status', 'runs',
+                    'rows_processed', 'duration_seconds')
+    list_filter = ('source', 'job_type', 'job_status')
+    date_hierarchy = 'day'
+
+
+@admin.register(SourceWatermark)
+class SourceWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('pipeline', 'table_name', 'column_name', 'value',
+                    'job_run', 'updated_at')
+    list_filter = ('pipeline',)
@@ -0,0 +1,218 @@
+"""
+Declarative aggregations over source tables, executed in MySQL or in pandas.
+
+An Aggregation is declared once (source table, group keys, measures) and can
+be executed either
+
+- pushed down: a ``GROUP BY`` runs in the source DB and only the aggregated
+  rows cross the network, or
+- in Python: the raw rows are streamed in key order and every chunk is
+  aggregated with a vectorized ``groupby``; the rows of the last, possibly
+  incomplete group of a chunk are carried over (see ``etl.complete_groups``),
+  so any pandas reduction, e.g. the median, is supported.
+
+Both produce the same rows. ``choose_execution`` picks one per run from the
+source's row count estimate: above PUSHDOWN_MIN_ROWS shipping the raw rows
+costs more than the aggregate query, below it pulling a few rows keeps the
+load off the source DB. Measures MySQL cannot compute force Python.
+
+Usage:
+    materialize(DAILY_PRICE_STATS)                   # execution="auto"
+    materialize(COMPETITOR_MIN_PRICES, execution="pushdown")
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+from sqlalchemy import Column, Date, Float, Integer, MetaData, String, Table, text
+
+from .db import source_engine
+from .etl import DEFAULT_CHUNK_SIZE, EtlStats, complete_groups, extract_chunks
+from .loaders import bulk_load, create_staging_table, drop_staging_table, swap_in
+
+EXECUTIONS = ("auto", "pushdown", "python")
+
+# Source rows from which an aggregation is pushed down to the source DB
+PUSHDOWN_MIN_ROWS = int(os.getenv("ETL_PUSHDOWN_MIN_ROWS", 200_000))
+
+# pandas reduction -> SQL aggregate function (None: not available in MySQL)
+SQL_FUNCTIONS = {
+    "sum": "SUM",
+    "count": "COUNT",
+    "min": "MIN",
+    "max": "MAX",
+    "mean": "AVG",
+    "median": None,
+}
+
+metadata = MetaData()
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    """
+    A GROUP BY over one source table, materialized into the analytics table
+    ``name``.
+
+    ``keys`` maps the group columns to their SQLAlchemy types (they form the
+    primary key of the output table), ``measures`` maps output columns to
+    ``(source column, reduction)`` with reductions from SQL_FUNCTIONS, and
+    ``where`` is an optional SQL filter applied before grouping.
+    """
+
+    name: str
+    source: str
+    keys: dict
+    measures: dict
+    where: Optional[str] = None
+    table: Table = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        unknown = {func for _, func in self.measures.values()} - set(SQL_FUNCTIONS)
+        if unknown:
+            raise ValueError(f"Unknown reductions {sorted(unknown)} in {self.name}")
+
+        columns = [Column(key, type_, primary_key=True) for key, type_ in self.keys.items()]
+        columns += [Column(name, Integer if func == "count" else Float)
+                    for name, (_, func) in self.measures.items()]
+        object.__setattr__(self, "table", Table(self.name, metadata, *columns))
+
+    @property
+    def can_push_down(self) -> bool:
+        return all(SQL_FUNCTIONS[func] for _, func in self.measures.values())
+
+    def _where(self) -> str:
+        return f" WHERE {self.where}" if self.where else ""
+
+    def pushdown_query(self):
+        keys = ", ".join(self.keys)
+        measures = ", ".join(f"{SQL_FUNCTIONS[func]}({column}) AS {name}"
+                             for name, (column, func) in self.measures.items())
+        return text(f"SELECT {keys}, {measures} FROM {self.source}{self._where()}"
+                    f" GROUP BY {keys}")
+
+    def raw_query(self):
+        columns = list(self.keys) + sorted({column for column, _ in self.measures.values()})
+        return text(f"SELECT {', '.join(columns)} FROM {self.source}{self._where()}"
+                    f" ORDER BY {', '.join(self.keys)}")
+
+
+DAILY_PRICE_STATS = Aggregation(
+    name="daily_price_stats",
+    source="daily_prices",
+    keys={"dt": Date, "sales_org_id": Integer, "material_id": Integer},
+    measures={
+        "avg_price": ("net_price", "mean"),
+        "min_price": ("net_price", "min"),
+        "max_price": ("net_price", "max"),
+        "n_prices": ("net_price", "count"),
+    },
+)
+
+COMPETITOR_MIN_PRICES = Aggregation(
+    name="competitor_min_prices",
+    source="competitor_prices",
+    keys={"dt": Date, "sku": String(20)},
+    measures={
+        "comp_min": ("comp_price", "min"),
+        "comp_count": ("comp_price", "count"),
+    },
+    where="availability = 'IN_STOCK'",
+)
+
+AGGREGATIONS = {agg.name: agg for agg in (DAILY_PRICE_STATS, COMPETITOR_MIN_PRICES)}
+
+
+def estimate_rows(table: str, engine=None) -> int:
+    """
+    Estimated row count of a source table.
+
+    On MySQL this is InnoDB's statistics estimate from information_schema,
+    which is free; other dialects count the rows.
+    """
+    engine = engine or source_engine
+    with engine.connect() as conn:
+        if conn.dialect.name == "mysql":
+            rows = conn.execute(text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES"
+                " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ), {"table": table}).scalar()
+        else:
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    return int(rows or 0)
+
+
+def choose_execution(agg: Aggregation, execution: str = "auto", engine=None) -> str:
+    """Resolve ``execution`` ("auto", "pushdown" or "python") for ``agg``."""
+    if execution not in EXECUTIONS:
+        raise ValueError(f"execution must be one of {EXECUTIONS}, got {execution!r}")
+    if execution == "pushdown" and not agg.can_push_down:
+        raise ValueError(f"{agg.name} has measures the source DB cannot compute")
+    if execution != "auto":
+        return execution
+    if not agg.can_push_down:
+        return "python"
+    return "pushdown" if estimate_rows(agg.source, engine) >= PUSHDOWN_MIN_ROWS else "python"
+
+
+def _normalize(df: pd.DataFrame, agg: Aggregation) -> pd.DataFrame:
+    # SQL returns DECIMAL for AVG/MIN/... of DECIMAL columns, pandas float
+    for name, (_, func) in agg.measures.items():
+        df[name] = df[name].astype("int64" if func == "count" else float)
+    return df[list(agg.keys) + list(agg.measures)]
+
+
+def aggregate_chunks(agg: Aggregation, execution: str,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     engine=None) -> Iterator[pd.DataFrame]:
+    """Yield the aggregated rows of ``agg`` in chunks, computed as ``execution`` says."""
+    if execution == "pushdown":
+        for chunk in extract_chunks(agg.pushdown_query(), chunk_size, engine):
+            yield _normalize(chunk, agg)
+        return
+
+    keys = list(agg.keys)
+    chunks = extract_chunks(agg.raw_query(), chunk_size, engine)
+    for chunk in complete_groups(chunks, keys):
+        for column, _ in agg.measures.values():
+            chunk[column] = chunk[column].astype(float)
+        grouped = chunk.groupby(keys, sort=False).agg(**agg.measures).reset_index()
+        yield _normalize(grouped, agg)
+
+
+def materialize(agg: Aggregation, execution: str = "auto",
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                on_chunk: Optional[Callable[[EtlStats], None]] = None):
+    """
+    Rebuild the analytics table of ``agg`` (staging table + swap).
+
+    Returns:
+        ``(execution, stats)``: the execution used and stats over the
+        aggregated rows written
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    execution = choose_execution(agg, execution)
+    stats = EtlStats()
+    started = time.perf_counter()
+
+    staging = create_staging_table(agg.table)
+    try:
+        for chunk in aggregate_chunks(agg, execution, chunk_size):
+            bulk_load(chunk, staging)
+            stats.rows += len(chunk)
+            stats.chunks += 1
+            stats.seconds = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(stats)
+        swap_in(agg.table, staging)
+    except Exception:
+        drop_staging_table(staging)
+        raise
+
+    stats.seconds = time.perf_counter() - started
+    return execution, stats
@@ -0,0 +1,197 @@
+"""
+Vectorized price anomaly detection over ``daily_prices``.
+
+Every price series (material x sales org x customer) is scored against a
+rolling robust baseline of its own previous observations: the rolling
+median, and the rolling median absolute deviation (MAD) from it. The robust
+z-score ``(price - median) / (1.4826 * MAD)`` flags spikes and too-low
+prices without letting the outliers themselves distort the baseline.
+
+All series are scored in one grouped pass (``groupby().rolling()`` runs a
+single Cython loop over all groups), so the cost is linear in the number of
+rows. Prices are streamed from the source sorted by series and date; the
+rows of the last, possibly incomplete series of a chunk are carried over to
+the next one, so each series is always scored as a whole.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Date, Float, Integer, MetaData, String, Table, text
+
+from .etl import DEFAULT_CHUNK_SIZE, EtlStats, complete_groups, extract_chunks
+from .loaders import (
+    bulk_load, create_staging_table, drop_staging_table, ensure_table,
+    replace_range, swap_in,
+)
+
+ANOMALIES_TABLE = "pricing_anomalies"
+SERIES_KEYS = ["material_id", "sales_org_id", "customer_id"]
+
+WINDOW = 14          # previous observations in the baseline
+MIN_PERIODS = 4      # observations needed before a row is scored
+Z_THRESHOLD = 3.5    # |robust z| above which a price is flagged
+MAD_SCALE = 1.4826   # makes the MAD consistent with the standard deviation
+# Floor of the scale as a fraction of the baseline, so perfectly flat series
+# (MAD = 0) don't flag every cent of change
+MIN_RELATIVE_SCALE = 0.005
+
+ANOMALY_PRICES_QUERY = """
+    SELECT dp.dt, dp.sales_org_id, dp.customer_id, dp.material_id,
+           m.sku, dp.net_price AS price
+    FROM daily_prices dp
+    JOIN materials m ON m.material_id = dp.material_id
+    {where}
+    ORDER BY dp.material_id, dp.sales_org_id, dp.customer_id, dp.dt
+"""
+
+metadata = MetaData()
+
+anomalies_table = Table(
+    ANOMALIES_TABLE,
+    metadata,
+    Column("dt", Date, primary_key=True),
+    Column("sales_org_id", Integer, primary_key=True),
+    Column("customer_id", Integer, primary_key=True),
+    Column("material_id", Integer, primary_key=True),
+    Column("sku", String(20)),
+    Column("price", Float),
+    Column("baseline_price", Float),
+    Column("robust_z", Float),
+    Column("reason", String(32)),
+)
+
+
+@dataclass
+class AnomalyStats(EtlStats):
+    """EtlStats over the scored rows, plus the number of rows flagged."""
+
+    flagged: int = 0
+
+
+def _rolling_previous(values: pd.Series, series: np.ndarray, window: int,
+                      min_periods: int) -> np.ndarray:
+    """Rolling median over the previous ``window`` values of each series."""
+    previous = values.groupby(series, sort=False).shift(1)
+    rolled = (previous.groupby(series, sort=False)
+              .rolling(window, min_periods=min_periods).median())
+    # drop the group level and restore the row order
+    return rolled.droplevel(0).reindex(values.index).to_numpy()
+
+
+def score_prices(df: pd.DataFrame, window: int = WINDOW,
+                 min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """
+    Add baseline_price, mad and robust_z to ``df``.
+
+    ``df`` must hold complete series (SERIES_KEYS) sorted by date within each
+    series. Rows without enough history get NaN scores.
+    """
+    # one integer code per series, so the grouped passes hash a single key
+    series = df.groupby(SERIES_KEYS, sort=False).ngroup().to_numpy()
+    price = df["price"].astype(float)
+
+    baseline = _rolling_previous(price, series, window, min_periods)
+    deviation = pd.Series(np.abs(price.to_numpy() - baseline), index=df.index)
+    mad = _rolling_previous(deviation, series, window, min_periods)
+
+    scale = np.maximum(MAD_SCALE * mad, MIN_RELATIVE_SCALE * np.abs(baseline))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        robust_z = (price.to_numpy() - baseline) / scale
+
+    df["price"] = price
+    df["baseline_price"] = baseline
+    df["mad"] = mad
+    df["robust_z"] = robust_z
+    return df
+
+
+def flag_anomalies(scored: pd.DataFrame,
+                   threshold: float = Z_THRESHOLD) -> pd.DataFrame:
+    """Return the scored rows beyond ``threshold`` with a PRICE_SPIKE/PRICE_DROP reason."""
+    flagged = scored[np.abs(scored["robust_z"]) > threshold].copy()
+    flagged["reason"] = np.where(
+        flagged["robust_z"] > 0, "PRICE_SPIKE", "PRICE_DROP")
+    return flagged
+
+
+def complete_series(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Regroup chunks sorted by SERIES_KEYS so no series spans two chunks."""
+    return complete_groups(chunks, SERIES_KEYS)
+
+
+def detect_price_anomalies(days: Optional[int] = None,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           on_chunk: Optional[Callable[[EtlStats], None]] = None,
+                           window: int = WINDOW,
+                           threshold: float = Z_THRESHOLD) -> AnomalyStats:
+    """
+    Score daily prices and publish the flagged rows to ``pricing_anomalies``.
+
+    Args:
+        days: Only re-score the last ``days`` days (intra-day incremental
+            runs); ``2 * window`` extra days of history are read, as the
+            MAD of a row needs the baselines of its ``window`` predecessors.
+            None scores the full history and swaps in a rebuilt table.
+        chunk_size: Source rows per streamed chunk
+        on_chunk: Optional progress callback, invoked with running stats
+        window: Previous observations in the rolling baseline
+        threshold: |robust z| above which a price is flagged
+
+    Returns:
+        Stats over the scored rows
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    if days is not None and days < 1:
+        raise ValueError("days must be a positive integer")
+
+    stats = AnomalyStats()
+    started = time.perf_counter()
+
+    if days is None:
+        query, params, since = text(ANOMALY_PRICES_QUERY.format(where="")), None, None
+        target = create_staging_table(anomalies_table)
+    else:
+        since = date.today() - timedelta(days=days)
+        query = text(ANOMALY_PRICES_QUERY.format(where="WHERE dp.dt >= :lookback_from"))
+        lookback_from = since - timedelta(days=2 * window)
+        params = {"lookback_from": lookback_from.isoformat()}
+        ensure_table(anomalies_table)
+
+    flagged_parts = []
+    try:
+        for series in complete_series(extract_chunks(query, chunk_size, params=params)):
+            flagged = flag_anomalies(score_prices(series, window), threshold)
+            if since is not None:
+                # lookback rows only serve as baseline
+                flagged = flagged[flagged["dt"] >= pd.Timestamp(since)]
+                flagged_parts.append(flagged)
+            else:
+                bulk_load(flagged, target)
+            stats.flagged += len(flagged)
+
+            stats.rows += len(series)
+            stats.chunks += 1
+            stats.seconds = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(stats)
+
+        if since is None:
+            swap_in(anomalies_table, target)
+        else:
+            # anomalies are rare; the window's flags are published at once
+            flagged = (pd.concat(flagged_parts, ignore_index=True)
+                       if flagged_parts else pd.DataFrame(columns=["dt"]))
+            replace_range(flagged, anomalies_table, "dt", since)
+    except Exception:
+        if since is None:
+            drop_staging_table(target)
+        raise
+
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PricingConfig(AppConfig):
     name = 'pricing'
+
+    def ready(self):
+        # Connects the handlers recording JobRun.enqueued_at
+        from . import job_stats  # noqa: F401
@@ -0,0 +1,220 @@
+"""
+Materialized competitor price index.
+
+One row per sku and day with the min / median / max price of the competitors
+that had the sku in stock, and the divergence of our own (average) price
+from them. Divergence questions are then answered from this small table with
+a primary-key range scan on (sku, dt) instead of joining and aggregating
+``competitor_prices`` and ``daily_prices`` on every request.
+
+A FULL refresh rebuilds the table in a staging copy that is swapped in; an
+INCREMENTAL refresh recomputes only the days from LOOKBACK_DAYS before the
+last loaded day of the sources (their ``dt`` high-water marks) on and
+replaces those days. The look-back picks up prices that arrive late for the
+days just before the marks; rows backfilled for older days only reach the
+index with the next FULL refresh.
+"""
+
+import os
+import time
+from datetime import date, timedelta
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+from sqlalchemy import Column, Date, Float, Integer, MetaData, String, Table, select, text
+
+from .db import analytics_engine, source_engine
+from .etl import DEFAULT_CHUNK_SIZE, EtlStats, complete_groups, extract_chunks
+from .loaders import (
+    bulk_load, create_staging_table, drop_staging_table, ensure_table,
+    replace_range, swap_in,
+)
+
+COMPETITOR_INDEX_TABLE = "competitor_price_index"
+COMPETITOR_INDEX_PIPELINE = COMPETITOR_INDEX_TABLE
+COMPETITOR_INDEX_SOURCES = ("competitor_prices", "daily_prices")
+
+IN_STOCK = "IN_STOCK"
+
+# Days before the high-water marks an incremental refresh recomputes, for
+# source rows that arrive late
+LOOKBACK_DAYS = int(os.getenv("COMPETITOR_INDEX_LOOKBACK_DAYS", 3))
+
+COMPETITOR_PRICES_QUERY = """
+    SELECT cp.dt, cp.sku, cp.comp_price
+    FROM competitor_prices cp
+    WHERE cp.availability = :in_stock
+    {since}
+    ORDER BY cp.dt, cp.sku
+"""
+
+# Our price per sku and day, averaged over sales orgs and customers
+OUR_PRICES_QUERY = text("""
+    SELECT dp.dt, m.sku, AVG(dp.net_price) AS our_price
+    FROM daily_prices dp
+    JOIN materials m ON m.material_id = dp.material_id
+    WHERE dp.dt >= :dt_from AND dp.dt <= :dt_to
+    GROUP BY dp.dt, m.sku
+""")
+
+metadata = MetaData()
+
+# (sku, dt) as primary key: a sku's date range is one contiguous index range
+competitor_index_table = Table(
+    COMPETITOR_INDEX_TABLE,
+    metadata,
+    Column("sku", String(20), primary_key=True),
+    Column("dt", Date, primary_key=True),
+    Column("comp_min", Float),
+    Column("comp_median", Float),
+    Column("comp_max", Float),
+    Column("comp_count", Integer),
+    Column("our_price", Float),
+    # (our_price - comp_median) / comp_median
+    Column("divergence_pct", Float),
+    # (our_price - comp_min) / comp_min
+    Column("gap_to_min_pct", Float),
+)
+
+
+def _our_prices(dt_from, dt_to, engine=None) -> pd.DataFrame:
+    engine = engine or source_engine
+    return pd.read_sql(
+        OUR_PRICES_QUERY, engine, parse_dates=["dt"],
+        params={"dt_from": dt_from.strftime("%Y-%m-%d"),
+                "dt_to": dt_to.strftime("%Y-%m-%d")},
+    )
+
+
+def incremental_since(marks: dict) -> str:
+    """First day (ISO) an incremental refresh recomputes, given the sources' dt marks."""
+    first = date.fromisoformat(min(marks.values())[:10])
+    return (first - timedelta(days=LOOKBACK_DAYS)).isoformat()
+
+
+def build_index(competitor_prices: pd.DataFrame,
+                our_prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate in-stock competitor prices per sku and day and compare them
+    with ``our_prices`` (dt, sku, our_price).
+    """
+    index = (competitor_prices
+             .groupby(["dt", "sku"], sort=False)["comp_price"]
+             .agg(comp_min="min", comp_median="median", comp_max="max",
+                  comp_count="count")
+             .reset_index())
+    index = index.merge(our_prices, on=["dt", "sku"], how="left")
+
+    our_price = index["our_price"].astype(float)
+    index["our_price"] = our_price
+    index["divergence_pct"] = (our_price - index["comp_median"]) / index["comp_median"]
+    index["gap_to_min_pct"] = (our_price - index["comp_min"]) / index["comp_min"]
+    return index
+
+
+def index_chunks(since: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield index rows computed from chunks of competitor prices.
+
+    Competitor prices are streamed in (dt, sku) order and regrouped so every
+    sku/day is aggregated as a whole; our prices are aggregated in the source
+    DB as the chunks reach new dates, so each day is queried once even when
+    its competitor prices span several chunks.
+    """
+    params = {"in_stock": IN_STOCK}
+    condition = ""
+    if since is not None:
+        condition = "AND cp.dt >= :since"
+        params["since"] = since
+    query = text(COMPETITOR_PRICES_QUERY.format(since=condition))
+
+    chunks = extract_chunks(query, chunk_size, params=params)
+    ours, fetched_to = None, None
+    for chunk in complete_groups(chunks, ["dt", "sku"]):
+        chunk["comp_price"] = chunk["comp_price"].astype(float)
+        dt_from, dt_to = chunk["dt"].min(), chunk["dt"].max()
+        if fetched_to is None or dt_to > fetched_to:
+            start = dt_from
+            if fetched_to is not None:
+                start = max(dt_from, fetched_to + pd.Timedelta(days=1))
+            new = _our_prices(start, dt_to)
+            # chunks come in dt order: earlier days are not needed again
+            ours = new if ours is None else pd.concat(
+                [ours[ours["dt"] >= dt_from], new], ignore_index=True)
+            fetched_to = dt_to
+        yield build_index(chunk, ours)
+
+
+def refresh_competitor_index(since: Optional[str] = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             on_chunk: Optional[Callable[[EtlStats], None]] = None
+                             ) -> EtlStats:
+    """
+    Refresh ``competitor_price_index``.
+
+    Args:
+        since: First day to recompute (ISO date); None rebuilds the whole
+            index and swaps it in
+        chunk_size: Competitor price rows per streamed chunk
+        on_chunk: Optional progress callback, invoked with running stats
+
+    Returns:
+        Stats over the index rows written
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    stats = EtlStats()
+    started = time.perf_counter()
+
+    if since is None:
+        target = create_staging_table(competitor_index_table)
+    else:
+        ensure_table(competitor_index_table)
+
+    parts = []
+    try:
+        for index in index_chunks(since, chunk_size):
+            if since is None:
+                bulk_load(index, target)
+            else:
+                parts.append(index)
+
+            stats.rows += len(index)
+            stats.chunks += 1
+            stats.seconds = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(stats)
+
+        if since is None:
+            swap_in(competitor_index_table, target)
+        else:
+            # one row per sku and recomputed day; replaced in one transaction
+            index = (pd.concat(parts, ignore_index=True)
+                     if parts else pd.DataFrame(columns=["dt"]))
+            replace_range(index, competitor_index_table, "dt",
+                          date.fromisoformat(since[:10]))
+    except Exception:
+        if since is None:
+            drop_staging_table(target)
+        raise
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def read_competitor_index(sku: str, date_from: Optional[date] = None,
+                          date_to: Optional[date] = None, engine=None) -> list:
+    """Return the index rows of ``sku`` between the given days (inclusive), by dt."""
+    engine = engine or analytics_engine
+    table = competitor_index_table
+
+    query = select(table).where(table.c.sku == sku)
+    if date_from:
+        query = query.where(table.c.dt >= date_from)
+    if date_to:
+        query = query.where(table.c.dt <= date_to)
+
+    with engine.connect() as conn:
+        return [dict(row) for row in conn.execute(query.order_by(table.c.dt)).mappings()]
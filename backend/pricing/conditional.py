@@ -0,0 +1,65 @@
+"""
+Conditional GET for listings that dashboards poll.
+
+A listing's ETag is a digest of cheap validators of the rows it would
+return: ``(id, updated_at)`` of the job rows (plus the count and last update
+of their partitions), or the few columns of a product page, which has no
+update time. They are read with the page's own index range scan, so a
+request whose ``If-None-Match`` still matches gets a 304 before any
+annotation, prefetch or serialization runs.
+
+Responses carry ``Cache-Control: no-cache``: clients may keep them but must
+revalidate on every poll. Last-Modified (the latest update of the rows) is
+informative only and If-Modified-Since alone never yields a 304: the newest
+update on a page can move backwards when a run drops off it, so only the
+ETag tells two versions of a listing apart.
+
+Usage:
+    validators = Validators.of(request, rows, next_cursor)
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    return validators.apply(Response(...))
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    @classmethod
+    def of(cls, request, *parts, last_modified: Optional[datetime] = None) -> "Validators":
+        """
+        Validators of a representation determined by ``parts`` (anything
+        JSON-serializable, datetimes included) and the negotiated renderer.
+        """
+        renderer = getattr(getattr(request, "accepted_renderer", None), "format", None)
+        payload = json.dumps([renderer, *parts], default=str, sort_keys=True)
+        return cls(quote_etag(hashlib.sha1(payload.encode()).hexdigest()), last_modified)
+
+    def not_modified(self, request):
+        """A 304 response if the request's validators still match, else None."""
+        response = get_conditional_response(request, etag=self.etag)
+        return self.apply(response) if response is not None else None
+
+    def apply(self, response):
+        """Add the ETag / Last-Modified / Cache-Control headers to ``response``."""
+        response["ETag"] = self.etag
+        if self.last_modified:
+            response["Last-Modified"] = http_date(self.last_modified.timestamp())
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+def latest(*values) -> Optional[datetime]:
+    """Latest of ``values``, ignoring None."""
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
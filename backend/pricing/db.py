@@ -21,4 +21,6 @@ ANALYTICS_URL = (
 )
 
 source_engine = create_engine(SOURCE_URL, pool_pre_ping=True)
-analytics_engine = create_engine(ANALYTICS_URL, pool_pre_ping=True)
+# local_infile enables LOAD DATA LOCAL INFILE for bulk loads (see loaders.py)
+analytics_engine = create_engine(
+    ANALYTICS_URL, pool_pre_ping=True, connect_args={"local_infile": True})
@@ -0,0 +1,427 @@
+"""
+Streaming extract / transform / load stages for the product pricing ETL.
+
+The extract stage reads the source DB through a server-side cursor and yields
+fixed-size DataFrame chunks, so a run only ever holds ``chunk_size`` rows in
+memory no matter how many rows ``daily_prices`` holds. Each chunk is
+transformed and loaded before the next one is fetched.
+
+A run is either FULL (rebuild the features table from the whole source in a
+staging table that is swapped in at the end, see ``loaders``) or INCREMENTAL
+(extract only rows changed since the previous run's high-water marks and
+upsert them by primary key).
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import (
+    Boolean, Column, Date, Float, Integer, MetaData, String, Table, text,
+)
+
+from .db import source_engine
+from .features import CostTimeline, compute_features
+from .loaders import (
+    bulk_load, create_staging_table, drop_staging_table, ensure_table,
+    swap_in, upsert,
+)
+from .stages import StageRecorder
+from .snapshots import (
+    DAILY_PRICES_SNAPSHOT, MATERIAL_COSTS_SNAPSHOT, MATERIALS_SNAPSHOT,
+    SnapshotCache, default_snapshot_cache, table_fingerprints,
+)
+
+DEFAULT_CHUNK_SIZE = 50_000
+FEATURES_TABLE = "product_pricing_features"
+PRODUCT_ETL_PIPELINE = FEATURES_TABLE
+
+# Column tracked as high-water mark for every source table
+WATERMARK_COLUMNS = {
+    "materials": "updated_at",
+    "material_costs": "updated_at",
+    "daily_prices": "dt",
+    "competitor_prices": "dt",
+}
+# The product ETL tracks daily_prices by its auto-increment id instead, so
+# prices inserted for past days (backfills) are part of the next delta.
+PRODUCT_ETL_WATERMARK_COLUMNS = {**WATERMARK_COLUMNS, "daily_prices": "price_id"}
+PRODUCT_ETL_SOURCES = ("materials", "material_costs", "daily_prices")
+
+PRICES_SELECT = """
+    SELECT dp.dt, dp.sales_org_id, dp.customer_id, dp.material_id,
+           m.sku, m.material_group, dp.net_price AS price
+    FROM daily_prices dp
+    JOIN materials m ON m.material_id = dp.material_id
+"""
+
+CHANGED_MATERIALS_SUBQUERY = """dp.material_id IN (
+          SELECT material_id FROM materials
+          WHERE updated_at > :materials_since
+          UNION
+          SELECT material_id FROM material_costs
+          WHERE updated_at > :material_costs_since
+      )"""
+
+# Partition keys understood by daily_prices_query() and plan_partitions()
+PARTITION_CONDITIONS = {
+    "sales_org_id": "dp.sales_org_id = :sales_org_id",
+    "dt_from": "dp.dt >= :dt_from",
+    "dt_to": "dp.dt <= :dt_to",
+}
+
+
+def _where(conditions) -> str:
+    return "    WHERE " + "\n      AND ".join(conditions) + "\n" if conditions else ""
+
+
+def daily_prices_query(delta: bool = False, partition: Optional[dict] = None):
+    """
+    Build the extract query for daily prices.
+
+    Args:
+        delta: Only select the delta since the ``<table>_since`` marks: every
+            price inserted since the last run (by price_id, whatever its
+            dt), plus the older history of materials whose master data or
+            cost changed. The two branches are disjoint on price_id, so
+            UNION ALL yields no duplicates. Prices corrected in place or
+            deleted are not visible to the marks; the periodic FULL run
+            (see CELERY_BEAT_SCHEDULE) reconciles them.
+        partition: Restrict to one partition, e.g. ``{"sales_org_id": 1,
+            "dt_from": "2025-01-01", "dt_to": "2025-01-31"}``. The values are
+            bound as parameters of the same name.
+    """
+    conditions = [PARTITION_CONDITIONS[key] for key in (partition or {})]
+    if not delta:
+        return text(PRICES_SELECT + _where(conditions))
+
+    recent = _where(["dp.price_id > :daily_prices_since", *conditions])
+    history = _where(["dp.price_id <= :daily_prices_since",
+                      CHANGED_MATERIALS_SUBQUERY, *conditions])
+    return text(PRICES_SELECT + recent + "    UNION ALL" + PRICES_SELECT + history)
+
+
+DAILY_PRICES_QUERY = daily_prices_query()
+DAILY_PRICES_DELTA_QUERY = daily_prices_query(delta=True)
+
+# Change check of daily_prices for source_fingerprint: COUNT(*) is answered
+# from the smallest index and MAX(price_id) from the primary key, where a
+# per-day GROUP BY would scan the whole table.
+DAILY_PRICES_FINGERPRINT_QUERY = text(
+    "SELECT COUNT(*) AS n, MAX(price_id) AS last_id FROM daily_prices")
+
+COST_HISTORY_QUERY = text("""
+    SELECT material_id, plant_id, cost, valid_from, valid_to
+    FROM material_costs
+""")
+
+
+metadata = MetaData()
+
+features_table = Table(
+    FEATURES_TABLE,
+    metadata,
+    Column("dt", Date, primary_key=True),
+    Column("sales_org_id", Integer, primary_key=True),
+    Column("customer_id", Integer, primary_key=True),
+    Column("material_id", Integer, primary_key=True),
+    Column("sku", String(20)),
+    Column("material_group", String(50)),
+    Column("price", Float),
+    Column("cost", Float),
+    Column("margin", Float),
+    Column("margin_pct", Float),
+    Column("is_low_margin", Boolean),
+    Column("price_bucket", String(32)),
+)
+
+
+@dataclass
+class EtlStats:
+    """Running totals of a (possibly still in progress) ETL run."""
+
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    # Source snapshot partitions read from / missing in the SnapshotCache
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # Time, rows, bytes and memory per stage (extract, transform, load, ...)
+    stages: StageRecorder = field(default_factory=StageRecorder, repr=False)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def extract_chunks(query, chunk_size: int = DEFAULT_CHUNK_SIZE, engine=None,
+                   params: Optional[dict] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield the result of ``query`` as DataFrames of at most ``chunk_size`` rows.
+
+    ``stream_results`` makes PyMySQL use an unbuffered (server-side) cursor,
+    so rows are pulled from MySQL as the chunks are consumed instead of being
+    buffered client-side up front.
+    """
+    engine = engine or source_engine
+    with engine.connect().execution_options(
+        stream_results=True, max_row_buffer=chunk_size
+    ) as conn:
+        yield from pd.read_sql(query, conn, params=params, chunksize=chunk_size,
+                               parse_dates=["dt"])
+
+
+def complete_groups(chunks: Iterator[pd.DataFrame],
+                    keys: Sequence[str]) -> Iterator[pd.DataFrame]:
+    """
+    Regroup chunks sorted by ``keys`` so no group spans two chunks.
+
+    The trailing rows of the last group of every chunk are held back and
+    prepended to the next chunk.
+    """
+    keys = list(keys)
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+
+        last = chunk[keys].iloc[-1]
+        in_last = (chunk[keys] == last).all(axis=1).to_numpy()
+        # groups are contiguous, so the last one starts at its first row
+        split = int(in_last.argmax())
+        carry = chunk.iloc[split:].reset_index(drop=True)
+        if split:
+            yield chunk.iloc[:split].reset_index(drop=True)
+
+    if carry is not None and len(carry):
+        yield carry
+
+
+def read_high_water_marks(tables=PRODUCT_ETL_SOURCES, engine=None,
+                          columns=WATERMARK_COLUMNS) -> dict:
+    """
+    Return the current high-water mark (MAX of ``columns[table]``) of each
+    source table as a string.
+
+    Values are kept as strings (ISO dates / timestamps) so they can be stored
+    as-is and bound straight back into the delta query. Empty tables map to
+    None.
+    """
+    engine = engine or source_engine
+    marks = {}
+    with engine.connect() as conn:
+        for table in tables:
+            value = conn.execute(text(
+                f"SELECT MAX({columns[table]}) FROM {table}"
+            )).scalar()
+            marks[table] = None if value is None else str(value)
+    return marks
+
+
+def source_fingerprint(engine=None) -> str:
+    """
+    Digest of the state of every product ETL source table.
+
+    Built from the snapshot fingerprints of the small ``materials`` and
+    ``material_costs`` tables (COUNT / MAX(updated_at)) and the indexed
+    COUNT / MAX(price_id) of ``daily_prices``. Equal digests mean an
+    incremental run would find nothing to load. Like the delta itself, the
+    digest does not see prices corrected in place; the weekly FULL run
+    reconciles those.
+    """
+    engine = engine or source_engine
+    parts = {spec.name: table_fingerprints(spec, engine)
+             for spec in (MATERIALS_SNAPSHOT, MATERIAL_COSTS_SNAPSHOT)}
+    with engine.connect() as conn:
+        parts["daily_prices"] = list(conn.execute(DAILY_PRICES_FINGERPRINT_QUERY).one())
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_costs(engine=None, cache: Optional[SnapshotCache] = None) -> CostTimeline:
+    """
+    Load the full cost history as a point-in-time timeline per material.
+
+    Plant costs valid on the same day are averaged, as daily prices carry a
+    sales org but no plant. With a ``cache``, the history is read from its
+    snapshot unless material_costs changed.
+    """
+    if cache is not None:
+        return CostTimeline(cache.read_all(MATERIAL_COSTS_SNAPSHOT))
+    engine = engine or source_engine
+    return CostTimeline(pd.read_sql(COST_HISTORY_QUERY, engine))
+
+
+def cached_price_chunks(cache: SnapshotCache,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield all daily prices (as DAILY_PRICES_QUERY does) from snapshots.
+
+    Only the months of ``daily_prices`` that changed since they were
+    snapshotted are extracted from the source; materials are joined in here
+    so a master data change does not invalidate the price snapshots.
+    """
+    materials = cache.read_all(MATERIALS_SNAPSHOT)
+    for prices in cache.read(DAILY_PRICES_SNAPSHOT, batch_size=chunk_size):
+        yield prices.merge(materials, on="material_id", how="inner")
+
+
+def transform_chunk(df: pd.DataFrame, costs: CostTimeline) -> pd.DataFrame:
+    """Add cost (valid on each row's dt) and margin features to a chunk."""
+    return compute_features(df, costs)
+
+
+def plan_partitions(partition_by=("sales_org_id",), dt_partitions: int = 1,
+                    engine=None) -> list:
+    """
+    Split ``daily_prices`` into disjoint partitions for parallel runs.
+
+    Args:
+        partition_by: Any of "sales_org_id" (one partition per sales org) and
+            "dt" (``dt_partitions`` contiguous day ranges); with both, the
+            cross product is returned
+        dt_partitions: Number of dt ranges when partitioning by "dt"
+
+    Returns:
+        A list of partition dicts for ``daily_prices_query(partition=...)``
+    """
+    unknown = set(partition_by) - {"sales_org_id", "dt"}
+    if unknown:
+        raise ValueError(f"Cannot partition by {sorted(unknown)}")
+    if dt_partitions <= 0:
+        raise ValueError(f"dt_partitions must be positive, got {dt_partitions}")
+
+    engine = engine or source_engine
+    partitions = [{}]
+
+    with engine.connect() as conn:
+        if "sales_org_id" in partition_by:
+            sales_orgs = conn.execute(text(
+                "SELECT sales_org_id FROM sales_orgs ORDER BY sales_org_id"
+            )).scalars().all()
+            partitions = [{"sales_org_id": int(so)} for so in sales_orgs]
+
+        if "dt" in partition_by:
+            lo, hi = conn.execute(text(
+                "SELECT MIN(dt), MAX(dt) FROM daily_prices")).one()
+            if lo is not None:
+                lo, hi = pd.Timestamp(lo), pd.Timestamp(hi)
+                days = (hi - lo).days + 1
+                step = -(-days // min(dt_partitions, days))  # ceil
+                ranges = [
+                    {"dt_from": (lo + pd.Timedelta(days=start)).date().isoformat(),
+                     "dt_to": min(lo + pd.Timedelta(days=start + step - 1), hi).date().isoformat()}
+                    for start in range(0, days, step)
+                ]
+                partitions = [{**part, **dt_range}
+                              for part in partitions for dt_range in ranges]
+
+    return partitions
+
+
+def partition_label(partition: dict) -> str:
+    """Human readable description of a partition, e.g. for JobRun.partition."""
+    return ", ".join(f"{key}={value}" for key, value in partition.items()) or "all"
+
+
+def load_product_features(target: Table, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          on_chunk: Optional[Callable[[EtlStats], None]] = None,
+                          since: Optional[dict] = None,
+                          partition: Optional[dict] = None,
+                          cache: Optional[SnapshotCache] = None) -> EtlStats:
+    """
+    Stream (a partition of) ``daily_prices`` through transform into ``target``.
+
+    Without ``since`` the rows are bulk-loaded (``target`` is expected to be a
+    staging table); with ``since`` only the delta is extracted and upserted.
+    With a ``cache``, the cost history and (for full, unpartitioned runs) the
+    prices are read from source snapshots.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    stats = EtlStats()
+    stages = stats.stages
+    started = time.perf_counter()
+    with stages.stage("costs"):
+        costs = load_costs(cache=cache)
+
+    if cache is not None and since is None and not partition:
+        chunks = cached_price_chunks(cache, chunk_size)
+    else:
+        query = daily_prices_query(delta=since is not None, partition=partition)
+        params = dict(partition or {})
+        if since is not None:
+            params.update({f"{table}_since": since[table]
+                           for table in PRODUCT_ETL_SOURCES})
+        chunks = extract_chunks(query, chunk_size, params=params or None)
+
+    for chunk in stages.iterate("extract", chunks):
+        with stages.stage("transform", rows_in=len(chunk)) as stage:
+            features = transform_chunk(chunk, costs)
+            stage.rows_out += len(features)
+        with stages.stage("load", rows_in=len(features)) as stage:
+            if since is None:
+                bulk_load(features, target)
+            else:
+                upsert(features, target)
+            stage.rows_out += len(features)
+
+        stats.rows += len(features)
+        stats.chunks += 1
+        stats.seconds = time.perf_counter() - started
+        if on_chunk:
+            on_chunk(stats)
+
+    stats.seconds = time.perf_counter() - started
+    if cache is not None:
+        stats.cache_hits, stats.cache_misses = cache.hits, cache.misses
+    return stats
+
+
+def run_product_etl(chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    on_chunk: Optional[Callable[[EtlStats], None]] = None,
+                    since: Optional[dict] = None,
+                    cache: Optional[SnapshotCache] = None) -> EtlStats:
+    """
+    Stream ``daily_prices`` through transform and load in ``chunk_size`` batches.
+
+    Args:
+        chunk_size: Number of source rows held in memory at a time
+        on_chunk: Optional callback invoked with the running stats after
+            every loaded chunk (used for progress reporting)
+        since: High-water marks of the previous run, keyed by source table.
+            When given, only the delta is extracted and upserted; otherwise
+            the features table is rebuilt from scratch.
+        cache: Source snapshots to read unchanged history from; defaults to
+            the SOURCE_SNAPSHOT_DIR cache (none if unset). Evicted after the
+            run.
+
+    Returns:
+        The final EtlStats of the run
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    cache = cache or default_snapshot_cache()
+    try:
+        if since is not None:
+            ensure_table(features_table)
+            return load_product_features(
+                features_table, chunk_size, on_chunk, since, cache=cache)
+
+        staging = create_staging_table(features_table)
+        try:
+            stats = load_product_features(staging, chunk_size, on_chunk, cache=cache)
+            swap_in(features_table, staging)
+        except Exception:
+            drop_staging_table(staging)
+            raise
+        return stats
+    finally:
+        if cache is not None:
+            cache.evict()
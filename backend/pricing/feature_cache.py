@@ -0,0 +1,227 @@
+"""
+Cached reads of the product pricing features.
+
+``product_pricing_features`` only changes when a product ETL run succeeds,
+so the read endpoint serves its pages from Redis (FEATURES_CACHE_REDIS_URL)
+instead of querying MySQL on every request. Every cache key carries the
+cache version: the id of the last successful product ETL JobRun, kept in
+``features:version``. A successful run sets the version to its own id
+(``publish_version``), which moves every reader to new keys in one write;
+entries of older versions just expire after FEATURES_CACHE_TTL.
+
+The first reads of a page after a refresh all miss. Only one of them queries
+MySQL, holding ``<key>:lock`` meanwhile; the others poll for its result for
+up to FILL_TIMEOUT seconds before querying themselves. Redis errors fall
+back to MySQL, and an empty FEATURES_CACHE_REDIS_URL disables the cache.
+
+Usage:
+    query = parse_feature_query(request.query_params)
+    page, hit = cached_features(query)
+"""
+
+import base64
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+import redis
+from django.conf import settings
+from sqlalchemy import select, tuple_
+
+from .db import analytics_engine
+from .etl import features_table
+from .models import JobRun
+from .pagination import parse_limit
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "features:version"
+# Seconds a cached page lives; a new version makes it unreachable earlier
+CACHE_TTL = int(os.getenv("FEATURES_CACHE_TTL", 24 * 60 * 60))
+# Seconds a miss waits for another request filling the same key
+FILL_TIMEOUT = 10.0
+POLL_INTERVAL = 0.05
+
+# Query parameter -> features column, matched for equality
+FEATURE_FILTERS = ("sku", "material_group", "price_bucket")
+# Pages go newest day first, in primary key order
+ORDER_COLUMNS = ("dt", "sales_org_id", "customer_id", "material_id")
+
+# Delete KEYS[1] if ARGV[1] still holds it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    """Shared Redis client, None if the cache is disabled."""
+    url = settings.FEATURES_CACHE_REDIS_URL
+    return redis.Redis.from_url(url, decode_responses=True) if url else None
+
+
+def _encode_cursor(row: dict) -> str:
+    position = json.dumps([row[column] for column in ORDER_COLUMNS])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        dt, *ids = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        position = [date.fromisoformat(dt).isoformat()] + [int(value) for value in ids]
+    except (TypeError, ValueError):
+        raise ValueError("invalid cursor") from None
+    if len(position) != len(ORDER_COLUMNS):
+        raise ValueError("invalid cursor")
+    return position
+
+
+def parse_feature_query(params) -> dict:
+    """
+    Normalized read query of the request ``params``; equal queries are
+    equal dicts, so they share a cache key. ValueError if invalid.
+    """
+    query = {name: params[name] for name in FEATURE_FILTERS if params.get(name)}
+
+    low_margin = params.get("low_margin")
+    if low_margin:
+        if low_margin.lower() not in ("true", "false", "1", "0"):
+            raise ValueError("low_margin must be true or false")
+        query["low_margin"] = low_margin.lower() in ("true", "1")
+
+    for name in ("date_from", "date_to"):
+        if params.get(name):
+            try:
+                query[name] = date.fromisoformat(params[name]).isoformat()
+            except ValueError:
+                raise ValueError(f"{name} must be a YYYY-MM-DD date") from None
+
+    if params.get("cursor"):
+        query["cursor"] = _decode_cursor(params["cursor"])
+    query["limit"] = parse_limit(params.get("limit"))
+    return query
+
+
+def read_features(query: dict, engine=None) -> dict:
+    """One page of features matching ``query``, straight from the table."""
+    engine = engine or analytics_engine
+    table = features_table
+
+    statement = select(table)
+    for name in FEATURE_FILTERS:
+        if name in query:
+            statement = statement.where(table.c[name] == query[name])
+    if "low_margin" in query:
+        statement = statement.where(table.c.is_low_margin == query["low_margin"])
+    if "date_from" in query:
+        statement = statement.where(table.c.dt >= date.fromisoformat(query["date_from"]))
+    if "date_to" in query:
+        statement = statement.where(table.c.dt <= date.fromisoformat(query["date_to"]))
+
+    order = [table.c[column] for column in ORDER_COLUMNS]
+    if "cursor" in query:
+        dt, *ids = query["cursor"]
+        statement = statement.where(tuple_(*order) < tuple_(date.fromisoformat(dt), *ids))
+    statement = statement.order_by(*(column.desc() for column in order))
+
+    limit = query["limit"]
+    with engine.connect() as conn:
+        rows = [dict(row) for row in conn.execute(statement.limit(limit + 1)).mappings()]
+    for row in rows:
+        row["dt"] = row["dt"].isoformat()
+
+    next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"results": rows[:limit], "next_cursor": next_cursor}
+
+
+def _last_successful_run_id() -> Optional[int]:
+    return (
+        JobRun.objects
+        .filter(job_type__in=JobRun.PRODUCT_ETL_JOB_TYPES, parent__isnull=True,
+                job_status="SUCCESS")
+        .order_by("-created_at", "-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def publish_version(job_run_id: int) -> None:
+    """Make the output of the successful run ``job_run_id`` the cached version."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(VERSION_KEY, job_run_id)
+    except redis.RedisError as exc:
+        # readers keep the old version until the key is fixed; say so loudly
+        logger.error("Could not publish features cache version %s: %s", job_run_id, exc)
+
+
+def _version(client) -> Optional[str]:
+    version = client.get(VERSION_KEY)
+    if version is None:
+        # Redis was flushed (or never had one): take it from the job history
+        run_id = _last_successful_run_id()
+        if run_id is None:
+            return None
+        client.set(VERSION_KEY, run_id, nx=True)
+        version = client.get(VERSION_KEY)
+    return version
+
+
+def _fill(client, key: str, query: dict) -> tuple:
+    """Page of the missed ``key``, read from MySQL by one request at a time."""
+    lock, token = f"{key}:lock", str(uuid.uuid4())
+    if client.set(lock, token, nx=True, px=int(FILL_TIMEOUT * 1000)):
+        try:
+            page = read_features(query)
+            client.set(key, json.dumps(page), ex=CACHE_TTL)
+            return page, False
+        finally:
+            client.eval(RELEASE_SCRIPT, 1, lock, token)
+
+    deadline = time.monotonic() + FILL_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        cached = client.get(key)
+        if cached is not None:
+            return json.loads(cached), True
+    # the filling request is stuck or gone
+    return read_features(query), False
+
+
+def cached_features(query: dict) -> tuple:
+    """
+    One page of features matching ``query`` (see ``parse_feature_query``).
+
+    Returns:
+        ``(page, hit)``: ``{"results", "next_cursor"}`` and whether it came
+        from the cache
+    """
+    client = get_redis()
+    if client is None:
+        if _last_successful_run_id() is None:
+            return {"results": [], "next_cursor": None}, False
+        return read_features(query), False
+
+    try:
+        version = _version(client)
+        if version is None:
+            # no product ETL run has succeeded, the table may not exist yet
+            return {"results": [], "next_cursor": None}, False
+        key = f"features:{version}:{json.dumps(query, sort_keys=True)}"
+        cached = client.get(key)
+        if cached is not None:
+            return json.loads(cached), True
+        return _fill(client, key, query)
+    except redis.RedisError as exc:
+        logger.warning("Features cache unavailable, reading MySQL: %s", exc)
+        return read_features(query), False
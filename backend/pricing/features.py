@@ -0,0 +1,153 @@
+"""
+Vectorized pricing features.
+
+All features are computed column-wise with NumPy/pandas; no Python-level loop
+runs per row. The cost of a daily price is the cost valid on that price's
+date: ``material_costs`` holds one cost per plant over a
+``valid_from``/``valid_to`` interval, which CostTimeline turns into a sorted,
+piecewise-constant timeline that every price row is joined against with a
+single ``np.searchsorted``.
+
+Usage:
+    timeline = CostTimeline(cost_history)      # once per run
+    features = compute_features(prices, timeline)  # per chunk
+"""
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+LOW_MARGIN_THRESHOLD = 0.10
+PRICE_BUCKETS = [0, 25, 50, 100, 200, 500, 1000, 10_000]
+
+# Composite search key: group code in the high bits, day number in the low
+_DAY_BITS = 32
+_DAY_OFFSET = 2 ** 31
+
+
+def _days(values) -> np.ndarray:
+    """Dates (strings, date objects or datetime64) as int64 days since epoch."""
+    return (pd.to_datetime(values).to_numpy()
+            .astype("datetime64[D]").astype(np.int64))
+
+
+def _key_index(frame: pd.DataFrame, by: Sequence[str]) -> pd.Index:
+    if len(by) == 1:
+        return pd.Index(frame[by[0]].to_numpy())
+    return pd.MultiIndex.from_frame(frame[list(by)])
+
+
+class CostTimeline:
+    """
+    Cost valid per key (material, optionally plant) at any date.
+
+    Overlapping intervals of the rows sharing a key (e.g. the plants of a
+    material when joining by material only) are averaged; dates covered by
+    no interval have no cost (NaN).
+
+    The timeline is built with a sweep over interval start/end events:
+    every interval contributes ``+cost`` at ``valid_from`` and ``-cost`` the
+    day after ``valid_to``, and a cumulative sum per key yields the sum and
+    count of the costs valid from each breakpoint on.
+    """
+
+    def __init__(self, costs: pd.DataFrame, by: Sequence[str] = ("material_id",)):
+        """
+        Args:
+            costs: Rows with the ``by`` columns plus cost, valid_from and
+                valid_to (NULL valid_to means open-ended)
+            by: Columns identifying whose cost it is; prices are joined on
+                the same columns
+        """
+        self.by = list(by)
+
+        cost = costs["cost"].to_numpy(dtype=float)
+        start = _days(costs["valid_from"])
+        end_known = costs["valid_to"].notna().to_numpy()
+        end = _days(costs["valid_to"].where(end_known, costs["valid_from"])) + 1
+
+        events = pd.concat([
+            costs.loc[:, self.by].assign(day=start, d_sum=cost, d_count=1),
+            costs.loc[end_known, self.by].assign(
+                day=end[end_known], d_sum=-cost[end_known], d_count=-1),
+        ], ignore_index=True)
+
+        # Net the events of a day, then accumulate per key in date order
+        events = (events.groupby(self.by + ["day"], sort=True)[["d_sum", "d_count"]]
+                  .sum().reset_index())
+        running = events.groupby(self.by, sort=False)[["d_sum", "d_count"]].cumsum()
+        count = running["d_count"].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._cost = np.where(count > 0, running["d_sum"].to_numpy() / count, np.nan)
+
+        codes = events.groupby(self.by, sort=True).ngroup().to_numpy()
+        self._keys = _key_index(events.drop_duplicates(self.by), self.by)
+        self._search = (codes.astype(np.int64) << _DAY_BITS) + events["day"].to_numpy() + _DAY_OFFSET
+        self._codes = codes
+
+    def lookup(self, prices: pd.DataFrame, on: str = "dt") -> np.ndarray:
+        """Return the cost valid on ``prices[on]`` for each row (NaN if none)."""
+        if prices.empty or not len(self._search):
+            return np.full(len(prices), np.nan)
+
+        codes = self._keys.get_indexer(_key_index(prices, self.by))
+        search = (codes.astype(np.int64) << _DAY_BITS) + _days(prices[on]) + _DAY_OFFSET
+
+        pos = np.searchsorted(self._search, search, side="right") - 1
+        safe_pos = np.maximum(pos, 0)
+        found = ((codes >= 0) & (pos >= 0) & (self._codes[safe_pos] == codes)
+                 & prices[on].notna().to_numpy())
+        return np.where(found, self._cost[safe_pos], np.nan)
+
+
+# Labels of pd.cut(..., include_lowest=True), plus None for prices outside
+# the buckets
+_BUCKET_LABELS = np.array(
+    [str(interval) for interval in
+     pd.cut(PRICE_BUCKETS, bins=PRICE_BUCKETS, include_lowest=True).categories]
+    + [None],
+    dtype=object,
+)
+
+
+def price_buckets(price: pd.Series) -> pd.Series:
+    """
+    Label each price with its PRICE_BUCKETS interval, e.g. "(25.0, 50.0]".
+
+    Equivalent to ``pd.cut(...).astype(str)`` but looks the labels up by
+    bucket index, which avoids formatting an Interval per row. Prices
+    outside the buckets (or NaN) get None.
+    """
+    values = price.to_numpy(dtype=float)
+    bins = np.asarray(PRICE_BUCKETS, dtype=float)
+
+    # right-closed (a, b]: the bucket of x is the first edge >= x
+    index = np.searchsorted(bins, values, side="left") - 1
+    index[values == bins[0]] = 0  # include_lowest
+    outside = (index < 0) | (index >= len(bins) - 1) | np.isnan(values)
+    index[outside] = len(_BUCKET_LABELS) - 1
+    return pd.Series(_BUCKET_LABELS[index], index=price.index)
+
+
+def compute_features(prices: pd.DataFrame, costs: CostTimeline) -> pd.DataFrame:
+    """
+    Add cost, margin, margin_pct, is_low_margin and price_bucket to ``prices``.
+
+    Args:
+        prices: Rows with dt, price and the CostTimeline's key columns;
+            modified in place
+        costs: Cost history to join each row against on its dt
+
+    Returns:
+        ``prices`` with the feature columns added
+    """
+    prices["price"] = prices["price"].astype(float)
+    prices["cost"] = costs.lookup(prices)
+
+    prices["margin"] = prices["price"] - prices["cost"]
+    prices["margin_pct"] = (prices["margin"] / prices["price"]).fillna(0.0)
+
+    prices["is_low_margin"] = prices["margin_pct"] < LOW_MARGIN_THRESHOLD
+    prices["price_bucket"] = price_buckets(prices["price"])
+    return prices
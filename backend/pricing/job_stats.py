@@ -0,0 +1,176 @@
+"""
+Operational rollups of the job history: duration percentiles, throughput,
+failure rate and queue wait per job type, per hour and per day.
+
+``refresh_job_stats`` (run every few minutes by beat) recomputes the JobStats
+buckets touched by runs that finished since the previous refresh. Bucketing
+(``TruncHour``/``TruncDay`` in the server time zone) and durations are
+computed by the DB, which only returns the finished top-level runs of those
+buckets; the percentiles are then taken with a pandas groupby, as MySQL has
+no PERCENTILE_CONT. Dashboards read the rollup rows and never scan JobRun.
+
+Queue wait is the time between publishing a task and its JobRun being
+created: every published task gets an ``enqueued_at`` header, which the
+JobRun created inside that task picks up (``JobRun.enqueued_at``). Runs
+applied in-process (``.apply()``, ``task_always_eager``) have none.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+import pandas as pd
+from celery import current_task
+from celery.signals import before_task_publish
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Min
+from django.db.models.functions import TruncDay, TruncHour
+from django.db.models.signals import pre_save
+from django.utils import timezone
+
+from .models import JobRun, JobStats
+from .watermarks import get_watermarks, save_watermarks
+
+JOB_STATS_PIPELINE = "job_stats"
+JOB_STATS_SOURCE = JobRun._meta.db_table
+ENQUEUED_AT_HEADER = "enqueued_at"
+
+FINISHED = ("SUCCESS", "FAILED")
+PERCENTILES = {"duration_p50": 0.5, "duration_p95": 0.95, "duration_p99": 0.99}
+
+
+# -- queue wait -----------------------------------------------------------
+
+@before_task_publish.connect(dispatch_uid="job_stats_enqueued_at")
+def _stamp_enqueued_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+def enqueued_at(request) -> Optional[datetime]:
+    """Publish time of the task executing ``request``, if it was stamped."""
+    value = getattr(request, ENQUEUED_AT_HEADER, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(ENQUEUED_AT_HEADER)
+    return None if value is None else datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def _set_job_enqueued_at(sender, instance, **kwargs):
+    if not instance._state.adding or instance.enqueued_at or not current_task:
+        return
+    request = current_task.request
+    if request.id and request.id == instance.celery_task_id:
+        instance.enqueued_at = enqueued_at(request)
+
+
+pre_save.connect(_set_job_enqueued_at, sender=JobRun, dispatch_uid="job_stats_enqueued_at")
+
+
+# -- rollups --------------------------------------------------------------
+
+def _bucket_floor(value: datetime) -> datetime:
+    """Start of the (local) day of ``value``: the earliest bucket it touches."""
+    local = timezone.localtime(value)
+    return timezone.make_aware(datetime.combine(local.date(), datetime.min.time()))
+
+
+def finished_runs(since: datetime) -> pd.DataFrame:
+    """Finished top-level runs created since ``since``, one row per run."""
+    runs = (
+        JobRun.objects
+        .filter(parent__isnull=True, job_status__in=FINISHED, created_at__gte=since)
+        .annotate(
+            hour=TruncHour("created_at"),
+            day=TruncDay("created_at"),
+            duration=ExpressionWrapper(F("finished_at") - F("started_at"),
+                                       output_field=DurationField()),
+            queue_wait=ExpressionWrapper(F("started_at") - F("enqueued_at"),
+                                         output_field=DurationField()),
+        )
+        .values("job_type", "job_status", "hour", "day", "rows_processed",
+                "duration", "queue_wait")
+    )
+    df = pd.DataFrame.from_records(
+        runs, columns=["job_type", "job_status", "hour", "day", "rows_processed",
+                       "duration", "queue_wait"])
+    for column in ("duration", "queue_wait"):
+        df[column] = pd.to_timedelta(df[column]).dt.total_seconds()
+    df["failed"] = df["job_status"] == "FAILED"
+    df["rows_processed"] = df["rows_processed"].fillna(0).astype("int64")
+    return df
+
+
+def summarize(runs: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """
+    JobStats columns per (job_type, ``bucket``) of a ``finished_runs`` frame.
+
+    Throughput is the rows of the successful runs over their summed duration.
+    """
+    keys = ["job_type", bucket]
+    grouped = runs.groupby(keys)
+    stats = grouped.agg(runs=("job_status", "size"), failures=("failed", "sum"))
+
+    durations = grouped["duration"]
+    for name, q in PERCENTILES.items():
+        stats[name] = durations.quantile(q)
+
+    ok = runs[~runs["failed"]].groupby(keys)[["rows_processed", "duration"]].sum()
+    stats["rows_processed"] = ok["rows_processed"]
+    stats["rows_per_second"] = ok["rows_processed"] / ok["duration"].where(ok["duration"] > 0)
+
+    waits = grouped["queue_wait"]
+    stats["queue_wait_avg"] = waits.mean()
+    stats["queue_wait_p95"] = waits.quantile(0.95)
+
+    stats["rows_processed"] = stats["rows_processed"].fillna(0).astype("int64")
+    return stats.reset_index().rename(columns={bucket: "bucket_start"})
+
+
+def rollup(since: datetime) -> int:
+    """
+    Replace the JobStats buckets from ``since`` (a day start) on.
+
+    Returns:
+        the number of JobStats rows written
+    """
+    runs = finished_runs(since)
+    rows = []
+    for granularity, bucket in (("HOUR", "hour"), ("DAY", "day")):
+        for record in summarize(runs, bucket).to_dict("records"):
+            rows.append(JobStats(granularity=granularity, **{
+                key: None if pd.isna(value) else value for key, value in record.items()}))
+
+    with transaction.atomic():
+        JobStats.objects.filter(bucket_start__gte=since).delete()
+        JobStats.objects.bulk_create(rows)
+    return len(rows)
+
+
+def refresh_job_stats(now: Optional[datetime] = None) -> int:
+    """
+    Bring JobStats up to date with the runs finished since the last refresh.
+
+    Every bucket from the day of the earliest such run on is recomputed, so
+    a late-finishing run updates the buckets it was created in. The first
+    refresh rolls up the whole history.
+
+    Returns:
+        the number of JobStats rows written
+    """
+    now = now or timezone.now()
+    runs = JobRun.objects.filter(parent__isnull=True, job_status__in=FINISHED)
+    marks = get_watermarks(JOB_STATS_PIPELINE, [JOB_STATS_SOURCE])
+    if marks:
+        # Runs may finish while we roll up; they are after the new mark
+        runs = runs.filter(finished_at__gte=datetime.fromisoformat(marks[JOB_STATS_SOURCE]))
+    earliest = runs.aggregate(earliest=Min("created_at"))["earliest"]
+
+    written = rollup(_bucket_floor(earliest)) if earliest else 0
+    save_watermarks(JOB_STATS_PIPELINE, {JOB_STATS_SOURCE: now.isoformat()},
+                    {JOB_STATS_SOURCE: "finished_at"})
+    return written
+
+
+def default_window(granularity: str) -> timedelta:
+    """Time span the stats endpoint covers unless asked otherwise."""
+    return timedelta(days=1) if granularity == "HOUR" else timedelta(days=30)
@@ -0,0 +1,293 @@
+"""
+Bulk loading into the analytics DB.
+
+``DataFrame.to_sql`` binds parameters row by row through SQLAlchemy, which
+dominates the time of a large load. A full load here instead writes every
+batch into a staging copy of the target table using MySQL's bulk path,
+``LOAD DATA LOCAL INFILE`` from a temporary TSV file (or, where the server
+does not allow local infile, large multi-row INSERTs issued straight on the
+DBAPI cursor), and finally swaps the staging table in with a single
+``RENAME TABLE``. Readers therefore see either the complete old table or the
+complete new one, never a half-written or empty one.
+
+Every load gets its own staging table, ``<table>__staging_<key>``, so
+concurrent full loads of one table never write into each other's rows; the
+last one to swap in wins. ``key`` defaults to a random token; loads spread
+over several tasks pass a shared one (e.g. the JobRun id).
+
+Incremental loads upsert into the live table instead (see ``upsert``).
+
+Usage:
+    staging = create_staging_table(features_table)
+    for chunk in chunks:
+        bulk_load(chunk, staging)
+    swap_in(features_table, staging)
+"""
+
+import os
+import tempfile
+import uuid
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import Boolean, Date, DateTime, MetaData, Table, inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import analytics_engine
+
+STAGING_SUFFIX = "__staging"
+OLD_SUFFIX = "__old"
+
+LOAD_METHODS = ("load_data", "multirow")
+# Force a load method, e.g. "multirow" when the MySQL server runs without
+# local_infile; by default LOAD DATA is used on MySQL and multirow elsewhere.
+BULK_LOAD_METHOD = os.getenv("ANALYTICS_BULK_LOAD_METHOD")
+
+# Rows per executemany() call of the multirow path; PyMySQL rewrites each
+# call into as few multi-row INSERT statements as max_allowed_packet allows.
+MULTIROW_BATCH_SIZE = 10_000
+
+# Rows per INSERT ... ON DUPLICATE KEY UPDATE statement
+UPSERT_BATCH_SIZE = 1_000
+
+# The TSV files escape backslashes (see _write_tsv), so values keep
+# theirs and only an unquoted \N is read as NULL.
+LOAD_DATA_SQL = """
+    LOAD DATA LOCAL INFILE %s
+    INTO TABLE `{table}`
+    FIELDS TERMINATED BY '\\t' OPTIONALLY ENCLOSED BY '"' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    ({columns})
+"""
+
+
+def ensure_table(table: Table, engine=None) -> None:
+    """Create ``table`` if it does not exist yet."""
+    engine = engine or analytics_engine
+    table.create(engine, checkfirst=True)
+
+
+def staging_table(table: Table, key) -> Table:
+    """Return a copy of ``table``'s schema named ``<table>__staging_<key>``."""
+    return table.to_metadata(MetaData(), name=f"{table.name}{STAGING_SUFFIX}_{key}")
+
+
+def create_staging_table(table: Table, engine=None, key=None) -> Table:
+    """
+    (Re)create an empty staging copy of ``table`` and return it.
+
+    ``key`` names the load the copy belongs to; a random one by default.
+    """
+    engine = engine or analytics_engine
+    staging = staging_table(table, key or uuid.uuid4().hex[:12])
+    staging.drop(engine, checkfirst=True)
+    staging.create(engine)
+    return staging
+
+
+def drop_staging_table(staging: Table, engine=None) -> None:
+    """Discard a staging table, e.g. after a failed load."""
+    engine = engine or analytics_engine
+    staging.drop(engine, checkfirst=True)
+
+
+def swap_in(table: Table, staging: Table, engine=None) -> None:
+    """
+    Atomically replace ``table`` with its staging copy ``staging``.
+
+    On MySQL a multi-table ``RENAME TABLE`` is a single atomic operation, so
+    concurrent readers block for its duration and then see the new table.
+    """
+    engine = engine or analytics_engine
+    name = table.name
+    staging = staging.name
+    # <table>__old_<key>, unique like the staging table
+    old = name + OLD_SUFFIX + staging[len(name + STAGING_SUFFIX):]
+
+    with engine.begin() as conn:
+        exists = inspect(conn).has_table(name)
+
+        if conn.dialect.name == "mysql":
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS `{old}`")
+            if exists:
+                conn.exec_driver_sql(
+                    f"RENAME TABLE `{name}` TO `{old}`, `{staging}` TO `{name}`")
+                conn.exec_driver_sql(f"DROP TABLE `{old}`")
+            else:
+                conn.exec_driver_sql(f"RENAME TABLE `{staging}` TO `{name}`")
+        else:
+            # SQLite has no multi-table RENAME, but its DDL is transactional
+            if exists:
+                conn.exec_driver_sql(f'DROP TABLE "{name}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{staging}" RENAME TO "{name}"')
+
+
+def _prepare_frame(df: pd.DataFrame, table: Table) -> pd.DataFrame:
+    """Order ``df`` like ``table`` and convert values to their SQL text form."""
+    columns = [column for column in table.columns if column.name in df.columns]
+    out = df[[column.name for column in columns]].copy()
+
+    for column in columns:
+        if isinstance(column.type, Boolean):
+            out[column.name] = out[column.name].astype("Int8")
+        elif isinstance(column.type, Date) and not isinstance(column.type, DateTime):
+            out[column.name] = pd.to_datetime(
+                out[column.name]).dt.strftime("%Y-%m-%d")
+    return out
+
+
+def _escape_backslashes(value):
+    return value.replace("\\", "\\\\") if isinstance(value, str) else value
+
+
+def _write_tsv(df: pd.DataFrame, file) -> None:
+    """
+    Write ``df`` in the format of LOAD_DATA_SQL: NULL as \\N, and backslashes
+    in text doubled since LOAD DATA reads them as escapes.
+    """
+    df = df.copy()
+    for column in df.select_dtypes(include=["object", "string"]).columns:
+        df[column] = df[column].map(_escape_backslashes)
+    df.to_csv(file, sep="\t", header=False, index=False,
+              na_rep="\\N", lineterminator="\n")
+
+
+def _load_data_infile(df: pd.DataFrame, table: Table, conn) -> None:
+    """Load ``df`` through a temporary TSV file and LOAD DATA LOCAL INFILE."""
+    with tempfile.NamedTemporaryFile(
+        mode="w", suffix=".tsv", delete=False, newline=""
+    ) as tmp:
+        _write_tsv(df, tmp)
+        path = tmp.name
+
+    try:
+        columns = ", ".join(f"`{column}`" for column in df.columns)
+        conn.exec_driver_sql(
+            LOAD_DATA_SQL.format(table=table.name, columns=columns), (path,))
+    finally:
+        os.unlink(path)
+
+
+def _insert_multirow(df: pd.DataFrame, table: Table, conn,
+                     batch_size: int = MULTIROW_BATCH_SIZE) -> None:
+    """Insert ``df`` with plain tuples through the DBAPI cursor's executemany."""
+    placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    quote = conn.dialect.identifier_preparer.quote
+    sql = "INSERT INTO {table} ({columns}) VALUES ({values})".format(
+        table=quote(table.name),
+        columns=", ".join(quote(column) for column in df.columns),
+        values=", ".join([placeholder] * len(df.columns)),
+    )
+
+    values = df.astype(object).where(df.notna(), None)
+    rows = list(values.itertuples(index=False, name=None))
+
+    cursor = conn.connection.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    finally:
+        cursor.close()
+
+
+def _resolve_method(engine, method: Optional[str]) -> str:
+    method = method or BULK_LOAD_METHOD or (
+        "load_data" if engine.dialect.name == "mysql" else "multirow")
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Unknown load method {method!r}, expected one of {LOAD_METHODS}")
+    return method
+
+
+def _bulk_insert(frame: pd.DataFrame, table: Table, conn, method: str) -> None:
+    if method == "load_data":
+        _load_data_infile(frame, table, conn)
+    else:
+        _insert_multirow(frame, table, conn)
+
+
+def bulk_load(df: pd.DataFrame, table: Table, engine=None,
+              method: Optional[str] = None) -> int:
+    """
+    Append ``df`` to ``table`` (normally a staging table) via the bulk path.
+
+    Args:
+        df: Rows to load; columns missing from ``table`` are ignored
+        table: Target table
+        engine: Target engine (defaults to the analytics engine)
+        method: "load_data" or "multirow"; defaults to BULK_LOAD_METHOD, or
+            LOAD DATA on MySQL and multirow on other dialects
+
+    Returns:
+        The number of rows loaded
+    """
+    engine = engine or analytics_engine
+    method = _resolve_method(engine, method)
+
+    frame = _prepare_frame(df, table)
+    with engine.begin() as conn:
+        _bulk_insert(frame, table, conn, method)
+    return len(frame)
+
+
+def replace_range(df: pd.DataFrame, table: Table, column: str, since,
+                  engine=None, method: Optional[str] = None) -> int:
+    """
+    Replace the rows of ``table`` with ``column >= since`` by ``df``.
+
+    The delete and the bulk insert share one transaction, so readers see
+    either the old or the new rows of the range. Used to re-publish a
+    recomputed trailing window (e.g. the last days of anomalies).
+    """
+    engine = engine or analytics_engine
+    method = _resolve_method(engine, method)
+
+    frame = _prepare_frame(df, table)
+    with engine.begin() as conn:
+        conn.execute(table.delete().where(table.c[column] >= since))
+        if len(frame):
+            _bulk_insert(frame, table, conn, method)
+    return len(frame)
+
+
+def upsert_method(key_columns):
+    """
+    Build a ``DataFrame.to_sql`` insertion method that upserts on the key.
+
+    Each batch becomes one multi-row ``INSERT ... ON DUPLICATE KEY UPDATE``
+    on MySQL (``ON CONFLICT DO UPDATE`` on SQLite) that overwrites every
+    non-key column.
+    """
+    def method(pd_table, conn, keys, data_iter):
+        rows = [dict(zip(keys, row)) for row in data_iter]
+        value_columns = [key for key in keys if key not in key_columns]
+
+        if conn.dialect.name == "mysql":
+            stmt = mysql_insert(pd_table.table).values(rows)
+            stmt = stmt.on_duplicate_key_update(
+                {col: stmt.inserted[col] for col in value_columns})
+        else:
+            stmt = sqlite_insert(pd_table.table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={col: stmt.excluded[col] for col in value_columns})
+
+        return conn.execute(stmt).rowcount
+
+    return method
+
+
+def upsert(df: pd.DataFrame, table: Table, engine=None) -> int:
+    """Insert or update ``df`` in ``table`` on the table's primary key."""
+    engine = engine or analytics_engine
+    key_columns = [column.name for column in table.primary_key]
+    frame = _prepare_frame(df, table)
+    frame.to_sql(
+        table.name,
+        engine,
+        if_exists="append",
+        index=False,
+        chunksize=UPSERT_BATCH_SIZE,
+        method=upsert_method(key_columns),
+    )
+    return len(frame)
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrun',
+            name='chunk_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobrun',
+            name='rows_per_second',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
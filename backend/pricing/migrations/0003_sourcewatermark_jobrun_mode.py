@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0002_jobrun_chunk_size_rows_per_second'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrun',
+            name='mode',
+            field=models.CharField(blank=True, choices=[('FULL', 'Full'), ('INCREMENTAL', 'Incremental')], max_length=20, null=True),
+        ),
+        migrations.CreateModel(
+            name='SourceWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pipeline', models.CharField(max_length=64)),
+                ('table_name', models.CharField(max_length=64)),
+                ('column_name', models.CharField(max_length=64)),
+                ('value', models.CharField(blank=True, max_length=64, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='watermarks', to='pricing.jobrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('pipeline', 'table_name'), name='unique_pipeline_table_watermark')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0003_sourcewatermark_jobrun_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrun',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='pricing.jobrun'),
+        ),
+        migrations.AddField(
+            model_name='jobrun',
+            name='partition',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
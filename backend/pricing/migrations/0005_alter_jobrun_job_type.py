@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0004_jobrun_parent_partition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobrun',
+            name='job_type',
+            field=models.CharField(choices=[('JOB_NIGHTLY_ETL', 'Job Nightly ETL'), ('JOB_MANUAL_ETL', 'Job Manual ETL'), ('JOB_ML_TRAIN', 'Job ML Training'), ('JOB_ML_PREDICT', 'Job ML Prediction'), ('JOB_ANOMALY_DETECTION', 'Job Anomaly Detection')], max_length=50),
+        ),
+    ]
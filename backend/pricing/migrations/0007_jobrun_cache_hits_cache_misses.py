@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0006_alter_jobrun_job_type_competitor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrun',
+            name='cache_hits',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobrun',
+            name='cache_misses',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
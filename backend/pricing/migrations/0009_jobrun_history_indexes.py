@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0008_alter_jobrun_job_type_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['job_type', 'job_status', 'created_at'], name='jobrun_type_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['job_type', 'created_at'], name='jobrun_type_created'),
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['parent', 'created_at'], name='jobrun_parent_created'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-17 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0010_jobrun_celery_task_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('HOUR', 'Hour'), ('DAY', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('job_type', models.CharField(max_length=50)),
+                ('runs', models.PositiveIntegerField()),
+                ('failures', models.PositiveIntegerField()),
+                ('rows_processed', models.BigIntegerField(default=0)),
+                ('duration_p50', models.FloatField(blank=True, null=True)),
+                ('duration_p95', models.FloatField(blank=True, null=True)),
+                ('duration_p99', models.FloatField(blank=True, null=True)),
+                ('rows_per_second', models.FloatField(blank=True, null=True)),
+                ('queue_wait_avg', models.FloatField(blank=True, null=True)),
+                ('queue_wait_p95', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='jobrun',
+            name='enqueued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['finished_at'], name='jobrun_finished'),
+        ),
+        migrations.AddIndex(
+            model_name='jobstats',
+            index=models.Index(fields=['granularity', 'bucket_start'], name='jobstats_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='jobstats',
+            constraint=models.UniqueConstraint(fields=('granularity', 'job_type', 'bucket_start'), name='unique_job_stats_bucket'),
+        ),
+    ]
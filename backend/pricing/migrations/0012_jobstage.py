@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0011_jobstats_jobrun_enqueued_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('name', models.CharField(max_length=64)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('wall_seconds', models.FloatField(default=0.0)),
+                ('cpu_seconds', models.FloatField(default=0.0)),
+                ('rows_in', models.BigIntegerField(default=0)),
+                ('rows_out', models.BigIntegerField(default=0)),
+                ('bytes_read', models.BigIntegerField(default=0)),
+                ('peak_memory_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='pricing.jobrun')),
+            ],
+            options={
+                'ordering': ['job', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('job', 'name'), name='unique_job_stage_name')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0012_jobstage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRunSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('job_type', models.CharField(max_length=50)),
+                ('job_status', models.CharField(max_length=20)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('rows_processed', models.BigIntegerField(default=0)),
+                ('duration_seconds', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'job_type', 'job_status'), name='unique_job_run_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0013_jobrunsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrun',
+            name='source_fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='jobrun',
+            name='job_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCESS', 'Success'), ('FAILED', 'Failed'), ('SKIPPED', 'Skipped')], default='PENDING', max_length=20),
+        ),
+    ]
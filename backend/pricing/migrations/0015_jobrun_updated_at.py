@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0014_jobrun_source_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrun',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
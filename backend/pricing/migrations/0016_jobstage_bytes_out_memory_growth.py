@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 16:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0015_jobrun_updated_at'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='jobstage',
+            old_name='bytes_read',
+            new_name='bytes_out',
+        ),
+        migrations.RenameField(
+            model_name='jobstage',
+            old_name='peak_memory_bytes',
+            new_name='memory_growth_bytes',
+        ),
+    ]
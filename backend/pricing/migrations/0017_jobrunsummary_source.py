@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0016_jobstage_bytes_out_memory_growth'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='jobrunsummary',
+            name='unique_job_run_summary',
+        ),
+        migrations.AddField(
+            model_name='jobrunsummary',
+            name='source',
+            field=models.CharField(choices=[('pricing.JobRun', 'Job runs'), ('task_manager.Job', 'Task runs')], default='pricing.JobRun', max_length=32),
+        ),
+        migrations.AddConstraint(
+            model_name='jobrunsummary',
+            constraint=models.UniqueConstraint(fields=('day', 'source', 'job_type', 'job_status'), name='unique_job_run_summary'),
+        ),
+    ]
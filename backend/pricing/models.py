@@ -9,24 +9,218 @@ class JobRun(models.Model):
         ("JOB_MANUAL_ETL", "Job Manual ETL"),
         ("JOB_ML_TRAIN", "Job ML Training"),
         ("JOB_ML_PREDICT", "Job ML Prediction"),
+        ("JOB_ANOMALY_DETECTION", "Job Anomaly Detection"),
+        ("JOB_COMPETITOR_INDEX", "Job Competitor Index"),
+        ("JOB_AGGREGATES", "Job Aggregates"),
     ]
+    # Job types of (top-level) product ETL runs
+    PRODUCT_ETL_JOB_TYPES = ("JOB_NIGHTLY_ETL", "JOB_MANUAL_ETL")
 
     JOB_STATUS = [
         ("PENDING", "Pending"),
         ("RUNNING", "Running"),
         ("SUCCESS", "Success"),
         ("FAILED", "Failed"),
+        # Scheduled run that found the source unchanged since the last success
+        ("SKIPPED", "Skipped"),
     ]
 
-    celery_task_id = models.CharField(max_length=255, blank=True, null=True)
+    ETL_MODES = [
+        ("FULL", "Full"),
+        ("INCREMENTAL", "Incremental"),
+    ]
+
+    celery_task_id = models.CharField(
+        max_length=255, blank=True, null=True, db_index=True)
+    # Partitioned runs: one child JobRun per partition, linked to the parent
+    parent = models.ForeignKey(
+        "self", on_delete=models.CASCADE, blank=True, null=True,
+        related_name="children")
+    partition = models.CharField(max_length=255, blank=True, null=True)
     job_type = models.CharField(max_length=50, choices=JOB_TYPES)
     job_status = models.CharField(
         max_length=20, choices=JOB_STATUS, default="PENDING")
+    mode = models.CharField(
+        max_length=20, choices=ETL_MODES, blank=True, null=True)
+    # When the task was published (set from its enqueued_at header), for queue wait
+    enqueued_at = models.DateTimeField(blank=True, null=True)
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(blank=True, null=True)
     rows_processed = models.IntegerField(blank=True, null=True)
+    chunk_size = models.PositiveIntegerField(blank=True, null=True)
+    # Source snapshot partitions served from / missing in the local cache
+    cache_hits = models.PositiveIntegerField(blank=True, null=True)
+    cache_misses = models.PositiveIntegerField(blank=True, null=True)
+    rows_per_second = models.FloatField(blank=True, null=True)
+    # etl.source_fingerprint() at the start of the run
+    source_fingerprint = models.CharField(max_length=64, blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Every save; partial saves must list it in update_fields. Part of the
+    # ETag of the job listings
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Job history is listed newest first, filtered by type/status or
+        # limited to top-level runs (InnoDB appends the id to every index,
+        # which covers the (created_at, id) keyset order)
+        indexes = [
+            models.Index(fields=["job_type", "job_status", "created_at"],
+                         name="jobrun_type_status_created"),
+            models.Index(fields=["job_type", "created_at"],
+                         name="jobrun_type_created"),
+            models.Index(fields=["parent", "created_at"],
+                         name="jobrun_parent_created"),
+            # runs finished since the last JobStats refresh
+            models.Index(fields=["finished_at"], name="jobrun_finished"),
+        ]
 
     def __str__(self):
         return f"JobRun {self.job_type} [{self.job_status}] - {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
+class JobStage(models.Model):
+    """
+    Totals of one stage (extract, transform, load, ...) of a run, recorded
+    by ``pricing.stages.StageRecorder``. ``calls`` counts the blocks (e.g.
+    chunks) the stage ran for.
+    """
+
+    job = models.ForeignKey(
+        JobRun, on_delete=models.CASCADE, related_name="stages")
+    position = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=64)
+    calls = models.PositiveIntegerField(default=0)
+    wall_seconds = models.FloatField(default=0.0)
+    cpu_seconds = models.FloatField(default=0.0)
+    rows_in = models.BigIntegerField(default=0)
+    rows_out = models.BigIntegerField(default=0)
+    # in-memory (DataFrame) size of the rows the stage produced
+    bytes_out = models.BigIntegerField(default=0)
+    # largest growth of RSS (or, when traced, of allocations) over one block
+    memory_growth_bytes = models.BigIntegerField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["job", "position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "name"],
+                name="unique_job_stage_name"
+            ),
+        ]
+
+    def __str__(self):
+        return f"JobStage {self.name} of JobRun {self.job_id}"
+
+
+class JobStats(models.Model):
+    """
+    Rollup of the finished top-level runs of one job type created in one hour
+    or day (server time zone), maintained by ``pricing.job_stats``.
+
+    Durations and queue waits are in seconds; ``rows_per_second`` is the
+    throughput of the successful runs.
+    """
+
+    GRANULARITIES = [
+        ("HOUR", "Hour"),
+        ("DAY", "Day"),
+    ]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField()
+    job_type = models.CharField(max_length=50)
+    runs = models.PositiveIntegerField()
+    failures = models.PositiveIntegerField()
+    rows_processed = models.BigIntegerField(default=0)
+    duration_p50 = models.FloatField(blank=True, null=True)
+    duration_p95 = models.FloatField(blank=True, null=True)
+    duration_p99 = models.FloatField(blank=True, null=True)
+    rows_per_second = models.FloatField(blank=True, null=True)
+    queue_wait_avg = models.FloatField(blank=True, null=True)
+    queue_wait_p95 = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "job_type", "bucket_start"],
+                name="unique_job_stats_bucket"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["granularity", "bucket_start"],
+                         name="jobstats_bucket"),
+        ]
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.runs if self.runs else 0.0
+
+    def __str__(self):
+        return f"JobStats {self.job_type} {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
+class JobRunSummary(models.Model):
+    """
+    Purged runs of one history, job type and status created on one day
+    (server time zone), see ``pricing.retention``. ``duration_seconds`` is
+    their total run time.
+    """
+
+    SOURCES = [
+        ("pricing.JobRun", "Job runs"),
+        ("task_manager.Job", "Task runs"),
+    ]
+
+    day = models.DateField()
+    # Label of the purged model: both histories share job types
+    source = models.CharField(max_length=32, choices=SOURCES, default="pricing.JobRun")
+    job_type = models.CharField(max_length=50)
+    job_status = models.CharField(max_length=20)
+    runs = models.PositiveIntegerField(default=0)
+    rows_processed = models.BigIntegerField(default=0)
+    duration_seconds = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "source", "job_type", "job_status"],
+                name="unique_job_run_summary"
+            ),
+        ]
+
+    def __str__(self):
+        return (f"JobRunSummary {self.day} {self.source} {self.job_type}"
+                f" [{self.job_status}]: {self.runs}")
+
+
+class SourceWatermark(models.Model):
+    """
+    High-water mark of one source table as seen by one pipeline.
+
+    ``value`` is the MAX() of ``column_name`` (``updated_at`` or ``dt``) at the
+    start of the last successful run, so the next incremental run only has
+    to extract rows beyond it.
+    """
+
+    pipeline = models.CharField(max_length=64)
+    table_name = models.CharField(max_length=64)
+    column_name = models.CharField(max_length=64)
+    value = models.CharField(max_length=64, blank=True, null=True)
+    job_run = models.ForeignKey(
+        JobRun, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name="watermarks")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pipeline", "table_name"],
+                name="unique_pipeline_table_watermark"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.pipeline}: {self.table_name}.{self.column_name} = {self.value}"
@@ -0,0 +1,135 @@
+"""
+Keyset (cursor) pagination over job history, newest first.
+
+Pages are ordered by ``(created_at, id)`` descending and the cursor is the
+position of the last row of the previous page, so every page is an index
+range scan of ``limit`` rows however deep the client pages, instead of an
+OFFSET that reads and discards all the rows before it. Used for ``JobRun``
+and ``task_manager.Job``; both carry ``(job_type, job_status, created_at)``
+indexes for the filtered listings.
+
+Usage:
+    jobs = filter_jobs(JobRun.objects.all(), request.query_params)
+    rows, next_cursor = keyset_page(jobs, cursor, limit)
+    # or serialized rows straight from .values_list(), see value_serializers
+    rows, next_cursor = keyset_page(jobs, cursor, limit, serialize=JOB_VALUES.serialize)
+"""
+
+import base64
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(row) -> str:
+    """
+    Opaque cursor pointing just past ``row``: a model instance, or a dict
+    with the ``created_at`` (a datetime or ISO 8601 string) and the ``id``,
+    such as a ``.values()`` or serialized row.
+    """
+    if isinstance(row, dict):
+        created_at = row["created_at"]
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        position = json.dumps([created_at, row["id"]])
+    else:
+        position = json.dumps([row.created_at.isoformat(), row.pk])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """``(created_at, id)`` of a cursor from ``encode_cursor``; ValueError if malformed."""
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+    except (TypeError, ValueError):
+        raise ValueError("invalid cursor") from None
+    if created_at is None or not isinstance(pk, int):
+        raise ValueError("invalid cursor")
+    return created_at, pk
+
+
+def parse_time(value: str, name: str):
+    """
+    Aware datetime of a query parameter: an ISO 8601 datetime, or a date
+    (midnight, server time zone). ValueError names ``name`` if invalid.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_limit(value) -> int:
+    """Page size from a query parameter, capped at MAX_PAGE_SIZE."""
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+        if limit <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a positive integer") from None
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def filter_jobs(queryset, params):
+    """
+    Apply the ``job_type``, ``job_status``, ``created_after`` (inclusive) and
+    ``created_before`` (exclusive) filters of ``params`` to a job queryset.
+
+    Raises:
+        ValueError: a filter value is not valid for the queryset's model
+    """
+    model = queryset.model
+    for name, choices in (("job_type", model.JOB_TYPES), ("job_status", model.JOB_STATUS)):
+        value = params.get(name)
+        if not value:
+            continue
+        if value not in dict(choices):
+            raise ValueError(f"{name} must be one of {list(dict(choices))}")
+        queryset = queryset.filter(**{name: value})
+
+    if params.get("created_after"):
+        queryset = queryset.filter(
+            created_at__gte=parse_time(params["created_after"], "created_after"))
+    if params.get("created_before"):
+        queryset = queryset.filter(
+            created_at__lt=parse_time(params["created_before"], "created_before"))
+    return queryset
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, serialize=list):
+    """
+    One page of ``queryset``, newest first. ``serialize`` turns the sliced
+    queryset into the rows, model instances by default (see encode_cursor).
+
+    Returns:
+        ``(rows, next_cursor)``; ``next_cursor`` is None on the last page
+
+    Raises:
+        ValueError: ``cursor`` is malformed
+    """
+    queryset = queryset.order_by("-created_at", "-id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        # (created_at, id) < (cursor): the created_at bound keeps this a range scan
+        queryset = queryset.filter(created_at__lte=created_at).exclude(
+            created_at=created_at, id__gte=pk)
+
+    rows = serialize(queryset[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,47 @@
+"""
+JSON renderer backed by orjson.
+
+A drop-in for DRF's JSONRenderer on the hot list endpoints: same media type
+and compact output, several times faster on large pages. Values that are
+not JSON types are written as by DRF's encoder: datetimes in ISO 8601 ("Z"
+for UTC) and raw Decimals as numbers, so a page renders the same with
+either renderer. Rows from ``pricing.value_serializers`` are plain JSON
+already (their Decimals are strings, as with the serializers).
+
+Usage:
+    @api_view(["GET"])
+    @renderer_classes(FAST_RENDERERS)
+    def list_things(request): ...
+"""
+
+from decimal import Decimal
+
+import orjson
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Promise):
+        # lazy translations, e.g. in validation errors
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_default, option=OPTIONS)
+
+
+# Renderers of the endpoints that opt in; the browsable API stays available
+FAST_RENDERERS = [ORJSONRenderer, BrowsableAPIRenderer]
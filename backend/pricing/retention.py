@@ -0,0 +1,118 @@
+"""
+Retention of the JobRun and task_manager Job histories.
+
+Top-level runs older than the retention window of their job type
+(JOB_RETENTION_DAYS) are first rolled up into JobRunSummary rows (runs, rows
+and run time per day, history, job type and status) and then deleted
+together with their partitions and stages. Deletion goes in batches of ``batch_size``
+primary keys, each rolled up and deleted in its own short transaction, so
+the table is never locked for long and an interrupted purge loses nothing:
+every run is either still there or already counted in its summary.
+
+Usage:
+    purge_job_runs()                      # the nightly beat task
+    purge_job_runs(batch_size=500, pause=0.1)
+"""
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from task_manager.models import Job
+
+from .models import JobRun, JobRunSummary
+
+DEFAULT_BATCH_SIZE = 1000
+# Histories purged by purge_job_runs, each summarized under its model label
+RETAINED_MODELS = (JobRun, Job)
+
+
+@dataclass
+class PurgeStats:
+    runs: int = 0       # top-level runs rolled up and deleted
+    deleted: int = 0    # rows deleted, including partitions and stages
+    batches: int = 0
+
+
+def retention_days(job_type: str) -> int:
+    """Days of history kept for ``job_type``."""
+    windows = settings.JOB_RETENTION_DAYS
+    return windows.get(job_type, windows["default"])
+
+
+def _summarize(runs) -> dict:
+    """(day, job_type, job_status) -> [runs, rows_processed, duration_seconds]."""
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for created_at, job_type, job_status, rows, started_at, finished_at in runs:
+        total = totals[(timezone.localdate(created_at), job_type, job_status)]
+        total[0] += 1
+        total[1] += rows or 0
+        if started_at and finished_at:
+            total[2] += (finished_at - started_at).total_seconds()
+    return totals
+
+
+def _roll_up(totals: dict, source: str) -> None:
+    for (day, job_type, job_status), (runs, rows, seconds) in totals.items():
+        summary, _ = JobRunSummary.objects.get_or_create(
+            day=day, source=source, job_type=job_type, job_status=job_status)
+        JobRunSummary.objects.filter(pk=summary.pk).update(
+            runs=F("runs") + runs,
+            rows_processed=F("rows_processed") + rows,
+            duration_seconds=F("duration_seconds") + seconds,
+        )
+
+
+def purge_job_type(job_type: str, cutoff: datetime,
+                   batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0,
+                   stats: Optional[PurgeStats] = None, model=JobRun) -> PurgeStats:
+    """
+    Roll up and delete the top-level ``job_type`` runs of ``model`` (JobRun
+    or task_manager's Job) created before ``cutoff``.
+    """
+    stats = stats or PurgeStats()
+    expired = model.objects.filter(job_type=job_type, created_at__lt=cutoff)
+    if model is JobRun:
+        # partitions are deleted with their parent run
+        expired = expired.filter(parent__isnull=True)
+
+    last_id = 0
+    while True:
+        ids = list(expired.filter(pk__gt=last_id).order_by("pk")
+                   .values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return stats
+
+        batch = expired.filter(pk__gte=ids[0], pk__lte=ids[-1])
+        with transaction.atomic():
+            _roll_up(_summarize(batch.values_list(
+                "created_at", "job_type", "job_status", "rows_processed",
+                "started_at", "finished_at")), model._meta.label)
+            deleted, _ = batch.delete()
+
+        stats.runs += len(ids)
+        stats.deleted += deleted
+        stats.batches += 1
+        last_id = ids[-1]
+        if pause:
+            # Let other writers at the table between batches
+            time.sleep(pause)
+
+
+def purge_job_runs(batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0,
+                   now: Optional[datetime] = None) -> PurgeStats:
+    """Apply the retention window of every job type to both histories."""
+    now = now or timezone.now()
+    stats = PurgeStats()
+    for model in RETAINED_MODELS:
+        for job_type, _ in model.JOB_TYPES:
+            cutoff = now - timedelta(days=retention_days(job_type))
+            purge_job_type(job_type, cutoff, batch_size, pause, stats, model)
+    return stats
@@ -1,8 +1,82 @@
+from django.db.models import Count, Q, Sum
 from rest_framework import serializers
-from .models import JobRun
+from .models import JobRun, JobStage, JobStats
+from .value_serializers import ValuesSerializer
+
+
+# Aggregates over a run's children, used to annotate JobRun querysets
+CHILD_PROGRESS_ANNOTATIONS = {
+    "partitions_total": Count("children"),
+    "partitions_done": Count("children", filter=Q(children__job_status="SUCCESS")),
+    "partitions_failed": Count("children", filter=Q(children__job_status="FAILED")),
+    "children_rows": Sum("children__rows_processed"),
+}
+
+
+class JobStageSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = JobStage
+        exclude = ["id", "job", "position"]
 
 
 class JobRunSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    stages = JobStageSerializer(many=True, read_only=True)
+
     class Meta:
         model = JobRun
         fields = "__all__"
+
+    def get_progress(self, obj):
+        """Aggregated progress over the partitions of a partitioned run."""
+        if hasattr(obj, "partitions_total"):
+            totals = {key: getattr(obj, key)
+                      for key in CHILD_PROGRESS_ANNOTATIONS}
+        else:
+            totals = JobRun.objects.filter(pk=obj.pk).aggregate(
+                **CHILD_PROGRESS_ANNOTATIONS)
+        return _progress(totals)
+
+
+def _progress(totals: dict):
+    if not totals["partitions_total"]:
+        return None
+    return {
+        "partitions_total": totals["partitions_total"],
+        "partitions_done": totals["partitions_done"],
+        "partitions_failed": totals["partitions_failed"],
+        "rows_processed": totals["children_rows"] or 0,
+    }
+
+
+JOB_RUN_VALUES = ValuesSerializer(JobRun)
+JOB_STAGE_VALUES = ValuesSerializer(JobStage, [
+    field.name for field in JobStage._meta.concrete_fields
+    if field.name not in JobStageSerializer.Meta.exclude])
+
+
+def serialize_job_runs(queryset) -> list:
+    """
+    What ``JobRunSerializer(queryset, many=True).data`` returns, built from
+    value rows: one query for the runs (annotated with
+    CHILD_PROGRESS_ANNOTATIONS) and one for their stages.
+    """
+    runs = JOB_RUN_VALUES.serialize(queryset, *CHILD_PROGRESS_ANNOTATIONS)
+    stages = {}
+    for stage in JOB_STAGE_VALUES.serialize(
+            JobStage.objects.filter(job__in=[run["id"] for run in runs]), "job_id"):
+        stages.setdefault(stage.pop("job_id"), []).append(stage)
+
+    for run in runs:
+        run["progress"] = _progress({key: run.pop(key) for key in CHILD_PROGRESS_ANNOTATIONS})
+        run["stages"] = stages.get(run["id"], [])
+    return runs
+
+
+class JobStatsSerializer(serializers.ModelSerializer):
+    failure_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = JobStats
+        exclude = ["id", "updated_at"]
@@ -0,0 +1,253 @@
+"""
+Local columnar snapshots of source tables.
+
+Most of the source history never changes between runs, yet every full ETL
+run used to pull all of it from MySQL again. SnapshotCache keeps extracted
+tables on local disk as Arrow IPC files, one per partition (a calendar month
+of ``dt`` for the fact tables, the whole table for small dimension tables),
+named after a fingerprint of the partition's source rows. A run first asks
+the source DB for the fingerprints, which is a cheap GROUP BY, and only
+re-extracts the partitions whose fingerprint changed; the others are read
+back from memory-mapped files. Partitions are written and read back one
+record batch at a time, so a month never has to fit in memory at once.
+
+The cache is enabled by setting SOURCE_SNAPSHOT_DIR; without it every
+extract goes to the source DB as before. Files beyond
+SOURCE_SNAPSHOT_MAX_BYTES or older than SOURCE_SNAPSHOT_MAX_AGE_DAYS (by
+last use) are evicted after every run.
+
+Usage:
+    cache = default_snapshot_cache()
+    for prices in cache.read(DAILY_PRICES_SNAPSHOT):
+        ...
+    cache.evict()
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+from .db import source_engine
+
+SNAPSHOT_DIR = os.getenv("SOURCE_SNAPSHOT_DIR")
+SNAPSHOT_MAX_BYTES = int(os.getenv("SOURCE_SNAPSHOT_MAX_BYTES", 5 * 1024 ** 3))
+SNAPSHOT_MAX_AGE_DAYS = float(os.getenv("SOURCE_SNAPSHOT_MAX_AGE_DAYS", 14))
+
+SNAPSHOT_SUFFIX = ".arrow"
+# Rows per record batch of a snapshot, and per frame read back
+DEFAULT_BATCH_SIZE = 50_000
+
+
+@dataclass(frozen=True)
+class SnapshotTable:
+    """
+    A source extract that can be snapshotted.
+
+    ``select`` is the extract query without a WHERE clause; for tables
+    partitioned by month, a condition on the month range of ``dt_column`` is
+    appended to it. ``fingerprint`` returns the rows whose digest
+    identifies the table's content: one row per day (with a ``dt`` column)
+    for partitioned tables, a single row otherwise.
+    """
+
+    name: str
+    select: str
+    fingerprint: str
+    dt_column: Optional[str] = None
+    parse_dates: tuple = ()
+
+    def partition_query(self, partition: str):
+        if self.dt_column is None:
+            return text(self.select), None
+        start = pd.Period(partition, freq="M")
+        return (
+            text(f"{self.select} WHERE {self.dt_column} >= :part_from"
+                 f" AND {self.dt_column} < :part_to"),
+            {"part_from": start.start_time.strftime("%Y-%m-%d"),
+             "part_to": (start + 1).start_time.strftime("%Y-%m-%d")},
+        )
+
+
+DAILY_PRICES_SNAPSHOT = SnapshotTable(
+    name="daily_prices",
+    select="""
+        SELECT dt, sales_org_id, customer_id, material_id, net_price AS price
+        FROM daily_prices""",
+    # daily_prices has no updated_at; count, sum and max id per day change
+    # with any insert, update or reload of that day
+    fingerprint="""
+        SELECT dt, COUNT(*) AS n, SUM(net_price) AS total, MAX(price_id) AS last_id
+        FROM daily_prices GROUP BY dt ORDER BY dt""",
+    dt_column="dt",
+    parse_dates=("dt",),
+)
+
+MATERIALS_SNAPSHOT = SnapshotTable(
+    name="materials",
+    select="SELECT material_id, sku, material_group FROM materials",
+    fingerprint="""
+        SELECT COUNT(*) AS n, MAX(material_id) AS last_id, MAX(updated_at) AS updated
+        FROM materials""",
+)
+
+MATERIAL_COSTS_SNAPSHOT = SnapshotTable(
+    name="material_costs",
+    select="SELECT material_id, plant_id, cost, valid_from, valid_to FROM material_costs",
+    # parsed even when a batch has no end date, so every batch has one schema
+    parse_dates=("valid_from", "valid_to"),
+    fingerprint="""
+        SELECT COUNT(*) AS n, MAX(cost_id) AS last_id, MAX(updated_at) AS updated,
+               SUM(cost) AS total
+        FROM material_costs""",
+)
+
+
+def _digest(frame: pd.DataFrame) -> str:
+    # fingerprint rows are few (a month of days at most), so text is fine
+    return hashlib.sha1(frame.to_csv(index=False).encode()).hexdigest()[:16]
+
+
+def table_fingerprints(spec: SnapshotTable, engine=None) -> dict:
+    """Return ``{partition: fingerprint}`` of ``spec`` in the source DB."""
+    rows = pd.read_sql(text(spec.fingerprint), engine or source_engine)
+    if spec.dt_column is None:
+        return {"all": _digest(rows)}
+    months = pd.to_datetime(rows["dt"]).dt.strftime("%Y-%m")
+    return {month: _digest(days) for month, days in rows.groupby(months, sort=True)}
+
+
+def _write_arrow(chunks: Iterator[pd.DataFrame], path: Path) -> Iterator[pd.DataFrame]:
+    """
+    Write ``chunks`` to ``path`` as the record batches of one Arrow file,
+    yielding each chunk once it is written. The file appears under ``path``
+    only once complete: it is written to a temporary file of its own, so
+    writers sharing the directory never clobber each other's.
+    """
+    import pyarrow as pa
+
+    with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False) as tmp:
+        pass
+    writer = None
+    try:
+        with pa.OSFile(tmp.name, "wb") as sink:
+            for chunk in chunks:
+                if writer is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield chunk
+            if writer is None:
+                return  # no rows, nothing worth caching
+            writer.close()
+        # readers never see a partially written snapshot
+        os.replace(tmp.name, path)
+    finally:
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+
+
+def _read_arrow(path: Path, batch_size: int) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a snapshot, at most ``batch_size`` at a time."""
+    import pyarrow as pa
+
+    with pa.memory_map(str(path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            # snapshots written with a larger chunk size are sliced (zero-copy)
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size).to_pandas()
+
+
+class SnapshotCache:
+    """Arrow snapshots of source table partitions, with hit/miss counts."""
+
+    def __init__(self, root=None, engine=None):
+        self.root = Path(root or SNAPSHOT_DIR)
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprints(self, spec: SnapshotTable) -> dict:
+        """Return ``{partition: fingerprint}`` of ``spec`` in the source DB."""
+        return table_fingerprints(spec, self.engine)
+
+    def path(self, spec: SnapshotTable, partition: str, fingerprint: str) -> Path:
+        return self.root / spec.name / f"{partition}.{fingerprint}{SNAPSHOT_SUFFIX}"
+
+    def read_partition(self, spec: SnapshotTable, partition: str, fingerprint: str,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Yield one partition from its snapshot in frames of at most
+        ``batch_size`` rows, extracting it (in batches too) on a miss.
+        """
+        path = self.path(spec, partition, fingerprint)
+        if path.exists():
+            self.hits += 1
+            os.utime(path)  # eviction goes by last use
+            yield from _read_arrow(path, batch_size)
+            return
+
+        self.misses += 1
+        query, params = spec.partition_query(partition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with (self.engine or source_engine).connect() as conn:
+            chunks = pd.read_sql(
+                query, conn.execution_options(stream_results=True), params=params,
+                parse_dates=list(spec.parse_dates), chunksize=batch_size)
+            yield from _write_arrow(chunks, path)
+        # older snapshots of the partition are stale now
+        for stale in path.parent.glob(f"{partition}.*{SNAPSHOT_SUFFIX}"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+
+    def read(self, spec: SnapshotTable,
+             batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """Yield every partition of ``spec`` in batches, oldest month first."""
+        for partition, fingerprint in self.fingerprints(spec).items():
+            yield from self.read_partition(spec, partition, fingerprint, batch_size)
+
+    def read_all(self, spec: SnapshotTable) -> pd.DataFrame:
+        """The whole of a (small) table, e.g. a dimension table."""
+        parts = list(self.read(spec))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def evict(self, max_bytes: int = SNAPSHOT_MAX_BYTES,
+              max_age_days: float = SNAPSHOT_MAX_AGE_DAYS) -> int:
+        """
+        Delete snapshots unused for ``max_age_days``, then the least recently
+        used ones until the cache fits in ``max_bytes``.
+
+        Returns:
+            The number of files deleted
+        """
+        files = sorted(
+            ((path.stat().st_mtime, path.stat().st_size, path)
+             for path in self.root.glob(f"*/*{SNAPSHOT_SUFFIX}")),
+            key=lambda entry: entry[0],
+        )
+        cutoff = time.time() - max_age_days * 86400
+        total = sum(size for _, size, _ in files)
+
+        deleted = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            deleted += 1
+        return deleted
+
+
+def default_snapshot_cache() -> Optional[SnapshotCache]:
+    """A SnapshotCache under SOURCE_SNAPSHOT_DIR, or None when it is unset."""
+    return SnapshotCache() if SNAPSHOT_DIR else None
@@ -0,0 +1,131 @@
+"""
+Per-stage instrumentation of pipeline runs.
+
+A StageRecorder accumulates, per named stage (``extract``, ``transform``,
+``load``, ...), the wall time, CPU time, rows in/out, in-memory size of the
+frames produced and memory growth of every ``with recorder.stage(name):``
+block. Streaming pipelines
+enter the same stage once per chunk, so the totals answer "which stage did
+this run spend its time in" even though the stages interleave.
+
+Memory growth is the largest growth over a single block of the stage: by
+default how much the process' resident set grew from the block's start to
+its end (Linux only), or with ETL_TRACE_MEMORY the tracemalloc peak of the
+block's own allocations, which also catches memory freed before the block
+ends but slows allocation-heavy pandas code down noticeably. Both are per
+block, so a worker that ran a big task before still reports small stages
+as small.
+
+Usage:
+    stages = StageRecorder()
+    for chunk in stages.iterate("extract", chunks):
+        with stages.stage("transform", rows_in=len(chunk)) as span:
+            features = transform(chunk)
+            span.rows_out += len(features)
+
+The recorder of an ETL run is ``EtlStats.stages``; the tasks store it as the
+JobStage rows of the run's JobRun. This module does not need Django, so the
+benchmarks can use it.
+"""
+
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+# Trace Python allocations per stage (slow) instead of sampling peak RSS
+TRACE_MEMORY = os.getenv("ETL_TRACE_MEMORY", "").lower() in ("1", "true", "yes")
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, None where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """In-memory size of ``df``'s columns (not deep, so cheap for object columns)."""
+    return int(df.memory_usage(index=False).sum())
+
+
+@dataclass
+class StageStats:
+    """Totals over every block of one stage."""
+
+    name: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    # in-memory size of the frames the stage produced
+    bytes_out: int = 0
+    # largest memory growth over one block
+    memory_growth_bytes: Optional[int] = None
+
+    def _growth(self, value: Optional[int]) -> None:
+        if value is not None:
+            self.memory_growth_bytes = max(self.memory_growth_bytes or 0, value)
+
+
+@dataclass
+class StageRecorder:
+    """StageStats per stage name, in the order the stages were first entered."""
+
+    trace_memory: bool = TRACE_MEMORY
+    stages: dict = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = 0) -> Iterator[StageStats]:
+        """
+        Time one block of stage ``name``; the yielded StageStats takes the
+        block's ``rows_out`` / ``bytes_out``. Stages must not be nested.
+        """
+        stats = self.stages.setdefault(name, StageStats(name))
+        stats.rows_in += rows_in
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        traced = tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+        rss = None if self.trace_memory else rss_bytes()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.calls += 1
+            stats.wall_seconds += time.perf_counter() - wall
+            stats.cpu_seconds += time.process_time() - cpu
+            if self.trace_memory:
+                stats._growth(tracemalloc.get_traced_memory()[1] - traced)
+                if tracing:
+                    tracemalloc.stop()
+            elif rss is not None:
+                stats._growth(max(0, rss_bytes() - rss))
+
+    def iterate(self, name: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Yield ``chunks``, timing the production of every chunk as stage ``name``."""
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name) as stats:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    stats.rows_out += len(chunk)
+                    stats.bytes_out += frame_bytes(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    def __iter__(self) -> Iterator[StageStats]:
+        return iter(self.stages.values())
+
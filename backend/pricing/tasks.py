@@ -1,10 +1,29 @@
-from celery import shared_task
+from celery import chord, shared_task
 import time
-import pandas as pd
-from sqlalchemy import text
-from .db import source_engine, analytics_engine
-from .models import JobRun
+from .aggregations import AGGREGATIONS, materialize
+from .anomalies import detect_price_anomalies
+from .competitor_index import (
+    COMPETITOR_INDEX_PIPELINE, COMPETITOR_INDEX_SOURCES,
+    incremental_since, refresh_competitor_index,
+)
+from .feature_cache import publish_version
+from .job_stats import refresh_job_stats
+from .retention import DEFAULT_BATCH_SIZE, purge_job_runs
+from .etl import (
+    DEFAULT_CHUNK_SIZE, PRODUCT_ETL_PIPELINE, PRODUCT_ETL_SOURCES,
+    PRODUCT_ETL_WATERMARK_COLUMNS, WATERMARK_COLUMNS, features_table,
+    load_product_features, partition_label, plan_partitions,
+    read_high_water_marks, run_product_etl, source_fingerprint,
+)
+from .loaders import (
+    create_staging_table, drop_staging_table, ensure_table, staging_table,
+    swap_in,
+)
+from .models import JobRun, JobStage
+from .snapshots import default_snapshot_cache
+from .watermarks import get_watermarks, save_watermarks
 from django.utils import timezone
+from task_manager.singleflight import claim, flight_key, land
 
 
 @shared_task
@@ -14,89 +33,425 @@ def test_task(duration):
     return f"-- Task test, slept for {duration} seconds"
 
 
+def _finish_job(job: JobRun, rows: int, rows_per_second: float) -> None:
+    job.job_status = "SUCCESS"
+    job.rows_processed = rows
+    job.rows_per_second = rows_per_second
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def _fail_job(job: JobRun, exc: Exception) -> None:
+    job.job_status = "FAILED"
+    job.error_message = str(exc)
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def _record_cache_stats(job: JobRun, stats) -> None:
+    """Copy the snapshot cache counts of ``stats`` if a cache was used."""
+    if stats.cache_hits or stats.cache_misses:
+        job.cache_hits = stats.cache_hits
+        job.cache_misses = stats.cache_misses
+
+
+def _record_stages(job: JobRun, stats) -> None:
+    """Store the per-stage totals of ``stats`` as the JobStage rows of ``job``."""
+    JobStage.objects.bulk_create(
+        JobStage(job=job, position=position, **vars(stage))
+        for position, stage in enumerate(stats.stages))
+
+
+def _progress_reporter(job: JobRun):
+    """Return an EtlStats callback that writes running totals to ``job``."""
+    def report_progress(stats):
+        job.rows_processed = stats.rows
+        job.rows_per_second = stats.rows_per_second
+        job.save(update_fields=["rows_processed", "rows_per_second", "updated_at"])
+    return report_progress
+
+
+def _last_source_fingerprint():
+    """Source fingerprint of the last successful product ETL run, if any."""
+    return (
+        JobRun.objects
+        .filter(job_type__in=JobRun.PRODUCT_ETL_JOB_TYPES, parent__isnull=True,
+                job_status="SUCCESS")
+        .order_by("-created_at", "-id")
+        .values_list("source_fingerprint", flat=True)
+        .first()
+    )
+
+
+def _run_product_etl_job(task_id: str, job_type: str, chunk_size: int,
+                         mode: str, skip_unchanged: bool = False) -> dict:
+    """
+    Run the streaming product ETL and track it as a JobRun.
+
+    INCREMENTAL runs fall back to FULL until every source table has a stored
+    high-water mark (i.e. on the very first run). With ``skip_unchanged``,
+    a run whose source fingerprint equals the one of the last successful
+    run only records a SKIPPED JobRun.
+    """
+    since = None
+    if mode == "INCREMENTAL":
+        since = get_watermarks(PRODUCT_ETL_PIPELINE, PRODUCT_ETL_SOURCES,
+                               PRODUCT_ETL_WATERMARK_COLUMNS)
+    mode = "FULL" if since is None else "INCREMENTAL"
+
+    fingerprint = None
+    if skip_unchanged:
+        fingerprint = source_fingerprint()
+        if fingerprint == _last_source_fingerprint():
+            now = timezone.now()
+            job = JobRun.objects.create(
+                job_type=job_type,
+                job_status="SKIPPED",
+                mode=mode,
+                celery_task_id=task_id,
+                started_at=now,
+                finished_at=now,
+                rows_processed=0,
+                source_fingerprint=fingerprint,
+            )
+            return {"mode": mode, "skipped": True, "job_run_id": job.id}
+
+    job = JobRun.objects.create(
+        job_type=job_type,
+        job_status="RUNNING",
+        mode=mode,
+        celery_task_id=task_id,
+        started_at=timezone.now(),
+        chunk_size=chunk_size,
+        source_fingerprint=fingerprint,
+    )
+
+    try:
+        # Read the fingerprint and the new marks before extracting, so rows
+        # that arrive during the run are picked up again by the next one.
+        if job.source_fingerprint is None:
+            job.source_fingerprint = source_fingerprint()
+        marks = read_high_water_marks(
+            PRODUCT_ETL_SOURCES, columns=PRODUCT_ETL_WATERMARK_COLUMNS)
+        stats = run_product_etl(chunk_size=chunk_size,
+                                on_chunk=_progress_reporter(job), since=since)
+        save_watermarks(PRODUCT_ETL_PIPELINE, marks,
+                        PRODUCT_ETL_WATERMARK_COLUMNS, job)
+        _record_cache_stats(job, stats)
+        _record_stages(job, stats)
+        _finish_job(job, stats.rows, stats.rows_per_second)
+        publish_version(job.id)
+
+        return {
+            "mode": job.mode,
+            "rows_written": stats.rows,
+            "chunks": stats.chunks,
+            "rows_per_second": round(stats.rows_per_second, 1),
+            "cache_hits": stats.cache_hits,
+            "cache_misses": stats.cache_misses,
+        }
+    except Exception as exc:
+        _fail_job(job, exc)
+        raise
+
+
+# Single-flight key of product ETL runs, whatever their mode: a FULL run
+# swaps a rebuilt table in, which would drop the upserts of an INCREMENTAL
+# run beside it, and both write the pipeline's watermarks. A trigger during
+# a run joins it (or queues a follow-up with its own mode).
+PRODUCT_ETL_FLIGHT_KEY = flight_key(PRODUCT_ETL_PIPELINE)
+
+
+def _run_product_etl_once(task_id: str, job_type: str, chunk_size: int,
+                          mode: str, skip_unchanged: bool = False) -> dict:
+    """
+    Run the product ETL unless an equivalent run is already in flight, in
+    which case only that run's task id is returned (no JobRun is created).
+    """
+    key = PRODUCT_ETL_FLIGHT_KEY
+    in_flight = claim(key, task_id)
+    if in_flight:
+        return {"coalesced_with": in_flight}
+    try:
+        return _run_product_etl_job(task_id, job_type, chunk_size, mode,
+                                    skip_unchanged)
+    finally:
+        land(key, task_id)
+
+
+@shared_task(bind=True)
+def nightly_product_etl(self, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        mode: str = "INCREMENTAL", skip_unchanged: bool = True):
+    return _run_product_etl_once(
+        self.request.id, "JOB_NIGHTLY_ETL", chunk_size, mode, skip_unchanged)
+
+
+@shared_task(bind=True)
+def background_product_etl(self, manual: bool = False,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           mode: str = "INCREMENTAL"):
+    return _run_product_etl_once(
+        self.request.id,
+        "JOB_MANUAL_ETL" if manual else "JOB_NIGHTLY_ETL",
+        chunk_size,
+        mode,
+    )
+
+
+@shared_task(bind=True)
+def partitioned_product_etl(self, manual: bool = False,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            mode: str = "INCREMENTAL",
+                            partition_by=("sales_org_id",),
+                            dt_partitions: int = 1):
+    """
+    Fan the product ETL out over sales org / dt partitions.
+
+    Creates the parent JobRun, prepares the target table and starts a chord:
+    one product_etl_partition per partition (each with a child JobRun), then
+    finalize_partitioned_product_etl, which swaps the staging table in (FULL)
+    and stores the watermarks once every partition has been loaded.
+    """
+    key = PRODUCT_ETL_FLIGHT_KEY
+    in_flight = claim(key, self.request.id)
+    if in_flight:
+        return {"coalesced_with": in_flight}
+
+    since = None
+    if mode == "INCREMENTAL":
+        since = get_watermarks(PRODUCT_ETL_PIPELINE, PRODUCT_ETL_SOURCES,
+                               PRODUCT_ETL_WATERMARK_COLUMNS)
+
+    parent = JobRun.objects.create(
+        job_type="JOB_MANUAL_ETL" if manual else "JOB_NIGHTLY_ETL",
+        job_status="RUNNING",
+        mode="FULL" if since is None else "INCREMENTAL",
+        celery_task_id=self.request.id,
+        started_at=timezone.now(),
+        chunk_size=chunk_size,
+    )
+
+    try:
+        parent.source_fingerprint = source_fingerprint()
+        parent.save(update_fields=["source_fingerprint", "updated_at"])
+        marks = read_high_water_marks(
+            PRODUCT_ETL_SOURCES, columns=PRODUCT_ETL_WATERMARK_COLUMNS)
+        partitions = plan_partitions(partition_by, dt_partitions)
+        if since is None:
+            create_staging_table(features_table, key=parent.id)
+        else:
+            ensure_table(features_table)
+
+        chord(
+            product_etl_partition.s(parent.id, partition, chunk_size, since)
+            for partition in partitions
+        )(finalize_partitioned_product_etl.s(parent.id, marks, key))
+    except Exception as exc:
+        if since is None:
+            drop_staging_table(staging_table(features_table, parent.id))
+        _fail_job(parent, exc)
+        land(key, self.request.id)
+        raise
+
+    return {"job_run_id": parent.id, "partitions": len(partitions)}
+
+
+@shared_task(bind=True)
+def product_etl_partition(self, parent_id: int, partition: dict,
+                          chunk_size: int, since=None):
+    """Load one partition of a partitioned product ETL, tracked as a child JobRun."""
+    parent = JobRun.objects.get(pk=parent_id)
+    job = JobRun.objects.create(
+        parent=parent,
+        partition=partition_label(partition),
+        job_type=parent.job_type,
+        job_status="RUNNING",
+        mode=parent.mode,
+        celery_task_id=self.request.id,
+        started_at=timezone.now(),
+        chunk_size=chunk_size,
+    )
+
+    try:
+        target = features_table if since else staging_table(features_table, parent_id)
+        stats = load_product_features(
+            target, chunk_size, _progress_reporter(job), since, partition,
+            cache=default_snapshot_cache())
+        _record_cache_stats(job, stats)
+        _record_stages(job, stats)
+        _finish_job(job, stats.rows, stats.rows_per_second)
+        return {"partition": partition, "rows": stats.rows}
+    except Exception as exc:
+        _fail_job(job, exc)
+        # Report instead of raising: a failed header task would skip the
+        # chord callback, leaving the parent RUNNING and the staging table
+        # behind.
+        return {"partition": partition, "rows": 0, "error": str(exc)}
+
+
 @shared_task
-def nightly_product_etl():
-    # 1) Extract from source DB
-    # query = text("""
-    #     SELECT sku, name, price, cost, updated_at
-    #     FROM products
-    # """)
-    # df = pd.read_sql(query, source_engine)
-
-    # # 2) Transform
-    # df["price"] = df["price"].astype(float)
-    # df["cost"] = df["cost"].astype(float)
-
-    # df["margin"] = df["price"] - df["cost"]
-    # df["margin_pct"] = (df["margin"] / df["price"]).fillna(0.0)
-
-    # # Example “business” features:
-    # df["is_low_margin"] = df["margin_pct"] < 0.10
-    # df["price_bucket"] = pd.cut(
-    #     df["price"],
-    #     bins=[0, 25, 50, 100, 200, 500, 1000, 10_000],
-    #     include_lowest=True,
-    # ).astype(str)
-
-    # # 3) Load into analytics DB
-    # # For learning: replace table each time
-    # df.to_sql(
-    #     "product_pricing_features",
-    #     analytics_engine,
-    #     if_exists="replace",
-    #     index=False
-    # )
-
-    # return {"rows_written": int(len(df))}
-    print("nightly_product_etl task called - not yet implemented")
-    return {"status": "nightly_product_etl task is a placeholder and not yet implemented."}
+def finalize_partitioned_product_etl(results, parent_id: int, marks: dict,
+                                     flight: str = None):
+    """
+    Chord callback: merge the partition outputs, close the parent JobRun and
+    land the run's single flight ``flight``.
+    """
+    parent = JobRun.objects.get(pk=parent_id)
+    try:
+        return _finalize_partitioned_product_etl(results, parent, marks)
+    finally:
+        if flight:
+            land(flight, parent.celery_task_id)
+
+
+def _finalize_partitioned_product_etl(results, parent: JobRun, marks: dict) -> dict:
+    rows = sum(result["rows"] for result in results)
+    errors = [f"{partition_label(result['partition'])}: {result['error']}"
+              for result in results if "error" in result]
+
+    try:
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} of {len(results)} partitions failed: "
+                + "; ".join(errors))
+        if parent.mode == "FULL":
+            swap_in(features_table, staging_table(features_table, parent.id))
+        save_watermarks(PRODUCT_ETL_PIPELINE, marks,
+                        PRODUCT_ETL_WATERMARK_COLUMNS, parent)
+    except Exception as exc:
+        if parent.mode == "FULL":
+            drop_staging_table(staging_table(features_table, parent.id))
+        parent.rows_processed = rows
+        _fail_job(parent, exc)
+        raise
+
+    cache = default_snapshot_cache()
+    if cache is not None:
+        cache.evict()
+
+    seconds = (timezone.now() - parent.started_at).total_seconds()
+    _finish_job(parent, rows, rows / seconds if seconds else 0.0)
+    publish_version(parent.id)
+    return {"job_run_id": parent.id, "mode": parent.mode,
+            "rows_written": rows, "partitions": len(results)}
 
 
 @shared_task(bind=True)
-def background_product_etl(self, manual: bool = False):
+def detect_price_anomalies_job(self, days=None,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Flag price spikes / too-low prices into pricing_anomalies.
+
+    ``days=None`` re-scores the full history (nightly); ``days=N`` only the
+    last N days (intra-day), see pricing.anomalies.detect_price_anomalies.
+    """
     job = JobRun.objects.create(
-        job_type="JOB_MANUAL_ETL" if manual else "JOB_NIGHTLY_ETL",
+        job_type="JOB_ANOMALY_DETECTION",
         job_status="RUNNING",
+        mode="FULL" if days is None else "INCREMENTAL",
         celery_task_id=self.request.id,
-        started_at=timezone.now()
+        started_at=timezone.now(),
+        chunk_size=chunk_size,
     )
 
     try:
-        # Placeholder for actual ETL logic
-        # 1) Extract
-        # query = text("""
-        #     SELECT sku, name, price, cost, updated_at
-        #     FROM products
-        # """)
-        # df = pd.read_sql(query, source_engine)
-
-        # # 2) Transform
-        # df["price"] = df["price"].astype(float)
-        # df["cost"] = df["cost"].astype(float)
-
-        # df["margin"] = df["price"] - df["cost"]
-        # df["margin_pct"] = (df["margin"] / df["price"]).fillna(0.0)
-
-        # df["is_low_margin"] = df["margin_pct"] < 0.10
-
-        # # 3) Load
-        # df.to_sql(
-        #     "product_pricing_features",
-        #     analytics_engine,
-        #     if_exists="replace",
-        #     index=False
-        # )
-
-        # 4) Success
-        job.status = "SUCCESS"
-        job.rows_processed = 5  # len(df)
-        job.finished_at = timezone.now()
-        job.save()
-
-        return {"rows_written": 5}
+        stats = detect_price_anomalies(days=days, chunk_size=chunk_size,
+                                       on_chunk=_progress_reporter(job))
+        _finish_job(job, stats.rows, stats.rows_per_second)
+        return {
+            "mode": job.mode,
+            "rows_scored": stats.rows,
+            "anomalies": stats.flagged,
+            "rows_per_second": round(stats.rows_per_second, 1),
+        }
     except Exception as exc:
-        job.job_status = "FAILED"
-        job.error_message = str(exc)
-        job.finished_at = timezone.now()
-        job.save()
+        _fail_job(job, exc)
         raise
+
+
+@shared_task(bind=True)
+def refresh_competitor_index_job(self, mode: str = "INCREMENTAL",
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Refresh competitor_price_index, tracked as a JobRun.
+
+    INCREMENTAL runs recompute the days from LOOKBACK_DAYS before the
+    earliest of the sources' stored dt marks on, and fall back to FULL until
+    both marks exist.
+    """
+    marks = None
+    if mode == "INCREMENTAL":
+        marks = get_watermarks(COMPETITOR_INDEX_PIPELINE, COMPETITOR_INDEX_SOURCES)
+    since = incremental_since(marks) if marks else None
+
+    job = JobRun.objects.create(
+        job_type="JOB_COMPETITOR_INDEX",
+        job_status="RUNNING",
+        mode="FULL" if since is None else "INCREMENTAL",
+        celery_task_id=self.request.id,
+        started_at=timezone.now(),
+        chunk_size=chunk_size,
+    )
+
+    try:
+        new_marks = read_high_water_marks(COMPETITOR_INDEX_SOURCES)
+        stats = refresh_competitor_index(since=since, chunk_size=chunk_size,
+                                         on_chunk=_progress_reporter(job))
+        save_watermarks(COMPETITOR_INDEX_PIPELINE, new_marks, WATERMARK_COLUMNS, job)
+        _finish_job(job, stats.rows, stats.rows_per_second)
+        return {
+            "mode": job.mode,
+            "since": since,
+            "rows_written": stats.rows,
+            "rows_per_second": round(stats.rows_per_second, 1),
+        }
+    except Exception as exc:
+        _fail_job(job, exc)
+        raise
+
+
+@shared_task(bind=True)
+def refresh_aggregates_job(self, names=None, execution: str = "auto",
+                           chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Rebuild the declared aggregation tables (all of them unless ``names``).
+
+    ``execution`` is "auto" (pushdown or Python per aggregation, from the
+    source row estimates), "pushdown" or "python"; the choice made for each
+    aggregation is returned.
+    """
+    names = list(names or AGGREGATIONS)
+    job = JobRun.objects.create(
+        job_type="JOB_AGGREGATES",
+        job_status="RUNNING",
+        mode="FULL",
+        celery_task_id=self.request.id,
+        started_at=timezone.now(),
+        chunk_size=chunk_size,
+    )
+
+    try:
+        results, rows, seconds = {}, 0, 0.0
+        for name in names:
+            used, stats = materialize(AGGREGATIONS[name], execution, chunk_size)
+            results[name] = {"execution": used, "rows_written": stats.rows}
+            rows += stats.rows
+            seconds += stats.seconds
+        _finish_job(job, rows, rows / seconds if seconds else 0.0)
+        return {"aggregations": results}
+    except Exception as exc:
+        _fail_job(job, exc)
+        raise
+
+
+@shared_task
+def rollup_job_stats():
+    """Roll the runs finished since the last refresh up into JobStats."""
+    return {"buckets_written": refresh_job_stats()}
+
+
+@shared_task
+def purge_job_history(batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.05):
+    """Roll up and delete the job and task runs beyond their job type's retention window."""
+    stats = purge_job_runs(batch_size=batch_size, pause=pause)
+    return {"runs": stats.runs, "rows_deleted": stats.deleted, "batches": stats.batches}
@@ -0,0 +1,106 @@
+"""
+In-memory SQLite stand-ins for the MySQL source and analytics databases.
+
+The schema mirrors the tables filled by scripts/seed_source_db.py, so the
+ETL code can be exercised end to end without a MySQL server.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+SCHEMA = [
+    """CREATE TABLE sales_orgs (
+        sales_org_id INTEGER PRIMARY KEY,
+        code VARCHAR(10), name VARCHAR(100))""",
+    """CREATE TABLE materials (
+        material_id INTEGER PRIMARY KEY,
+        sku VARCHAR(20), description VARCHAR(255), material_group VARCHAR(50),
+        brand VARCHAR(50), vendor_id INTEGER, base_uom VARCHAR(5),
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE material_costs (
+        cost_id INTEGER PRIMARY KEY,
+        material_id INTEGER, plant_id INTEGER, cost DECIMAL(12, 4),
+        cost_currency VARCHAR(3), valid_from DATE, valid_to DATE,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE daily_prices (
+        price_id INTEGER PRIMARY KEY,
+        dt DATE, sales_org_id INTEGER, customer_id INTEGER,
+        material_id INTEGER, net_price DECIMAL(12, 4), currency VARCHAR(3),
+        source VARCHAR(10))""",
+    """CREATE TABLE competitor_prices (
+        comp_price_id INTEGER PRIMARY KEY,
+        dt DATE, competitor_id INTEGER, sku VARCHAR(20),
+        comp_price DECIMAL(12, 4), currency VARCHAR(3),
+        availability VARCHAR(10))""",
+]
+
+
+# Competitor id -> (price factor relative to ours, availability)
+COMPETITORS = {1: (0.9, "IN_STOCK"), 2: (1.0, "IN_STOCK"), 3: (1.2, "IN_STOCK"),
+               4: (0.5, "OOS")}
+
+
+def make_engine():
+    """An in-memory SQLite engine whose connections all share one database."""
+    return create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+
+def make_source_engine(n_materials=3, days=4, sales_orgs=(1, 2),
+                       customers=(1,), start=None):
+    """
+    Create a source DB with deterministic data.
+
+    Material ``i`` costs ``10 * i`` and sells for ``20 * i`` (+1 per day), so
+    every expected feature value can be computed by hand. Competitors price
+    every sku at a fixed factor of ours (see COMPETITORS).
+    """
+    engine = make_engine()
+    start = start or date.today() - timedelta(days=days)
+
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+
+        for so in sales_orgs:
+            conn.execute(text(
+                "INSERT INTO sales_orgs (sales_org_id, code, name) VALUES (:id, :code, :code)"
+            ), {"id": so, "code": f"SO{so:02d}"})
+
+        for i in range(1, n_materials + 1):
+            conn.execute(text(
+                "INSERT INTO materials (material_id, sku, description, material_group,"
+                " brand, vendor_id, base_uom) VALUES (:id, :sku, :desc, :grp, 'BrandX', 1, 'EA')"
+            ), {"id": i, "sku": f"SKU{i:04d}", "desc": f"Product {i}",
+                "grp": "MONITOR" if i % 2 else "MOUSE"})
+            conn.execute(text(
+                "INSERT INTO material_costs (material_id, plant_id, cost, cost_currency,"
+                " valid_from, valid_to) VALUES (:id, 1, :cost, 'EUR', :vf, :vt)"
+            ), {"id": i, "cost": 10 * i,
+                "vf": (start - timedelta(days=30)).isoformat(),
+                "vt": (date.today() + timedelta(days=365)).isoformat()})
+
+        for d in range(days):
+            dt = (start + timedelta(days=d)).isoformat()
+            for i in range(1, n_materials + 1):
+                for so in sales_orgs:
+                    for cust in customers:
+                        conn.execute(text(
+                            "INSERT INTO daily_prices (dt, sales_org_id, customer_id,"
+                            " material_id, net_price, currency, source)"
+                            " VALUES (:dt, :so, :cust, :id, :price, 'EUR', 'SAP')"
+                        ), {"dt": dt, "so": so, "cust": cust, "id": i,
+                            "price": 20 * i + d})
+                for comp, (factor, availability) in COMPETITORS.items():
+                    conn.execute(text(
+                        "INSERT INTO competitor_prices (dt, competitor_id, sku,"
+                        " comp_price, currency, availability)"
+                        " VALUES (:dt, :comp, :sku, :price, 'EUR', :availability)"
+                    ), {"dt": dt, "comp": comp, "sku": f"SKU{i:04d}",
+                        "price": factor * (20 * i + d), "availability": availability})
+    return engine
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import pandas as pd
+from sqlalchemy import Integer
+from django.test import SimpleTestCase, TestCase
+
+from pricing import aggregations
+from pricing.aggregations import (
+    COMPETITOR_MIN_PRICES, DAILY_PRICE_STATS, Aggregation, aggregate_chunks,
+    choose_execution,
+)
+from pricing.models import JobRun
+from pricing.tasks import refresh_aggregates_job
+from pricing.tests.source_db import make_engine, make_source_engine
+
+MEDIAN_PRICES = Aggregation(
+    name="test_median_prices",
+    source="daily_prices",
+    keys={"material_id": Integer},
+    measures={"median_price": ("net_price", "median")},
+)
+
+
+def collect(agg, execution, engine, chunk_size=7):
+    frame = pd.concat(list(aggregate_chunks(agg, execution, chunk_size, engine)),
+                      ignore_index=True)
+    return frame.sort_values(list(agg.keys)).reset_index(drop=True)
+
+
+class TestAggregateChunks(SimpleTestCase):
+
+    def setUp(self):
+        self.engine = make_source_engine(n_materials=3, days=4, sales_orgs=(1, 2),
+                                         customers=(1, 2))
+
+    def test_pushdown_and_python_produce_the_same_rows(self):
+        for agg in (DAILY_PRICE_STATS, COMPETITOR_MIN_PRICES):
+            with self.subTest(agg.name):
+                pushdown = collect(agg, "pushdown", self.engine)
+                python = collect(agg, "python", self.engine)
+                pd.testing.assert_frame_equal(python, pushdown)
+
+    def test_daily_price_stats(self):
+        stats = collect(DAILY_PRICE_STATS, "python", self.engine)
+        # 4 days x 2 sales orgs x 3 materials, 2 customers each
+        self.assertEqual(len(stats), 24)
+        self.assertEqual(stats["n_prices"].unique().tolist(), [2])
+        self.assertEqual(stats.loc[0, "avg_price"], 20.0)
+
+    def test_competitor_min_ignores_out_of_stock(self):
+        mins = collect(COMPETITOR_MIN_PRICES, "pushdown", self.engine)
+        self.assertEqual(mins["comp_count"].unique().tolist(), [3])
+        # cheapest in-stock competitor prices at 0.9x, the OOS one at 0.5x
+        self.assertAlmostEqual(mins.loc[mins["sku"] == "SKU0001", "comp_min"].iloc[0], 18.0)
+
+    def test_python_supports_reductions_the_database_lacks(self):
+        medians = collect(MEDIAN_PRICES, "python", self.engine, chunk_size=5)
+        self.assertEqual(medians["median_price"].tolist(), [21.5, 41.5, 61.5])
+
+
+class TestChooseExecution(SimpleTestCase):
+
+    def setUp(self):
+        self.engine = make_source_engine(n_materials=3, days=4)  # 24 prices
+
+    def test_auto_follows_row_estimate(self):
+        with patch.object(aggregations, "PUSHDOWN_MIN_ROWS", 20):
+            self.assertEqual(choose_execution(DAILY_PRICE_STATS, engine=self.engine),
+                             "pushdown")
+        with patch.object(aggregations, "PUSHDOWN_MIN_ROWS", 25):
+            self.assertEqual(choose_execution(DAILY_PRICE_STATS, engine=self.engine),
+                             "python")
+
+    def test_reductions_without_sql_equivalent_run_in_python(self):
+        with patch.object(aggregations, "PUSHDOWN_MIN_ROWS", 0):
+            self.assertEqual(choose_execution(MEDIAN_PRICES, engine=self.engine), "python")
+        with self.assertRaises(ValueError):
+            choose_execution(MEDIAN_PRICES, "pushdown", engine=self.engine)
+
+    def test_rejects_unknown_execution(self):
+        with self.assertRaises(ValueError):
+            choose_execution(DAILY_PRICE_STATS, "spark", engine=self.engine)
+
+
+class TestRefreshAggregatesJob(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        for target, engine in (("pricing.etl.source_engine", self.source),
+                               ("pricing.aggregations.source_engine", self.source),
+                               ("pricing.loaders.analytics_engine", self.analytics)):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_materializes_every_aggregation(self):
+        # 24 daily prices stay below the threshold, 48 competitor prices don't
+        with patch.object(aggregations, "PUSHDOWN_MIN_ROWS", 30):
+            result = refresh_aggregates_job.apply().get()
+
+        self.assertEqual(result["aggregations"], {
+            "daily_price_stats": {"execution": "python", "rows_written": 24},
+            "competitor_min_prices": {"execution": "pushdown", "rows_written": 12},
+        })
+        job = JobRun.objects.get()
+        self.assertEqual((job.job_type, job.job_status), ("JOB_AGGREGATES", "SUCCESS"))
+        self.assertEqual(job.rows_processed, 36)
+
+        count = pd.read_sql("SELECT COUNT(*) AS n FROM daily_price_stats", self.analytics)
+        self.assertEqual(count["n"].iloc[0], 24)
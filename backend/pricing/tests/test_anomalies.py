@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from django.test import SimpleTestCase, TestCase
+
+from pricing import anomalies
+from pricing.models import JobRun
+from pricing.tasks import detect_price_anomalies_job
+from pricing.tests.source_db import make_engine, make_source_engine
+
+DAYS = 30
+SPIKE_DAY = 20
+DROP_DAY = 25
+
+
+def noisy_series(material_id=1, sales_org_id=1, customer_id=1, days=DAYS,
+                 seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "dt": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(days), unit="D"),
+        "sales_org_id": sales_org_id,
+        "customer_id": customer_id,
+        "material_id": material_id,
+        "price": 100 * rng.uniform(0.97, 1.03, days),
+    })
+
+
+class TestScorePrices(SimpleTestCase):
+
+    def test_flags_spike_and_drop(self):
+        prices = noisy_series()
+        prices.loc[SPIKE_DAY, "price"] *= 1.4
+        prices.loc[DROP_DAY, "price"] *= 0.5
+
+        flagged = anomalies.flag_anomalies(anomalies.score_prices(prices))
+
+        self.assertEqual(flagged.index.tolist(), [SPIKE_DAY, DROP_DAY])
+        self.assertEqual(flagged["reason"].tolist(), ["PRICE_SPIKE", "PRICE_DROP"])
+
+    def test_series_are_scored_independently(self):
+        quiet = noisy_series(material_id=1)
+        spiky = noisy_series(material_id=2, seed=1)
+        spiky.loc[SPIKE_DAY, "price"] *= 1.4
+        combined = pd.concat([quiet, spiky], ignore_index=True)
+
+        scored = anomalies.score_prices(combined)
+        alone = anomalies.score_prices(quiet.copy())
+
+        np.testing.assert_allclose(
+            scored["robust_z"].iloc[:DAYS].to_numpy(), alone["robust_z"].to_numpy())
+        self.assertTrue(scored["robust_z"].iloc[:anomalies.MIN_PERIODS + 1].isna().all())
+
+    def test_complete_series_never_splits_a_series(self):
+        prices = pd.concat([noisy_series(material_id=m) for m in (1, 2, 3)],
+                           ignore_index=True)
+        chunks = [prices.iloc[i:i + 7] for i in range(0, len(prices), 7)]
+
+        regrouped = list(anomalies.complete_series(iter(chunks)))
+
+        self.assertEqual([chunk["material_id"].unique().tolist() for chunk in regrouped],
+                         [[1], [2], [3]])
+
+
+class TestDetectPriceAnomalies(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=DAYS)
+        self.analytics = make_engine()
+        # Replace the linear test prices by noisy ones with two anomalies
+        start = date.today() - timedelta(days=DAYS)
+        rng = np.random.default_rng(0)
+        with self.source.begin() as conn:
+            for d in range(DAYS):
+                for material_id in (1, 2, 3):
+                    price = 100 * material_id * rng.uniform(0.97, 1.03)
+                    if material_id == 2 and d == SPIKE_DAY:
+                        price *= 1.5
+                    if material_id == 3 and d == DAYS - 1:
+                        price *= 0.5
+                    conn.execute(text(
+                        "UPDATE daily_prices SET net_price = :price"
+                        " WHERE material_id = :m AND dt = :dt"
+                    ), {"price": price, "m": material_id,
+                        "dt": (start + timedelta(days=d)).isoformat()})
+
+        for target, engine in (("pricing.etl.source_engine", self.source),
+                               ("pricing.loaders.analytics_engine", self.analytics)):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_anomalies(self):
+        return pd.read_sql(
+            "SELECT * FROM pricing_anomalies ORDER BY dt, sales_org_id, material_id",
+            self.analytics)
+
+    def test_full_run_flags_injected_anomalies(self):
+        stats = anomalies.detect_price_anomalies()
+
+        flagged = self.read_anomalies()
+        self.assertEqual(stats.rows, DAYS * 3 * 2)
+        self.assertEqual(stats.flagged, 4)  # both sales orgs
+        self.assertEqual(flagged["sku"].tolist(),
+                         ["SKU0002", "SKU0002", "SKU0003", "SKU0003"])
+        self.assertEqual(flagged["reason"].tolist(),
+                         ["PRICE_SPIKE", "PRICE_SPIKE", "PRICE_DROP", "PRICE_DROP"])
+
+    def test_chunked_run_matches_single_chunk(self):
+        anomalies.detect_price_anomalies(chunk_size=1_000_000)
+        single = self.read_anomalies()
+        anomalies.detect_price_anomalies(chunk_size=7)
+        pd.testing.assert_frame_equal(self.read_anomalies(), single)
+
+    def test_incremental_run_replaces_only_the_window(self):
+        anomalies.detect_price_anomalies()
+        with self.analytics.begin() as conn:
+            conn.execute(text("DELETE FROM pricing_anomalies WHERE sku = 'SKU0003'"))
+
+        stats = anomalies.detect_price_anomalies(days=2)
+
+        self.assertEqual(stats.flagged, 2)
+        self.assertEqual(self.read_anomalies()["sku"].tolist(),
+                         ["SKU0002", "SKU0002", "SKU0003", "SKU0003"])
+
+    def test_task_is_tracked_as_job_run(self):
+        result = detect_price_anomalies_job.apply(kwargs={"chunk_size": 50}).get()
+
+        self.assertEqual(result["anomalies"], 4)
+        job = JobRun.objects.get()
+        self.assertEqual(job.job_type, "JOB_ANOMALY_DETECTION")
+        self.assertEqual(job.job_status, "SUCCESS")
+        self.assertEqual(job.mode, "FULL")
+        self.assertEqual(job.rows_processed, DAYS * 3 * 2)
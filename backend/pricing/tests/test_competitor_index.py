@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pandas as pd
+from sqlalchemy import text
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from pricing import competitor_index
+from pricing.models import JobRun, SourceWatermark
+from pricing.tasks import refresh_competitor_index_job
+from pricing.tests.source_db import make_engine, make_source_engine
+
+DAYS = 4
+
+
+class TestCompetitorIndex(TestCase):
+
+    def setUp(self):
+        self.start = date.today() - timedelta(days=DAYS)
+        self.source = make_source_engine(n_materials=3, days=DAYS, start=self.start)
+        self.analytics = make_engine()
+        for target, engine in (
+            ("pricing.etl.source_engine", self.source),
+            ("pricing.competitor_index.source_engine", self.source),
+            ("pricing.loaders.analytics_engine", self.analytics),
+            ("pricing.competitor_index.analytics_engine", self.analytics),
+        ):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_index(self):
+        return pd.read_sql(
+            "SELECT * FROM competitor_price_index ORDER BY sku, dt", self.analytics)
+
+    def test_full_refresh_aggregates_in_stock_prices(self):
+        stats = competitor_index.refresh_competitor_index(chunk_size=5)
+
+        index = self.read_index()
+        self.assertEqual(stats.rows, 3 * DAYS)
+        self.assertEqual(len(index), 3 * DAYS)
+
+        row = index[(index["sku"] == "SKU0002")
+                    & (index["dt"] == self.start.isoformat())].iloc[0]
+        # ours 40; in-stock competitors at 0.9x, 1.0x and 1.2x, the OOS one ignored
+        self.assertEqual(row["comp_count"], 3)
+        self.assertAlmostEqual(row["comp_min"], 36.0)
+        self.assertAlmostEqual(row["comp_median"], 40.0)
+        self.assertAlmostEqual(row["comp_max"], 48.0)
+        self.assertAlmostEqual(row["our_price"], 40.0)
+        self.assertAlmostEqual(row["divergence_pct"], 0.0)
+        self.assertAlmostEqual(row["gap_to_min_pct"], 1 / 0.9 - 1)
+
+    def test_our_prices_are_queried_once_per_day(self):
+        with patch("pricing.competitor_index._our_prices",
+                   wraps=competitor_index._our_prices) as our_prices:
+            # 9 in-stock rows per day: every day spans two chunks
+            stats = competitor_index.refresh_competitor_index(chunk_size=5)
+
+        self.assertEqual(stats.rows, 3 * DAYS)
+        days = sum((dt_to - dt_from).days + 1 for (dt_from, dt_to), _ in our_prices.call_args_list)
+        self.assertEqual(days, DAYS)
+        self.assertEqual(self.read_index()["our_price"].isna().sum(), 0)
+
+    @patch.object(competitor_index, "LOOKBACK_DAYS", 1)
+    def test_incremental_refresh_recomputes_only_touched_days(self):
+        refresh_competitor_index_job.apply()
+        last_day = (self.start + timedelta(days=DAYS - 1)).isoformat()
+        day_before = (self.start + timedelta(days=DAYS - 2)).isoformat()
+        with self.source.begin() as conn:
+            # a late correction of the day before the marks, within the look-back
+            conn.execute(text(
+                "UPDATE competitor_prices SET comp_price = comp_price * 2 WHERE dt >= :dt"
+            ), {"dt": day_before})
+        with self.analytics.begin() as conn:
+            conn.execute(text(
+                "UPDATE competitor_price_index SET comp_max = -1 WHERE dt < :dt"
+            ), {"dt": day_before})
+
+        result = refresh_competitor_index_job.apply().get()
+
+        self.assertEqual(result["mode"], "INCREMENTAL")
+        self.assertEqual(result["rows_written"], 6)
+        index = self.read_index()
+        self.assertEqual(len(index), 3 * DAYS)
+        # days before the look-back are left alone, the last two are recomputed
+        self.assertTrue((index.loc[index["dt"] < day_before, "comp_max"] == -1).all())
+        for day in (day_before, last_day):
+            self.assertAlmostEqual(
+                index.loc[(index["dt"] == day) & (index["sku"] == "SKU0001"),
+                          "divergence_pct"].iloc[0], -0.5)
+
+        self.assertEqual(JobRun.objects.filter(job_type="JOB_COMPETITOR_INDEX").count(), 2)
+        self.assertEqual(
+            SourceWatermark.objects.get(
+                pipeline="competitor_price_index", table_name="competitor_prices").value,
+            last_day)
+
+    def test_read_api_filters_by_sku_and_date_range(self):
+        competitor_index.refresh_competitor_index()
+        client = APIClient()
+
+        response = client.get("/api/competitor-index/", {
+            "sku": "SKU0001",
+            "date_from": (self.start + timedelta(days=1)).isoformat(),
+            "date_to": (self.start + timedelta(days=2)).isoformat(),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([row["dt"] for row in results], [
+            (self.start + timedelta(days=d)).isoformat() for d in (1, 2)])
+        self.assertEqual({row["sku"] for row in results}, {"SKU0001"})
+
+    def test_read_api_validates_parameters(self):
+        client = APIClient()
+        self.assertEqual(client.get("/api/competitor-index/").status_code, 400)
+        self.assertEqual(client.get(
+            "/api/competitor-index/", {"sku": "SKU0001", "date_from": "yesterday"}
+        ).status_code, 400)
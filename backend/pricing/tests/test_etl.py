@@ -0,0 +1,273 @@
+from unittest.mock import patch
+
+import pandas as pd
+from sqlalchemy import inspect, text
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from pricing import etl
+from pricing.models import JobRun, SourceWatermark
+from pricing.tasks import background_product_etl, nightly_product_etl
+from pricing.tests.source_db import make_engine, make_source_engine
+
+
+class TestExtractChunks(SimpleTestCase):
+
+    def test_yields_fixed_size_chunks(self):
+        engine = make_source_engine(n_materials=5, days=2, sales_orgs=(1,))
+        sizes = [len(chunk) for chunk in etl.extract_chunks(
+            etl.DAILY_PRICES_QUERY, chunk_size=4, engine=engine)]
+        self.assertEqual(sizes, [4, 4, 2])
+
+    def test_rejects_non_positive_chunk_size(self):
+        with self.assertRaises(ValueError):
+            etl.run_product_etl(chunk_size=0)
+
+
+class TestBackgroundProductEtl(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        patcher_source = patch("pricing.etl.source_engine", self.source)
+        patcher_analytics = patch("pricing.loaders.analytics_engine", self.analytics)
+        patcher_source.start()
+        patcher_analytics.start()
+        self.addCleanup(patcher_source.stop)
+        self.addCleanup(patcher_analytics.stop)
+
+    def test_streams_all_rows_and_records_throughput(self):
+        result = background_product_etl.apply(
+            kwargs={"manual": True, "chunk_size": 5}).get()
+
+        self.assertEqual(result["rows_written"], 24)
+        self.assertEqual(result["chunks"], 5)
+
+        job = JobRun.objects.get()
+        self.assertEqual(job.job_type, "JOB_MANUAL_ETL")
+        self.assertEqual(job.job_status, "SUCCESS")
+        self.assertEqual(job.rows_processed, 24)
+        self.assertEqual(job.chunk_size, 5)
+        self.assertGreater(job.rows_per_second, 0)
+
+        features = pd.read_sql(
+            "SELECT * FROM product_pricing_features", self.analytics)
+        self.assertEqual(len(features), 24)
+        self.assertEqual(
+            features.loc[features["sku"] == "SKU0002", "cost"].unique().tolist(), [20.0])
+
+    def test_rerun_replaces_previous_output(self):
+        background_product_etl.apply(kwargs={"chunk_size": 7, "mode": "FULL"})
+        background_product_etl.apply(kwargs={"chunk_size": 7, "mode": "FULL"})
+        count = pd.read_sql(
+            "SELECT COUNT(*) AS n FROM product_pricing_features", self.analytics)
+        self.assertEqual(count["n"].iloc[0], 24)
+
+    def test_failed_full_run_keeps_previous_table(self):
+        background_product_etl.apply(kwargs={"mode": "FULL"})
+        with patch("pricing.etl.transform_chunk", side_effect=RuntimeError("boom")):
+            background_product_etl.apply(kwargs={"mode": "FULL"})
+
+        count = pd.read_sql(
+            "SELECT COUNT(*) AS n FROM product_pricing_features", self.analytics)
+        self.assertEqual(count["n"].iloc[0], 24)
+        self.assertFalse([name for name in inspect(self.analytics).get_table_names()
+                          if "__staging" in name])
+
+    def test_failure_is_recorded(self):
+        with patch("pricing.tasks.run_product_etl", side_effect=RuntimeError("boom")):
+            background_product_etl.apply(kwargs={"manual": True})
+
+        job = JobRun.objects.get()
+        self.assertEqual(job.job_status, "FAILED")
+        self.assertEqual(job.error_message, "boom")
+        self.assertIsNotNone(job.finished_at)
+
+
+class TestIncrementalProductEtl(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        for target, engine in (("pricing.etl.source_engine", self.source),
+                               ("pricing.loaders.analytics_engine", self.analytics)):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def features(self):
+        return pd.read_sql(
+            "SELECT * FROM product_pricing_features", self.analytics)
+
+    def test_first_run_falls_back_to_full_and_stores_watermarks(self):
+        result = background_product_etl.apply().get()
+
+        self.assertEqual(result["mode"], "FULL")
+        self.assertEqual(
+            set(SourceWatermark.objects.values_list("table_name", flat=True)),
+            {"materials", "material_costs", "daily_prices"})
+        mark = SourceWatermark.objects.get(table_name="daily_prices")
+        self.assertEqual((mark.column_name, mark.value), ("price_id", "24"))
+        self.assertEqual(mark.job_run, JobRun.objects.get())
+
+    def test_second_run_only_extracts_the_delta(self):
+        background_product_etl.apply()
+        with self.source.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO daily_prices (dt, sales_org_id, customer_id,"
+                " material_id, net_price, currency, source)"
+                " VALUES (DATE('now'), 1, 1, 1, 99, 'EUR', 'SAP')"))
+
+        result = background_product_etl.apply().get()
+
+        self.assertEqual(result["mode"], "INCREMENTAL")
+        self.assertEqual(result["rows_written"], 1)
+        self.assertEqual(len(self.features()), 25)
+
+    def test_backfilled_days_are_part_of_the_delta(self):
+        background_product_etl.apply()
+        with self.source.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO daily_prices (dt, sales_org_id, customer_id,"
+                " material_id, net_price, currency, source)"
+                " VALUES ('2024-06-01', 1, 1, 1, 99, 'EUR', 'SAP')"))
+
+        result = background_product_etl.apply().get()
+
+        self.assertEqual(result["rows_written"], 1)
+        features = self.features()
+        self.assertEqual(features.loc[features["dt"] == "2024-06-01", "price"].tolist(), [99.0])
+
+    def test_marks_of_another_column_fall_back_to_full(self):
+        background_product_etl.apply()
+        SourceWatermark.objects.filter(table_name="daily_prices").update(
+            column_name="dt", value="2025-01-04")
+
+        self.assertEqual(background_product_etl.apply().get()["mode"], "FULL")
+
+    def test_cost_change_upserts_history_of_that_material(self):
+        background_product_etl.apply()
+        with self.source.begin() as conn:
+            conn.execute(text(
+                "UPDATE material_costs SET cost = 5, updated_at = '2999-01-01 00:00:00'"
+                " WHERE material_id = 2"))
+
+        result = background_product_etl.apply().get()
+
+        # the 8 rows of material 2
+        self.assertEqual(result["rows_written"], 8)
+        features = self.features()
+        self.assertEqual(len(features), 24)
+        self.assertEqual(
+            features.loc[features["material_id"] == 2, "cost"].unique().tolist(), [5.0])
+
+
+class TestSkipUnchangedSource(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        for target, engine in (("pricing.etl.source_engine", self.source),
+                               ("pricing.loaders.analytics_engine", self.analytics)):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def change_source(self, statement):
+        with self.source.begin() as conn:
+            conn.execute(text(statement))
+
+    def test_fingerprint_changes_with_any_source_table(self):
+        fingerprints = [etl.source_fingerprint()]
+        for statement in (
+            "INSERT INTO daily_prices (dt, sales_org_id, customer_id, material_id,"
+            " net_price, currency, source) VALUES ('2024-06-01', 1, 1, 1, 99, 'EUR', 'SAP')",
+            "DELETE FROM daily_prices WHERE price_id = 1",
+            "UPDATE materials SET updated_at = '2999-01-01 00:00:00' WHERE material_id = 1",
+            "DELETE FROM material_costs WHERE material_id = 3",
+        ):
+            self.change_source(statement)
+            fingerprints.append(etl.source_fingerprint())
+        self.assertEqual(len(set(fingerprints)), 5)
+        self.assertEqual(etl.source_fingerprint(), fingerprints[-1])
+
+    def test_fingerprint_leaves_price_corrections_to_full_runs(self):
+        before = etl.source_fingerprint()
+        self.change_source("UPDATE daily_prices SET net_price = 1 WHERE price_id = 2")
+        self.assertEqual(etl.source_fingerprint(), before)
+
+    def test_unchanged_source_records_a_skipped_run(self):
+        first = nightly_product_etl.apply().get()
+        with patch("pricing.tasks.run_product_etl") as run:
+            result = nightly_product_etl.apply().get()
+
+        run.assert_not_called()
+        self.assertTrue(result["skipped"])
+        skipped = JobRun.objects.get(pk=result["job_run_id"])
+        self.assertEqual((skipped.job_status, skipped.rows_processed), ("SKIPPED", 0))
+        self.assertEqual(skipped.source_fingerprint,
+                         JobRun.objects.get(job_status="SUCCESS").source_fingerprint)
+        self.assertEqual(first["mode"], "FULL")
+        self.assertEqual(result["mode"], "INCREMENTAL")
+
+    def test_changed_source_runs_again(self):
+        nightly_product_etl.apply()
+        nightly_product_etl.apply()
+        self.change_source("DELETE FROM daily_prices WHERE price_id = 1")
+
+        result = nightly_product_etl.apply().get()
+
+        self.assertNotIn("skipped", result)
+        self.assertEqual(
+            list(JobRun.objects.order_by("id").values_list("job_status", flat=True)),
+            ["SUCCESS", "SKIPPED", "SUCCESS"])
+
+    def test_failed_run_is_not_a_baseline(self):
+        nightly_product_etl.apply()
+        self.change_source("DELETE FROM daily_prices WHERE price_id = 1")
+        with patch("pricing.tasks.run_product_etl", side_effect=RuntimeError("boom")):
+            nightly_product_etl.apply()
+
+        self.assertNotIn("skipped", nightly_product_etl.apply().get())
+
+    def test_manual_runs_never_skip(self):
+        background_product_etl.apply()
+        self.assertNotIn("skipped", background_product_etl.apply().get())
+        self.assertNotIn("skipped", nightly_product_etl.apply(
+            kwargs={"skip_unchanged": False}).get())
+
+
+class TestPostBackgroundProductEtl(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_passes_chunk_size(self, mock_apply):
+        response = self.client.post(
+            "/api/task/background-product-etl", {"chunk_size": 1000}, format="json")
+        self.assertEqual(response.status_code, 202)
+        mock_apply.assert_called_once_with(
+            kwargs={"manual": True, "chunk_size": 1000, "mode": "INCREMENTAL"},
+            task_id=response.json()["task_id"])
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_passes_full_mode(self, mock_apply):
+        response = self.client.post(
+            "/api/task/background-product-etl", {"mode": "FULL"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(mock_apply.call_args.kwargs["kwargs"]["mode"], "FULL")
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_rejects_unknown_mode(self, mock_apply):
+        response = self.client.post(
+            "/api/task/background-product-etl", {"mode": "FAST"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        mock_apply.assert_not_called()
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_rejects_invalid_chunk_size(self, mock_apply):
+        response = self.client.post(
+            "/api/task/background-product-etl", {"chunk_size": -1}, format="json")
+        self.assertEqual(response.status_code, 400)
+        mock_apply.assert_not_called()
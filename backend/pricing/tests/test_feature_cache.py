@@ -0,0 +1,165 @@
+import json
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import TestCase
+
+from pricing import feature_cache
+from pricing.models import JobRun
+from pricing.tasks import background_product_etl
+from pricing.tests.source_db import make_engine, make_source_engine
+
+
+class FakeCacheRedis:
+    """The part of Redis the features cache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def eval(self, script, numkeys, key, token):
+        assert script == feature_cache.RELEASE_SCRIPT
+        if self.data.get(key) == token:
+            del self.data[key]
+
+
+class FeaturesTestCase(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        for target, engine in (("pricing.etl.source_engine", self.source),
+                               ("pricing.loaders.analytics_engine", self.analytics),
+                               ("pricing.feature_cache.analytics_engine", self.analytics)):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, **params):
+        return self.client.get("/api/features/", params)
+
+    def features(self):
+        return pd.read_sql("SELECT * FROM product_pricing_features", self.analytics)
+
+
+class TestProductFeatures(FeaturesTestCase):
+
+    def test_empty_before_the_first_successful_run(self):
+        response = self.get()
+        self.assertEqual(response.json(), {"results": [], "next_cursor": None})
+
+    def test_filters(self):
+        background_product_etl.apply()
+        features = self.features()
+
+        body = self.get(sku="SKU0002").json()
+        self.assertEqual(len(body["results"]), (features["sku"] == "SKU0002").sum())
+        self.assertEqual({row["material_group"] for row in body["results"]}, {"MOUSE"})
+
+        bucket = features["price_bucket"].iloc[0]
+        rows = self.get(price_bucket=bucket, material_group="MONITOR", limit=500).json()["results"]
+        self.assertEqual(len(rows), ((features["price_bucket"] == bucket)
+                                     & (features["material_group"] == "MONITOR")).sum())
+
+        for value, expected in (("true", True), ("false", False)):
+            rows = self.get(low_margin=value, limit=500).json()["results"]
+            self.assertEqual(len(rows), (features["is_low_margin"] == expected).sum())
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        background_product_etl.apply()
+        seen, cursor = [], None
+        while True:
+            body = self.get(limit=5, **({"cursor": cursor} if cursor else {})).json()
+            seen += body["results"]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        keys = [(row["dt"], row["sales_org_id"], row["customer_id"], row["material_id"])
+                for row in seen]
+        self.assertEqual(len(keys), len(self.features()))
+        self.assertEqual(keys, sorted(set(keys), reverse=True))
+
+    def test_rejects_bad_parameters(self):
+        for params in ({"low_margin": "maybe"}, {"date_from": "yesterday"},
+                       {"cursor": "garbage"}, {"limit": "0"}):
+            self.assertEqual(self.get(**params).status_code, 400)
+
+
+class TestFeaturesCache(FeaturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.redis = FakeCacheRedis()
+        patcher = patch.object(feature_cache, "get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_successful_run_bumps_the_version(self):
+        background_product_etl.apply()
+        first_run = JobRun.objects.get()
+        self.assertEqual(self.redis.get(feature_cache.VERSION_KEY), str(first_run.id))
+
+        self.assertEqual(self.get(sku="SKU0001")["X-Cache"], "MISS")
+        with patch.object(feature_cache, "read_features") as read:
+            cached = self.get(sku="SKU0001")
+        read.assert_not_called()
+        self.assertEqual(cached["X-Cache"], "HIT")
+
+        background_product_etl.apply(kwargs={"mode": "FULL"})
+        second_run = JobRun.objects.latest("id")
+        self.assertEqual(self.redis.get(feature_cache.VERSION_KEY), str(second_run.id))
+        self.assertEqual(self.get(sku="SKU0001")["X-Cache"], "MISS")
+
+    def test_failed_runs_keep_the_version(self):
+        background_product_etl.apply()
+        version = self.redis.get(feature_cache.VERSION_KEY)
+        with patch("pricing.tasks.run_product_etl", side_effect=RuntimeError("boom")):
+            background_product_etl.apply()
+        self.assertEqual(self.redis.get(feature_cache.VERSION_KEY), version)
+
+    def test_lost_version_is_restored_from_the_job_history(self):
+        background_product_etl.apply()
+        self.redis.data.clear()
+
+        self.assertEqual(len(self.get(sku="SKU0001").json()["results"]), 8)
+        self.assertEqual(self.redis.get(feature_cache.VERSION_KEY),
+                         str(JobRun.objects.get().id))
+
+    def test_concurrent_misses_wait_for_the_first_one(self):
+        background_product_etl.apply()
+        query = feature_cache.parse_feature_query({"sku": "SKU0001"})
+        version = self.redis.get(feature_cache.VERSION_KEY)
+        key = f"features:{version}:{json.dumps(query, sort_keys=True)}"
+        # another request is filling the key, and finishes while we poll
+        self.redis.set(f"{key}:lock", "other-request")
+        page = {"results": [{"sku": "SKU0001"}], "next_cursor": None}
+        polls = []
+
+        def fill_later(seconds):
+            polls.append(seconds)
+            if len(polls) == 2:
+                self.redis.set(key, json.dumps(page))
+
+        with patch.object(feature_cache.time, "sleep", side_effect=fill_later), \
+                patch.object(feature_cache, "read_features") as read:
+            self.assertEqual(feature_cache.cached_features(query), (page, True))
+        read.assert_not_called()
+
+    def test_stuck_filler_falls_back_to_mysql(self):
+        background_product_etl.apply()
+        query = feature_cache.parse_feature_query({})
+        with patch.object(self.redis, "set", return_value=None), \
+                patch.object(feature_cache, "FILL_TIMEOUT", 0.01), \
+                patch.object(feature_cache, "POLL_INTERVAL", 0.001):
+            page, hit = feature_cache.cached_features(query)
+        self.assertFalse(hit)
+        self.assertEqual(len(page["results"]), 24)
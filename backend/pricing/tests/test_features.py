@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from pricing.features import (
+    PRICE_BUCKETS, CostTimeline, compute_features, price_buckets,
+)
+
+
+def costs(*rows):
+    return pd.DataFrame(
+        rows, columns=["material_id", "plant_id", "cost", "valid_from", "valid_to"])
+
+
+def prices(*rows):
+    return pd.DataFrame(rows, columns=["material_id", "dt", "price"]).assign(
+        dt=lambda df: pd.to_datetime(df["dt"]))
+
+
+class TestCostTimeline(SimpleTestCase):
+
+    def test_picks_cost_valid_on_each_date(self):
+        timeline = CostTimeline(costs(
+            (1, 1, 10.0, "2025-01-01", "2025-01-31"),
+            (1, 1, 12.0, "2025-02-01", None),
+            (2, 1, 50.0, "2025-01-15", "2025-01-20"),
+        ))
+        looked_up = timeline.lookup(prices(
+            (1, "2024-12-31", 0),   # before any interval
+            (1, "2025-01-31", 0),   # last day of first interval
+            (1, "2025-02-01", 0),   # first day of open-ended interval
+            (1, "2030-01-01", 0),
+            (2, "2025-01-20", 0),
+            (2, "2025-01-21", 0),   # after the interval ended
+            (3, "2025-01-20", 0),   # material without costs
+        ))
+        np.testing.assert_array_equal(
+            looked_up, [np.nan, 10.0, 12.0, 12.0, 50.0, np.nan, np.nan])
+
+    def test_averages_plants_valid_on_the_same_day(self):
+        timeline = CostTimeline(costs(
+            (1, 1, 10.0, "2025-01-01", "2025-01-31"),
+            (1, 2, 20.0, "2025-01-10", "2025-01-20"),
+        ))
+        np.testing.assert_allclose(timeline.lookup(prices(
+            (1, "2025-01-09", 0),
+            (1, "2025-01-10", 0),
+            (1, "2025-01-20", 0),
+            (1, "2025-01-21", 0),
+        )), [10.0, 15.0, 15.0, 10.0])
+
+    def test_join_by_material_and_plant(self):
+        timeline = CostTimeline(costs(
+            (1, 1, 10.0, "2025-01-01", None),
+            (1, 2, 20.0, "2025-01-01", None),
+        ), by=("material_id", "plant_id"))
+        rows = prices((1, "2025-01-05", 0), (1, "2025-01-05", 0)).assign(plant_id=[2, 1])
+        np.testing.assert_array_equal(timeline.lookup(rows), [20.0, 10.0])
+
+    def test_keeps_input_order_and_handles_missing_dates(self):
+        timeline = CostTimeline(costs(
+            (1, 1, 10.0, "2025-01-01", "2025-01-31"),
+            (2, 1, 20.0, "2025-01-01", "2025-01-31"),
+        ))
+        rows = prices((2, "2025-01-02", 0), (1, None, 0), (1, "2025-01-03", 0))
+        np.testing.assert_array_equal(timeline.lookup(rows), [20.0, np.nan, 10.0])
+
+    def test_empty_history(self):
+        timeline = CostTimeline(costs())
+        self.assertTrue(np.isnan(timeline.lookup(prices((1, "2025-01-01", 0)))).all())
+
+
+class TestComputeFeatures(SimpleTestCase):
+
+    def setUp(self):
+        self.timeline = CostTimeline(costs(
+            (1, 1, 50.0, "2025-01-01", None),
+            (2, 1, 9.5, "2025-01-01", None),
+            (3, 1, 1.0, "2025-01-01", None),
+        ))
+
+    def test_margin_features(self):
+        out = compute_features(prices(
+            (1, "2025-01-01", 100), (2, "2025-01-01", 10), (3, "2025-01-01", 0),
+        ), self.timeline)
+
+        self.assertEqual(out["margin"].tolist(), [50.0, 0.5, -1.0])
+        self.assertEqual(out["margin_pct"].iloc[0], 0.5)
+        self.assertEqual(out["is_low_margin"].tolist(), [False, True, True])
+        self.assertEqual(out["price_bucket"].iloc[0], "(50.0, 100.0]")
+
+    def test_missing_cost_gives_zero_margin_pct(self):
+        out = compute_features(prices((99, "2025-01-01", 10)), self.timeline)
+        self.assertEqual(out["margin_pct"].iloc[0], 0.0)
+
+
+class TestPriceBuckets(SimpleTestCase):
+
+    def test_matches_pd_cut_labels(self):
+        values = pd.Series([0, 0.5, 25, 25.01, 100, 1000, 10_000])
+        expected = pd.cut(values, bins=PRICE_BUCKETS, include_lowest=True).astype(str)
+        self.assertEqual(price_buckets(values).tolist(), expected.tolist())
+
+    def test_out_of_range_prices_have_no_bucket(self):
+        self.assertEqual(
+            price_buckets(pd.Series([-1, 10_001, np.nan])).tolist(), [None, None, None])
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pricing.models import JobRun
+from pricing.pagination import decode_cursor, encode_cursor, keyset_page
+from task_manager.models import Job
+
+START = timezone.make_aware(datetime(2026, 3, 1, 12, 0))
+
+
+def make_runs(model, n, **fields):
+    runs = [model.objects.create(job_type="JOB_NIGHTLY_ETL", job_status="SUCCESS", **fields)
+            for _ in range(n)]
+    # created_at is auto_now_add; spread the runs an hour apart, two per hour
+    # so pages have to break ties on the id
+    for i, run in enumerate(runs):
+        model.objects.filter(pk=run.pk).update(created_at=START + timedelta(hours=i // 2))
+    return runs
+
+
+class TestKeysetPage(TestCase):
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        runs = make_runs(JobRun, 7)
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(JobRun.objects.all(), cursor, limit=2)
+            seen += [run.pk for run in page]
+            if cursor is None:
+                break
+
+        expected = [run.pk for run in sorted(
+            JobRun.objects.all(), key=lambda r: (r.created_at, r.pk), reverse=True)]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), len(runs))
+
+    def test_page_is_a_constant_number_of_queries(self):
+        make_runs(JobRun, 20)
+        _, cursor = keyset_page(JobRun.objects.all(), None, limit=5)
+        with self.assertNumQueries(1):
+            page, _ = keyset_page(JobRun.objects.all(), cursor, limit=5)
+        self.assertEqual(len(page), 5)
+
+    def test_cursor_round_trip_and_garbage(self):
+        run = make_runs(JobRun, 1)[0]
+        run.refresh_from_db()
+        self.assertEqual(decode_cursor(encode_cursor(run)), (run.created_at, run.pk))
+        for cursor in ("not-base64!", "W10=", encode_cursor(run)[:-4]):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+class TestJobsApi(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_filters_and_paginates(self):
+        make_runs(JobRun, 5)
+        failed = JobRun.objects.create(job_type="JOB_ML_TRAIN", job_status="FAILED")
+        JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", parent=failed)
+
+        body = self.client.get("/api/jobs/", {"limit": 3}).json()
+        self.assertEqual([job["id"] for job in body["results"]][0], failed.pk)
+        self.assertEqual(len(body["results"]), 3)
+
+        rest = self.client.get("/api/jobs/", {"limit": 3, "cursor": body["next_cursor"]}).json()
+        # the child run is not listed on its own
+        self.assertEqual(len(rest["results"]), 3)
+        self.assertIsNone(rest["next_cursor"])
+
+        body = self.client.get("/api/jobs/", {"job_type": "JOB_ML_TRAIN",
+                                              "job_status": "FAILED"}).json()
+        self.assertEqual([job["id"] for job in body["results"]], [failed.pk])
+
+    def test_time_window(self):
+        make_runs(JobRun, 6)  # two runs at 12:00, 13:00 and 14:00
+        body = self.client.get("/api/jobs/", {
+            "created_after": "2026-03-01T13:00:00",
+            "created_before": "2026-03-01T14:00:00"}).json()
+        self.assertEqual(len(body["results"]), 2)
+
+        body = self.client.get("/api/jobs/", {"created_before": "2026-03-01"}).json()
+        self.assertEqual(body["results"], [])
+
+    def test_latest_job_filters(self):
+        make_runs(JobRun, 2)
+        response = self.client.get("/api/jobs/latest/", {"job_status": "FAILED"})
+        self.assertIsNone(response.data)
+
+    def test_rejects_bad_parameters(self):
+        for params in ({"limit": 0}, {"job_type": "JOB_NOPE"}, {"cursor": "xyz"},
+                       {"created_after": "yesterday"}):
+            with self.subTest(params):
+                response = self.client.get("/api/jobs/", params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+
+class TestTaskManagerRunsApi(TestCase):
+
+    def test_paginates_task_runs(self):
+        make_runs(Job, 3)
+        client = APIClient()
+        body = client.get("/api/task/runs/", {"limit": 2}).json()
+        self.assertEqual(len(body["results"]), 2)
+        rest = client.get("/api/task/runs/", {"cursor": body["next_cursor"]}).json()
+        self.assertEqual(len(rest["results"]), 1)
+
+        latest = client.get("/api/task/runs/latest/").json()
+        self.assertEqual(latest["id"], body["results"][0]["id"])
+
+
+class TestConditionalGet(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_listing_is_not_modified(self):
+        make_runs(JobRun, 3)
+        response = self.client.get("/api/jobs/", {"limit": 2})
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(2):  # the page and its partitions' totals
+            cached = self.revalidate("/api/jobs/", response, limit=2)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], response["ETag"])
+        self.assertEqual(cached.content, b"")
+
+        # another page is another representation
+        self.assertEqual(self.revalidate("/api/jobs/", response, limit=3).status_code, 200)
+
+    def test_not_modified_reads_only_the_validator_columns(self):
+        make_runs(JobRun, 3)
+        response = self.client.get("/api/jobs/", {"limit": 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.revalidate("/api/jobs/", response, limit=2).status_code, 304)
+
+        page_query = queries[0]["sql"]
+        self.assertIn('"updated_at"', page_query)
+        self.assertNotIn('"error_message"', page_query)
+
+        # the cursor of a validator page is the one of the full page
+        cursor = self.client.get("/api/jobs/", {"limit": 2}).json()["next_cursor"]
+        self.assertEqual(decode_cursor(cursor)[1],
+                         JobRun.objects.order_by("-created_at", "-id")[1].pk)
+
+    def test_job_and_partition_updates_change_the_etag(self):
+        parent, = make_runs(JobRun, 1)
+        child = JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", parent=parent)
+        for url in ("/api/jobs/", "/api/jobs/latest/"):
+            with self.subTest(url):
+                response = self.client.get(url)
+                child.rows_processed = (child.rows_processed or 0) + 10
+                child.save(update_fields=["rows_processed", "updated_at"])
+                changed = self.revalidate(url, response)
+                self.assertEqual(changed.status_code, 200)
+                self.assertNotEqual(changed["ETag"], response["ETag"])
+
+                parent.job_status = "FAILED" if url == "/api/jobs/" else "SUCCESS"
+                parent.save(update_fields=["job_status", "updated_at"])
+                self.assertEqual(self.revalidate(url, changed).status_code, 200)
+
+    def test_new_latest_job_changes_the_etag(self):
+        make_runs(JobRun, 1)
+        response = self.client.get("/api/jobs/latest/")
+        self.assertEqual(self.revalidate("/api/jobs/latest/", response).status_code, 304)
+        JobRun.objects.create(job_type="JOB_NIGHTLY_ETL")
+        self.assertEqual(self.revalidate("/api/jobs/latest/", response).status_code, 200)
+
+    def test_task_runs(self):
+        run, = make_runs(Job, 1)
+        response = self.client.get("/api/task/runs/")
+        self.assertEqual(self.revalidate("/api/task/runs/", response).status_code, 304)
+        run.job_status = "FAILED"
+        run.save(update_fields=["job_status", "updated_at"])
+        self.assertEqual(self.revalidate("/api/task/runs/", response).status_code, 200)
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pricing import job_stats
+from pricing.job_stats import refresh_job_stats
+from pricing.models import JobRun, JobStats
+from pricing.tasks import rollup_job_stats
+
+HOUR = timezone.make_aware(datetime(2026, 3, 2, 10, 0))
+
+
+def make_run(job_type="JOB_NIGHTLY_ETL", status="SUCCESS", created=HOUR,
+             seconds=10, rows=1000, wait=None, **fields):
+    run = JobRun.objects.create(job_type=job_type, job_status=status, **fields)
+    JobRun.objects.filter(pk=run.pk).update(
+        created_at=created,
+        enqueued_at=created - timedelta(seconds=wait) if wait is not None else None,
+        started_at=created,
+        finished_at=created + timedelta(seconds=seconds),
+        rows_processed=rows)
+    return run
+
+
+class TestRefreshJobStats(TestCase):
+
+    def test_percentiles_throughput_failures_and_queue_wait(self):
+        for i in range(1, 11):  # 1..10 seconds, 1000 rows each
+            make_run(created=HOUR + timedelta(minutes=i), seconds=i, wait=i / 10)
+        make_run(status="FAILED", created=HOUR + timedelta(minutes=30), seconds=100, rows=None)
+        make_run(job_type="JOB_ML_TRAIN", created=HOUR + timedelta(hours=1), seconds=4)
+        make_run(status="RUNNING", created=HOUR)  # not finished: ignored
+        parent = make_run(created=HOUR + timedelta(hours=2))
+        make_run(created=HOUR + timedelta(hours=2), parent=parent)  # partition: ignored
+
+        written = refresh_job_stats()
+
+        # HOUR: 10:00 + 11:00 ETL, 11:00 ML, DAY: ETL + ML
+        self.assertEqual(written, 5)
+        stats = JobStats.objects.get(granularity="HOUR", job_type="JOB_NIGHTLY_ETL",
+                                     bucket_start=HOUR)
+        self.assertEqual((stats.runs, stats.failures), (11, 1))
+        self.assertAlmostEqual(stats.failure_rate, 1 / 11)
+        self.assertEqual(stats.duration_p50, 6.0)
+        self.assertGreater(stats.duration_p99, stats.duration_p95)
+        self.assertEqual(stats.rows_processed, 10_000)
+        self.assertAlmostEqual(stats.rows_per_second, 10_000 / 55)
+        self.assertAlmostEqual(stats.queue_wait_avg, 0.55)
+
+        day = JobStats.objects.get(granularity="DAY", job_type="JOB_NIGHTLY_ETL")
+        self.assertEqual(day.runs, 12)
+        self.assertEqual(timezone.localtime(day.bucket_start).hour, 0)
+
+    def test_refresh_only_recomputes_days_with_newly_finished_runs(self):
+        make_run(created=HOUR - timedelta(days=5))
+        make_run(created=HOUR)
+        refresh_job_stats(now=HOUR + timedelta(hours=1))
+        old = JobStats.objects.get(granularity="DAY", bucket_start__lt=HOUR - timedelta(days=4))
+
+        # finished after the first refresh
+        run = make_run(created=HOUR + timedelta(minutes=50), seconds=20)
+        JobRun.objects.filter(pk=run.pk).update(finished_at=HOUR + timedelta(hours=2))
+        with patch.object(job_stats, "rollup", wraps=job_stats.rollup) as rollup:
+            refresh_job_stats(now=HOUR + timedelta(hours=3))
+
+        self.assertEqual(rollup.call_args.args[0], timezone.make_aware(datetime(2026, 3, 2)))
+        self.assertEqual(JobStats.objects.get(pk=old.pk).updated_at, old.updated_at)
+        self.assertEqual(JobStats.objects.get(granularity="HOUR", bucket_start=HOUR).runs, 2)
+
+        self.assertEqual(refresh_job_stats(now=HOUR + timedelta(hours=4)), 0)
+
+    def test_task(self):
+        make_run()
+        self.assertEqual(rollup_job_stats.apply().get(), {"buckets_written": 2})
+
+
+class TestEnqueuedAt(TestCase):
+
+    def test_job_created_in_a_task_takes_the_publish_time(self):
+        request = SimpleNamespace(id="t1", enqueued_at=HOUR.timestamp())
+        with patch.object(job_stats, "current_task", SimpleNamespace(request=request)):
+            job = JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", celery_task_id="t1")
+            other = JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", celery_task_id="t2")
+        self.assertEqual(job.enqueued_at, HOUR)
+        self.assertIsNone(other.enqueued_at)
+
+    def test_publish_stamps_header(self):
+        headers = {}
+        job_stats._stamp_enqueued_at(headers=headers)
+        self.assertIn("enqueued_at", headers)
+
+
+class TestJobStatsApi(TestCase):
+
+    def test_lists_buckets_in_window(self):
+        make_run()
+        make_run(job_type="JOB_ML_TRAIN")
+        refresh_job_stats()
+        client = APIClient()
+
+        body = client.get("/api/jobs/stats/", {"since": "2026-03-02", "until": "2026-03-03",
+                                               "job_type": "JOB_ML_TRAIN"}).json()
+        self.assertEqual(body["granularity"], "HOUR")
+        self.assertEqual(len(body["results"]), 1)
+        self.assertEqual(body["results"][0]["failure_rate"], 0.0)
+        self.assertEqual(body["results"][0]["duration_p50"], 10.0)
+
+        body = client.get("/api/jobs/stats/", {"granularity": "DAY",
+                                               "since": "2026-03-01"}).json()
+        self.assertEqual(len(body["results"]), 2)
+
+        self.assertEqual(client.get("/api/jobs/stats/", {"granularity": "WEEK"}).status_code, 400)
+        self.assertEqual(client.get("/api/jobs/stats/", {"since": "soon"}).status_code, 400)
@@ -0,0 +1,108 @@
+import io
+
+import pandas as pd
+from django.test import SimpleTestCase
+from sqlalchemy import inspect
+
+from pricing import loaders
+from pricing.etl import features_table
+from pricing.tests.source_db import make_engine
+
+
+def feature_rows(n, price=10.0):
+    return pd.DataFrame({
+        "dt": pd.to_datetime(["2025-01-01"] * n),
+        "sales_org_id": [1] * n,
+        "customer_id": [1] * n,
+        "material_id": list(range(1, n + 1)),
+        "sku": [f"SKU{i:04d}" for i in range(1, n + 1)],
+        "material_group": ["MOUSE"] * n,
+        "price": [price] * n,
+        "cost": [None] + [5.0] * (n - 1),
+        "margin": [5.0] * n,
+        "margin_pct": [0.5] * n,
+        "is_low_margin": [False] * n,
+        "price_bucket": ["(0.0, 25.0]"] * n,
+    })
+
+
+class TestBulkLoad(SimpleTestCase):
+
+    def setUp(self):
+        self.engine = make_engine()
+
+    def read(self, table="product_pricing_features"):
+        return pd.read_sql(f"SELECT * FROM {table}", self.engine)
+
+    def test_multirow_load_into_staging(self):
+        staging = loaders.create_staging_table(features_table, self.engine)
+        loaded = loaders.bulk_load(
+            feature_rows(3), staging, self.engine, method="multirow")
+
+        self.assertEqual(loaded, 3)
+        rows = self.read(staging.name)
+        self.assertEqual(rows["dt"].tolist(), ["2025-01-01"] * 3)
+        self.assertTrue(pd.isna(rows["cost"].iloc[0]))
+        self.assertEqual(rows["is_low_margin"].tolist(), [0, 0, 0])
+
+    def test_rejects_unknown_method(self):
+        with self.assertRaises(ValueError):
+            loaders.bulk_load(feature_rows(1), features_table,
+                              self.engine, method="copy")
+
+    def test_swap_in_replaces_live_table(self):
+        for price in (10.0, 20.0):
+            staging = loaders.create_staging_table(features_table, self.engine)
+            loaders.bulk_load(feature_rows(2, price), staging, self.engine)
+            loaders.swap_in(features_table, staging, self.engine)
+
+        self.assertEqual(self.read()["price"].tolist(), [20.0, 20.0])
+        self.assertEqual(
+            inspect(self.engine).get_table_names(), ["product_pricing_features"])
+
+    def test_live_table_untouched_until_swap(self):
+        staging = loaders.create_staging_table(features_table, self.engine)
+        loaders.bulk_load(feature_rows(2), staging, self.engine)
+        loaders.swap_in(features_table, staging, self.engine)
+
+        staging = loaders.create_staging_table(features_table, self.engine)
+        loaders.bulk_load(feature_rows(1, 99.0), staging, self.engine)
+        self.assertEqual(self.read()["price"].tolist(), [10.0, 10.0])
+
+        loaders.drop_staging_table(staging, self.engine)
+        self.assertFalse(inspect(self.engine).has_table(staging.name))
+
+    def test_each_load_has_its_own_staging_table(self):
+        first = loaders.create_staging_table(features_table, self.engine)
+        second = loaders.create_staging_table(features_table, self.engine)
+        loaders.bulk_load(feature_rows(2), first, self.engine)
+        loaders.bulk_load(feature_rows(3, 20.0), second, self.engine)
+
+        self.assertNotEqual(first.name, second.name)
+        self.assertEqual(len(self.read(first.name)), 2)
+        self.assertEqual(
+            loaders.staging_table(features_table, 7).name,
+            "product_pricing_features__staging_7")
+
+        loaders.swap_in(features_table, second, self.engine)
+        self.assertEqual(self.read()["price"].tolist(), [20.0] * 3)
+        self.assertTrue(inspect(self.engine).has_table(first.name))
+
+    def test_tsv_escapes_backslashes(self):
+        frame = pd.DataFrame({"sku": ["C:\\N", None, "plain"], "price": [1.5, None, 2.0]})
+        out = io.StringIO()
+        loaders._write_tsv(frame, out)
+
+        self.assertEqual(out.getvalue(), "C:\\\\N\t1.5\n\\N\t\\N\nplain\t2.0\n")
+
+
+class TestUpsert(SimpleTestCase):
+
+    def test_updates_existing_keys_and_inserts_new_ones(self):
+        engine = make_engine()
+        loaders.ensure_table(features_table, engine)
+        loaders.upsert(feature_rows(2), features_table, engine)
+        loaders.upsert(feature_rows(3, price=30.0), features_table, engine)
+
+        rows = pd.read_sql("SELECT * FROM product_pricing_features", engine)
+        self.assertEqual(rows["price"].tolist(), [30.0, 30.0, 30.0])
@@ -0,0 +1,142 @@
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from config.celery_app import app as celery_app
+from pricing import etl
+from pricing.models import JobRun
+from pricing.tasks import partitioned_product_etl
+from pricing.tests.source_db import make_engine, make_source_engine
+
+
+class TestPlanPartitions(SimpleTestCase):
+
+    def setUp(self):
+        self.engine = make_source_engine(days=10, sales_orgs=(1, 2))
+
+    def test_by_sales_org(self):
+        self.assertEqual(etl.plan_partitions(["sales_org_id"], engine=self.engine),
+                         [{"sales_org_id": 1}, {"sales_org_id": 2}])
+
+    def test_dt_ranges_are_contiguous_and_cover_all_days(self):
+        partitions = etl.plan_partitions(["dt"], dt_partitions=3, engine=self.engine)
+        self.assertEqual(len(partitions), 3)
+        self.assertEqual([p["dt_from"] for p in partitions][1:],
+                         [(pd.Timestamp(p["dt_to"]) + pd.Timedelta(days=1)).date().isoformat()
+                          for p in partitions][:-1])
+
+        total = 0
+        for partition in partitions:
+            query = etl.daily_prices_query(partition=partition)
+            total += sum(len(c) for c in etl.extract_chunks(
+                query, engine=self.engine, params=partition))
+        self.assertEqual(total, 10 * 3 * 2)
+
+    def test_cross_product(self):
+        partitions = etl.plan_partitions(
+            ["sales_org_id", "dt"], dt_partitions=2, engine=self.engine)
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(etl.partition_label(partitions[0]),
+                         f"sales_org_id=1, dt_from={partitions[0]['dt_from']}, "
+                         f"dt_to={partitions[0]['dt_to']}")
+
+    def test_rejects_unknown_key(self):
+        with self.assertRaises(ValueError):
+            etl.plan_partitions(["customer_id"], engine=self.engine)
+
+
+class TestPartitionedProductEtl(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        for target, engine in (("pricing.etl.source_engine", self.source),
+                               ("pricing.loaders.analytics_engine", self.analytics)):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", eager)
+
+    def test_partitions_run_as_children_and_are_merged(self):
+        result = partitioned_product_etl.apply(kwargs={
+            "manual": True, "partition_by": ["sales_org_id", "dt"],
+            "dt_partitions": 2}).get()
+        self.assertEqual(result["partitions"], 4)
+
+        parent = JobRun.objects.get(parent__isnull=True)
+        self.assertEqual(parent.job_status, "SUCCESS")
+        self.assertEqual(parent.rows_processed, 24)
+        self.assertEqual(parent.children.count(), 4)
+        self.assertEqual(
+            set(parent.children.values_list("job_status", flat=True)), {"SUCCESS"})
+
+        count = pd.read_sql(
+            "SELECT COUNT(*) AS n FROM product_pricing_features", self.analytics)
+        self.assertEqual(count["n"].iloc[0], 24)
+
+    def test_failed_partition_fails_parent_and_keeps_live_table(self):
+        partitioned_product_etl.apply(kwargs={"mode": "FULL"})
+
+        real_load = etl.load_product_features
+
+        def flaky_load(target, chunk_size, on_chunk, since, partition, cache=None):
+            if partition == {"sales_org_id": 2}:
+                raise RuntimeError("lost connection")
+            return real_load(target, chunk_size, on_chunk, since, partition, cache=cache)
+
+        with patch("pricing.tasks.load_product_features", flaky_load):
+            partitioned_product_etl.apply(kwargs={"mode": "FULL"})
+
+        parent = JobRun.objects.filter(parent__isnull=True).latest("id")
+        self.assertEqual(parent.job_status, "FAILED")
+        self.assertIn("sales_org_id=2: lost connection", parent.error_message)
+        self.assertEqual(
+            parent.children.get(partition="sales_org_id=2").job_status, "FAILED")
+
+        count = pd.read_sql(
+            "SELECT COUNT(*) AS n FROM product_pricing_features", self.analytics)
+        self.assertEqual(count["n"].iloc[0], 24)
+
+    def test_jobs_api_shows_aggregated_progress(self):
+        partitioned_product_etl.apply(kwargs={"partition_by": ["sales_org_id"]})
+        client = APIClient()
+
+        jobs = client.get("/api/jobs/").json()["results"]
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]["progress"], {
+            "partitions_total": 2, "partitions_done": 2,
+            "partitions_failed": 0, "rows_processed": 24})
+
+        latest = client.get("/api/jobs/latest/").json()
+        self.assertEqual(latest["id"], jobs[0]["id"])
+        self.assertEqual(latest["progress"]["partitions_done"], 2)
+
+
+class TestPostPartitionedProductEtl(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @patch("pricing.views.partitioned_product_etl.apply_async")
+    def test_partition_by_enqueues_fan_out(self, mock_apply):
+        response = self.client.post(
+            "/api/task/background-product-etl",
+            {"partition_by": ["dt"], "dt_partitions": 4}, format="json")
+        self.assertEqual(response.status_code, 202)
+        mock_apply.assert_called_once_with(
+            kwargs={"manual": True, "chunk_size": etl.DEFAULT_CHUNK_SIZE,
+                    "mode": "INCREMENTAL", "partition_by": ["dt"], "dt_partitions": 4},
+            task_id=response.json()["task_id"])
+
+    @patch("pricing.views.partitioned_product_etl.apply_async")
+    def test_rejects_unknown_partition_key(self, mock_apply):
+        response = self.client.post(
+            "/api/task/background-product-etl",
+            {"partition_by": ["customer_id"]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        mock_apply.assert_not_called()
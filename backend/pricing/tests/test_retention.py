@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from pricing.models import JobRun, JobRunSummary, JobStage, SourceWatermark
+from pricing.retention import purge_job_runs
+from pricing.tasks import purge_job_history
+from task_manager.models import Job
+
+NOW = timezone.make_aware(datetime(2026, 6, 1, 12, 0))
+
+
+def make_run(job_type, days_ago, status="SUCCESS", rows=10, seconds=5, model=JobRun,
+             **fields):
+    run = model.objects.create(job_type=job_type, job_status=status, **fields)
+    created = NOW - timedelta(days=days_ago)
+    model.objects.filter(pk=run.pk).update(
+        created_at=created, started_at=created,
+        finished_at=created + timedelta(seconds=seconds), rows_processed=rows)
+    return run
+
+
+@override_settings(JOB_RETENTION_DAYS={"default": 30, "JOB_NIGHTLY_ETL": 7})
+class TestPurgeJobRuns(TestCase):
+
+    def test_rolls_up_then_deletes_in_batches(self):
+        for _ in range(5):
+            make_run("JOB_NIGHTLY_ETL", days_ago=10)
+        make_run("JOB_NIGHTLY_ETL", days_ago=10, status="FAILED", rows=None)
+        kept_nightly = make_run("JOB_NIGHTLY_ETL", days_ago=3)
+        kept_manual = make_run("JOB_MANUAL_ETL", days_ago=10)  # 30 day window
+        make_run("JOB_MANUAL_ETL", days_ago=40)
+
+        stats = purge_job_runs(batch_size=2, now=NOW)
+
+        self.assertEqual((stats.runs, stats.batches), (7, 4))
+        self.assertEqual(set(JobRun.objects.values_list("pk", flat=True)),
+                         {kept_nightly.pk, kept_manual.pk})
+
+        day = timezone.localdate(NOW - timedelta(days=10))
+        ok = JobRunSummary.objects.get(day=day, job_type="JOB_NIGHTLY_ETL", job_status="SUCCESS")
+        self.assertEqual((ok.runs, ok.rows_processed, ok.duration_seconds), (5, 50, 25.0))
+        failed = JobRunSummary.objects.get(job_status="FAILED")
+        self.assertEqual((failed.runs, failed.rows_processed), (1, 0))
+        self.assertEqual(JobRunSummary.objects.get(job_type="JOB_MANUAL_ETL").day,
+                         date(2026, 4, 22))
+
+    def test_deletes_partitions_and_stages_with_their_run(self):
+        parent = make_run("JOB_NIGHTLY_ETL", days_ago=10)
+        child = make_run("JOB_NIGHTLY_ETL", days_ago=10, parent=parent)
+        JobStage.objects.create(job=child, position=0, name="load")
+        SourceWatermark.objects.create(pipeline="p", table_name="t", column_name="c",
+                                       job_run=parent)
+
+        stats = purge_job_runs(now=NOW)
+
+        self.assertEqual(stats.runs, 1)  # partitions are not summarized on their own
+        self.assertEqual(stats.deleted, 3)
+        self.assertFalse(JobRun.objects.exists())
+        self.assertIsNone(SourceWatermark.objects.get().job_run)
+
+    def test_repeated_purges_add_to_the_summary(self):
+        make_run("JOB_NIGHTLY_ETL", days_ago=10)
+        purge_job_runs(now=NOW)
+        make_run("JOB_NIGHTLY_ETL", days_ago=10)
+        result = purge_job_history.apply(kwargs={"pause": 0}).get()
+
+        self.assertEqual(result, {"runs": 1, "rows_deleted": 1, "batches": 1})
+
+        self.assertEqual(JobRunSummary.objects.get().runs, 2)
+
+    def test_purges_and_summarizes_task_runs_separately(self):
+        make_run("JOB_MANUAL_ETL", days_ago=40)
+        for _ in range(2):
+            make_run("JOB_MANUAL_ETL", days_ago=40, rows=3, seconds=2, model=Job)
+        kept = make_run("JOB_MANUAL_ETL", days_ago=10, model=Job)
+
+        stats = purge_job_runs(batch_size=1, now=NOW)
+
+        self.assertEqual((stats.runs, stats.batches), (3, 3))
+        self.assertEqual(list(Job.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertFalse(JobRun.objects.exists())
+        summaries = {summary.source: summary for summary in JobRunSummary.objects.all()}
+        self.assertEqual(
+            (summaries["task_manager.Job"].runs, summaries["task_manager.Job"].rows_processed,
+             summaries["task_manager.Job"].duration_seconds), (2, 6, 4.0))
+        self.assertEqual(summaries["pricing.JobRun"].runs, 1)
@@ -0,0 +1,164 @@
+import importlib.util
+import os
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+import pandas as pd
+from sqlalchemy import text
+from django.test import SimpleTestCase, TestCase
+
+from pricing.models import JobRun
+from pricing.snapshots import (
+    DAILY_PRICES_SNAPSHOT, MATERIAL_COSTS_SNAPSHOT, SnapshotCache,
+)
+from pricing.tasks import background_product_etl
+from pricing.tests.source_db import make_engine, make_source_engine
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def make_temp_dir(test):
+    tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(tmp.cleanup)
+    return Path(tmp.name)
+
+
+@skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TestSnapshotCache(SimpleTestCase):
+
+    def setUp(self):
+        # 40 days from Jan 1st: two monthly partitions
+        self.source = make_source_engine(n_materials=2, days=40, sales_orgs=(1,),
+                                         start=date(2025, 1, 1))
+        self.cache = SnapshotCache(make_temp_dir(self), engine=self.source)
+
+    def read_prices(self):
+        return pd.concat(list(self.cache.read(DAILY_PRICES_SNAPSHOT)), ignore_index=True)
+
+    def test_second_read_is_served_from_snapshots(self):
+        first = self.read_prices()
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+        second = self.read_prices()
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        pd.testing.assert_frame_equal(second, first)
+        self.assertEqual(len(second), 80)
+
+    def test_only_changed_partition_is_refetched(self):
+        self.read_prices()
+        with self.source.begin() as conn:
+            conn.execute(text(
+                "UPDATE daily_prices SET net_price = 999 WHERE dt = '2025-02-03'"))
+
+        prices = self.read_prices()
+
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+        self.assertEqual(prices.loc[prices["dt"] == "2025-02-03", "price"].tolist(),
+                         [999, 999])
+        # the stale February snapshot is replaced, not kept alongside
+        self.assertEqual(len(list((self.cache.root / "daily_prices").iterdir())), 2)
+
+    def test_partitions_are_written_and_read_in_batches(self):
+        for expected in ((0, 2), (2, 2)):  # extracted, then from the snapshots
+            frames = list(self.cache.read(DAILY_PRICES_SNAPSHOT, batch_size=7))
+            self.assertEqual((self.cache.hits, self.cache.misses), expected)
+            self.assertLessEqual(max(len(frame) for frame in frames), 7)
+            self.assertEqual(sum(len(frame) for frame in frames), 80)
+
+    def test_concurrent_writers_do_not_share_a_temp_file(self):
+        partition, fingerprint = next(
+            iter(self.cache.fingerprints(DAILY_PRICES_SNAPSHOT).items()))
+        first = self.cache.read_partition(DAILY_PRICES_SNAPSHOT, partition, fingerprint, 5)
+        rows = [next(first)]
+        # another worker snapshots the same month meanwhile
+        second = pd.concat(self.cache.read_partition(
+            DAILY_PRICES_SNAPSHOT, partition, fingerprint, 5), ignore_index=True)
+        rows += list(first)
+
+        pd.testing.assert_frame_equal(pd.concat(rows, ignore_index=True), second)
+        cached = pd.concat(self.cache.read_partition(
+            DAILY_PRICES_SNAPSHOT, partition, fingerprint), ignore_index=True)
+        pd.testing.assert_frame_equal(cached, second)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        path = self.cache.path(DAILY_PRICES_SNAPSHOT, partition, fingerprint)
+        self.assertEqual(list(path.parent.glob("*.tmp")), [])
+
+    def test_abandoned_extract_leaves_no_files(self):
+        partition, fingerprint = next(
+            iter(self.cache.fingerprints(DAILY_PRICES_SNAPSHOT).items()))
+        frames = self.cache.read_partition(DAILY_PRICES_SNAPSHOT, partition, fingerprint, 5)
+        next(frames)
+        frames.close()
+        self.assertEqual(list((self.cache.root / "daily_prices").iterdir()), [])
+
+    def test_unpartitioned_table_is_one_snapshot(self):
+        costs = self.cache.read_all(MATERIAL_COSTS_SNAPSHOT)
+        self.cache.read_all(MATERIAL_COSTS_SNAPSHOT)
+
+        self.assertEqual(len(costs), 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+
+class TestSnapshotEviction(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = SnapshotCache(make_temp_dir(self))
+        now = time.time()
+        # a (100 bytes, 30 days ago), b (100 bytes, 1 day ago), c (100 bytes, now)
+        for name, age_days in (("a", 30), ("b", 1), ("c", 0)):
+            path = self.cache.root / "daily_prices" / f"2025-0{ord(name) - 96}.{name}.arrow"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x" * 100)
+            mtime = now - age_days * 86400
+            os.utime(path, (mtime, mtime))
+
+    def remaining(self):
+        return sorted(path.name.split(".")[1]
+                      for path in self.cache.root.glob("*/*.arrow"))
+
+    def test_evicts_by_age(self):
+        self.assertEqual(self.cache.evict(max_bytes=10_000, max_age_days=7), 1)
+        self.assertEqual(self.remaining(), ["b", "c"])
+
+    def test_evicts_least_recently_used_beyond_size(self):
+        self.assertEqual(self.cache.evict(max_bytes=150, max_age_days=365), 2)
+        self.assertEqual(self.remaining(), ["c"])
+
+
+@skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TestProductEtlWithSnapshots(TestCase):
+
+    def setUp(self):
+        self.source = make_source_engine(n_materials=3, days=4)
+        self.analytics = make_engine()
+        cache_dir = make_temp_dir(self)
+        for target, value in (
+            ("pricing.etl.source_engine", self.source),
+            ("pricing.snapshots.source_engine", self.source),
+            ("pricing.loaders.analytics_engine", self.analytics),
+            ("pricing.snapshots.SNAPSHOT_DIR", str(cache_dir)),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_full_run_reports_cache_hits_and_misses(self):
+        first = background_product_etl.apply(kwargs={"mode": "FULL"}).get()
+        second = background_product_etl.apply(kwargs={"mode": "FULL"}).get()
+
+        # cost history, materials and one month (or two) of prices
+        self.assertEqual(first["cache_hits"], 0)
+        self.assertGreaterEqual(first["cache_misses"], 3)
+        self.assertEqual(second["cache_hits"], first["cache_misses"])
+        self.assertEqual(second["cache_misses"], 0)
+        self.assertEqual(second["rows_written"], 24)
+
+        job = JobRun.objects.latest("id")
+        self.assertEqual((job.cache_hits, job.cache_misses), (first["cache_misses"], 0))
+        count = pd.read_sql(
+            "SELECT COUNT(*) AS n FROM product_pricing_features", self.analytics)
+        self.assertEqual(count["n"].iloc[0], 24)
@@ -0,0 +1,81 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from pricing.stages import StageRecorder, rss_bytes
+from pricing.tasks import background_product_etl
+from pricing.tests.source_db import make_engine, make_source_engine
+
+
+class TestStageRecorder(SimpleTestCase):
+
+    def test_accumulates_blocks_of_a_stage(self):
+        stages = StageRecorder(trace_memory=False)
+        chunks = [pd.DataFrame({"x": range(n)}) for n in (3, 2)]
+
+        for chunk in stages.iterate("extract", chunks):
+            with stages.stage("transform", rows_in=len(chunk)) as stage:
+                stage.rows_out += len(chunk) - 1
+
+        extract, transform = list(stages)
+        self.assertEqual((extract.name, extract.calls, extract.rows_out), ("extract", 3, 5))
+        self.assertEqual(extract.bytes_out, 5 * 8)
+        self.assertEqual((transform.calls, transform.rows_in, transform.rows_out), (2, 5, 3))
+        self.assertGreaterEqual(transform.wall_seconds, 0)
+        self.assertGreaterEqual(transform.memory_growth_bytes, 0)
+
+    def test_failed_block_is_still_timed(self):
+        stages = StageRecorder(trace_memory=False)
+        with self.assertRaises(RuntimeError):
+            with stages.stage("load"):
+                raise RuntimeError("boom")
+        self.assertEqual(stages.stages["load"].calls, 1)
+
+    def test_traces_the_peak_of_the_stage(self):
+        stages = StageRecorder(trace_memory=True)
+        with stages.stage("big"):
+            block = bytearray(8 * 2**20)
+        del block
+        with stages.stage("small"):
+            pass
+        self.assertGreaterEqual(stages.stages["big"].memory_growth_bytes, 8 * 2**20)
+        self.assertLess(stages.stages["small"].memory_growth_bytes, 2**20)
+
+    @skipUnless(rss_bytes(), "needs /proc/self/statm")
+    def test_rss_growth_is_per_block(self):
+        stages = StageRecorder(trace_memory=False)
+        with stages.stage("big"):
+            block = b"x" * (64 * 2**20)
+        # the process peak stays high, the next stage is measured on its own
+        with stages.stage("small"):
+            pass
+        del block
+        self.assertGreaterEqual(stages.stages["big"].memory_growth_bytes, 32 * 2**20)
+        self.assertLess(stages.stages["small"].memory_growth_bytes, 8 * 2**20)
+
+
+class TestProductEtlStages(TestCase):
+
+    def setUp(self):
+        for target, engine in (("pricing.etl.source_engine", make_source_engine(n_materials=3, days=4)),
+                               ("pricing.loaders.analytics_engine", make_engine())):
+            patcher = patch(target, engine)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_run_records_stages_shown_in_the_jobs_api(self):
+        background_product_etl.apply(kwargs={"chunk_size": 10, "mode": "FULL"})
+
+        job = APIClient().get("/api/jobs/latest/").json()
+        stages = {stage["name"]: stage for stage in job["stages"]}
+        self.assertEqual(list(stages), ["costs", "extract", "transform", "load"])
+        self.assertEqual(stages["extract"]["rows_out"], 24)
+        self.assertEqual(stages["extract"]["calls"], 4)  # 3 chunks + end of stream
+        self.assertEqual(stages["load"]["rows_in"], 24)
+        self.assertEqual(stages["load"]["calls"], 3)
+
+        jobs = APIClient().get("/api/jobs/").json()["results"]
+        self.assertEqual(len(jobs[0]["stages"]), 4)
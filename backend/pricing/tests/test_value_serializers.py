@@ -0,0 +1,100 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from pricing.models import JobRun, JobStage
+from pricing.renderers import ORJSONRenderer
+from pricing.serializers import CHILD_PROGRESS_ANNOTATIONS, JobRunSerializer, serialize_job_runs
+from pricing.value_serializers import ValuesSerializer
+from task_manager.models import Job
+from task_manager.serializers import TASK_RUN_VALUES, TaskRunSerializer
+from testing.models import Product
+from testing.serializers import TestingProductSerializer
+
+
+class TestValuesSerializer(TestCase):
+    """The value rows must be exactly what the ModelSerializers return."""
+
+    def setUp(self):
+        self.parent = JobRun.objects.create(
+            job_type="JOB_NIGHTLY_ETL", job_status="SUCCESS", mode="FULL",
+            rows_per_second=1234.5, finished_at=timezone.now())
+        JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", parent=self.parent,
+                              job_status="SUCCESS", rows_processed=10)
+        JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", parent=self.parent,
+                              job_status="FAILED", error_message="boom")
+        JobRun.objects.create(job_type="JOB_ML_TRAIN")
+        for position, name in enumerate(("extract", "load")):
+            JobStage.objects.create(job=self.parent, position=position, name=name,
+                                    calls=2, wall_seconds=0.5, memory_growth_bytes=None)
+
+    def test_job_runs(self):
+        runs = JobRun.objects.filter(parent__isnull=True).annotate(
+            **CHILD_PROGRESS_ANNOTATIONS).order_by("-id")
+        self.assertEqual(serialize_job_runs(runs),
+                         JobRunSerializer(runs.prefetch_related("stages"), many=True).data)
+
+    def test_task_runs(self):
+        Job.objects.create(job_type="JOB_MANUAL_ETL", job_status="RUNNING", rows_processed=5)
+        Job.objects.create(job_type="JOB_ML_PREDICT", finished_at=timezone.now())
+        jobs = Job.objects.order_by("id")
+        self.assertEqual(TASK_RUN_VALUES.serialize(jobs), TaskRunSerializer(jobs, many=True).data)
+
+    def test_products_decimals(self):
+        for price in (Decimal("100"), Decimal("0.5"), Decimal("19.99")):
+            Product.objects.create(name=f"Product {price}", price=price, stock_count=1)
+        products = Product.objects.order_by("id")
+        values = ValuesSerializer(Product, TestingProductSerializer.Meta.fields)
+        self.assertEqual(values.serialize(products),
+                         TestingProductSerializer(products, many=True).data)
+        self.assertEqual([row["price"] for row in values.serialize(products)],
+                         ["100.00", "0.50", "19.99"])
+
+    def test_null_decimals(self):
+        class Rows:
+            """A queryset whose values_list holds a NULL price."""
+
+            def values_list(self, *columns):
+                return [(1, "Unpriced", None)]
+
+        unpriced = Product(id=1, name="Unpriced", price=None, stock_count=3)
+        values = ValuesSerializer(Product, TestingProductSerializer.Meta.fields)
+        self.assertEqual(values.serialize(Rows()), [TestingProductSerializer(unpriced).data])
+        self.assertIsNone(values.serialize(Rows())[0]["price"])
+
+    def test_datetimes_in_the_current_time_zone(self):
+        moment = datetime(2026, 7, 1, 10, 30, 0, 250000, tzinfo=dt_timezone.utc)
+        JobRun.objects.filter(pk=self.parent.pk).update(created_at=moment)
+        values = ValuesSerializer(JobRun, ["id", "created_at"])
+        queryset = JobRun.objects.filter(pk=self.parent.pk)
+
+        self.assertEqual(values.serialize(queryset)[0]["created_at"],
+                         "2026-07-01T12:30:00.250000+02:00")
+        with timezone.override("UTC"):
+            self.assertEqual(values.serialize(queryset)[0]["created_at"],
+                             "2026-07-01T10:30:00.250000Z")
+
+
+class TestORJSONRenderer(TestCase):
+
+    def test_renders_like_drf(self):
+        data = {
+            "results": [{"id": 1, "price": Decimal("1.50"), "name": "Mäuse",
+                         "at": datetime(2026, 1, 1, 8, tzinfo=dt_timezone.utc),
+                         "ratio": 0.25, "tags": None}],
+            "next_cursor": None,
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_list_endpoints_use_it(self):
+        Product.objects.create(name="Product", price=5, stock_count=1)
+        for url in ("/api/jobs/", "/api/task/runs/", "/testing/products/"):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+                self.assertEqual(response["Content-Type"], "application/json")
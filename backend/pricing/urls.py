@@ -1,11 +1,21 @@
 from django.urls import path
-from .views import get_task, run_task, post_background_product_etl, list_jobs, latest_job
+from .views import (
+    get_task, run_task, post_background_product_etl, list_jobs, latest_job,
+    competitor_index, task_events, get_task_statuses, job_stats,
+    product_features,
+)
 
 urlpatterns = [
     path("task", run_task, name="task"),
-    path("task/<str:task_id>", get_task, name="task_status"),
+    # must precede task/<str:task_id>, which would otherwise swallow them
     path("task/background-product-etl", post_background_product_etl,
          name="background_product_etl"),
+    path("task/statuses", get_task_statuses, name="task_statuses"),
+    path("task/<str:task_id>", get_task, name="task_status"),
+    path("task/<str:task_id>/events", task_events, name="task_events"),
     path("jobs/", list_jobs),
     path("jobs/latest/", latest_job),
+    path("jobs/stats/", job_stats),
+    path("competitor-index/", competitor_index),
+    path("features/", product_features),
 ]
@@ -0,0 +1,100 @@
+"""
+Read-only serialization of ``.values_list()`` rows for the hot list endpoints.
+
+A DRF ``ModelSerializer`` builds a model instance and runs a field object per
+attribute for every row, which dominates the CPU time of a 500-row page.
+``ValuesSerializer`` reads the model's columns once and turns tuples into
+dicts, converting only the columns whose JSON form differs from the
+database value, with the output of the equivalent ``ModelSerializer``
+(``fields`` or ``"__all__"``):
+
+- DecimalField: string with the field's decimal places (null for NULL)
+- DateTimeField: ISO 8601 in the current time zone, "Z" for UTC
+- DateField: ISO 8601
+- ForeignKey: the related primary key, under the field's name
+
+Other columns (numbers, strings, booleans, JSON) are passed through.
+
+Usage:
+    PRODUCT_VALUES = ValuesSerializer(Product, ["id", "name", "price"])
+    rows = PRODUCT_VALUES.serialize(queryset)
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+def _decimal(field):
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+
+    def convert(value, tz):
+        return None if value is None else f"{value.quantize(exponent):f}"
+    return convert
+
+
+def _datetime(value, tz):
+    if not value:
+        return None
+    if tz is not None:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def _date(value, tz):
+    return value.isoformat() if value else None
+
+
+def _converter(field):
+    """
+    How to turn a value of ``field`` into JSON, None if it already is JSON.
+    Converters take the value and the output time zone (None without USE_TZ).
+    """
+    if isinstance(field, models.DecimalField):
+        return _decimal(field)
+    if isinstance(field, models.DateTimeField):
+        return _datetime
+    if isinstance(field, models.DateField):
+        return _date
+    return None
+
+
+class ValuesSerializer:
+    """Serializer of the ``fields`` of ``model`` working from value tuples."""
+
+    def __init__(self, model, fields="__all__"):
+        opts = model._meta
+        if fields == "__all__":
+            # the order of ModelSerializer: primary key, fields, then relations
+            concrete = [field for field in opts.concrete_fields if not field.primary_key]
+            fields = ([opts.pk.name]
+                      + [field.name for field in concrete if not field.is_relation]
+                      + [field.name for field in concrete if field.is_relation])
+        model_fields = [opts.get_field(name) for name in fields]
+
+        self.names = list(fields)
+        # ForeignKey columns are read as <name>_id
+        self.columns = [field.attname for field in model_fields]
+        self.converters = [(index, convert) for index, convert in
+                           enumerate(map(_converter, model_fields)) if convert]
+
+    def serialize(self, queryset, *extra) -> list:
+        """
+        Rows of ``queryset`` as dicts. ``extra`` names annotations of the
+        queryset to add to each row, unconverted.
+        """
+        names = self.names + list(extra)
+        converters = self.converters
+        # looked up once: the current time zone is a context-local read
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        rows = []
+        for values in queryset.values_list(*self.columns, *extra):
+            if converters:
+                values = list(values)
+                for index, convert in converters:
+                    values[index] = convert(values[index], tz)
+            rows.append(dict(zip(names, values)))
+        return rows
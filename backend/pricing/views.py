@@ -1,12 +1,37 @@
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework.decorators import api_view
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import JobRun
-from .serializers import JobRunSerializer
-from .tasks import test_task, background_product_etl
+from .models import JobRun, JobStats
+from .renderers import FAST_RENDERERS
+from .serializers import (
+    CHILD_PROGRESS_ANNOTATIONS, JobRunSerializer, JobStatsSerializer, serialize_job_runs,
+)
+from .competitor_index import read_competitor_index
+from .conditional import Validators, latest
+from .feature_cache import cached_features, parse_feature_query
+from .job_stats import default_window
+from .pagination import filter_jobs, keyset_page, parse_limit, parse_time
+from .tasks import (
+    test_task, background_product_etl, partitioned_product_etl,
+    PRODUCT_ETL_FLIGHT_KEY,
+)
 from celery.result import AsyncResult
+from task_manager.admission import check_admission
+from task_manager.events import stream as task_event_stream
+from task_manager.singleflight import trigger
+from task_manager.status import MAX_TASK_IDS, task_statuses
+from task_manager.triggers import (
+    flight_response, product_etl_options, rejection_response, test_task_duration,
+)
 
 
 # Create your views here.
@@ -15,7 +40,16 @@ from celery.result import AsyncResult
 @api_view(['POST'])
 def run_task(request):
     print("Received request to run test task", request.data)
-    duration = request.data.get('duration', 5)  # default to 5 seconds
+    try:
+        duration = test_task_duration(request.data.get('duration', 5))  # default to 5 seconds
+    except (TypeError, ValueError):
+        return Response(
+            {"error": f"duration must be between 0 and {settings.MAX_TEST_TASK_DURATION} seconds"},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    rejection = check_admission(test_task)
+    if rejection:
+        return rejection_response(rejection)
     task = test_task.delay(duration)
     return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
 
@@ -31,21 +65,230 @@ def get_task(request, task_id):
     return Response(response, status=status.HTTP_200_OK)
 
 
+@api_view(["POST"])
+def get_task_statuses(request):
+    """
+    Status of many tasks at once: {"task_ids": [...], "include_result": false}.
+
+    Resolved with one MGET on the result backend, falling back to the job
+    tables for expired results (see task_manager.status).
+    """
+    task_ids = request.data.get("task_ids")
+    if (not isinstance(task_ids, list)
+            or not all(isinstance(task_id, str) for task_id in task_ids)):
+        return Response({"error": "task_ids must be a list of task ids"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(task_ids) > MAX_TASK_IDS:
+        return Response({"error": f"at most {MAX_TASK_IDS} task_ids per request"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    include_result = bool(request.data.get("include_result", False))
+    return Response(task_statuses(task_ids, include_result))
+
+
+@require_GET
+def task_events(request, task_id):
+    """
+    Server-Sent Events stream of a task's status and job progress, ending
+    once the task has finished (see task_manager.events).
+    """
+    if not settings.TASK_EVENTS_REDIS_URL:
+        return JsonResponse({"error": "task events are disabled"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    response = StreamingHttpResponse(task_event_stream(task_id),
+                                     content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Don't let a reverse proxy buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @api_view(['POST'])
 def post_background_product_etl(request):
-    task = background_product_etl.delay(manual=True)
-    return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+    try:
+        chunk_size, mode = product_etl_options(request.data)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Optional fan-out over partitions, e.g. {"partition_by": ["sales_org_id", "dt"], "dt_partitions": 4}
+    partition_by = request.data.get("partition_by")
+    if partition_by:
+        if isinstance(partition_by, str):
+            partition_by = [partition_by]
+        if not set(partition_by) <= {"sales_org_id", "dt"}:
+            return Response({"error": "partition_by must be a list of 'sales_org_id' and/or 'dt'"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            dt_partitions = int(request.data.get("dt_partitions", 1))
+            if dt_partitions <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response({"error": "dt_partitions must be a positive integer"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        task, kwargs = partitioned_product_etl, {
+            "manual": True, "chunk_size": chunk_size, "mode": mode,
+            "partition_by": list(partition_by), "dt_partitions": dt_partitions}
+    else:
+        task, kwargs = background_product_etl, {
+            "manual": True, "chunk_size": chunk_size, "mode": mode}
+
+    rejection = check_admission(task)
+    if rejection:
+        return rejection_response(rejection)
+
+    # A run in flight, of either mode, is returned instead of starting another
+    flight = trigger(task, PRODUCT_ETL_FLIGHT_KEY, kwargs,
+                     follow_up=bool(request.data.get("follow_up", False)))
+    return Response(flight_response(flight), status=status.HTTP_202_ACCEPTED)
+
+
+def _top_level_runs():
+    """Runs that are not a partition of another run, with their children's progress."""
+    return JobRun.objects.filter(parent__isnull=True).annotate(
+        **CHILD_PROGRESS_ANNOTATIONS)
+
+
+# Columns of the job rows read before a listing knows whether it is a 304:
+# the ETag inputs and the keyset cursor
+JOB_VALIDATOR_FIELDS = ("id", "created_at", "updated_at")
+
+
+def _validator_rows(queryset) -> list:
+    return list(queryset.values(*JOB_VALIDATOR_FIELDS))
+
+
+def _job_validators(request, jobs, *parts) -> Validators:
+    """
+    Validators of ``jobs`` (rows of JOB_VALIDATOR_FIELDS) as the listings
+    serialize them: their own ``updated_at`` and the count and latest update
+    of their partitions.
+    """
+    ids = [job["id"] for job in jobs]
+    children = {"count": 0, "updated": None}
+    if ids:
+        children = JobRun.objects.filter(parent__in=ids).aggregate(
+            count=Count("id"), updated=Max("updated_at"))
+    return Validators.of(
+        request, [(job["id"], job["updated_at"]) for job in jobs], children, *parts,
+        last_modified=latest(*(job["updated_at"] for job in jobs), children["updated"]))
 
 
 @api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
 def list_jobs(request):
-    jobs = JobRun.objects.order_by("-created_at")[:50]
-    return Response(JobRunSerializer(jobs, many=True).data)
+    """
+    Top-level runs, newest first, one keyset page at a time.
+
+    Filters: job_type, job_status, created_after, created_before. Pass the
+    ``next_cursor`` of a page as ``cursor`` to get the next one. Pages carry
+    an ETag; an ``If-None-Match`` that still matches gets a 304.
+    """
+    params = request.query_params
+    try:
+        limit = parse_limit(params.get("limit"))
+        jobs = filter_jobs(JobRun.objects.filter(parent__isnull=True), params)
+        page, next_cursor = keyset_page(jobs, params.get("cursor"), limit,
+                                        serialize=_validator_rows)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    validators = _job_validators(request, page, next_cursor)
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+
+    # Only now read the full rows, aggregating child progress for this page only
+    runs = _top_level_runs().filter(pk__in=[job["id"] for job in page]).order_by(
+        "-created_at", "-id")
+    return validators.apply(Response({"results": serialize_job_runs(runs),
+                                      "next_cursor": next_cursor}))
 
 
 @api_view(["GET"])
 def latest_job(request):
-    job = JobRun.objects.order_by("-created_at").first()
+    try:
+        jobs = filter_jobs(JobRun.objects.filter(parent__isnull=True), request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    job = jobs.order_by("-created_at", "-id").values(*JOB_VALIDATOR_FIELDS).first()
+    validators = _job_validators(request, [job] if job else [])
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+
     if not job:
-        return Response(None)
-    return Response(JobRunSerializer(job).data)
+        return validators.apply(Response(None))
+    job = _top_level_runs().get(pk=job["id"])
+    return validators.apply(Response(JobRunSerializer(job).data))
+
+
+@api_view(["GET"])
+def job_stats(request):
+    """
+    Duration percentiles, throughput, failure rate and queue wait per job
+    type from the JobStats rollups.
+
+    Query params: granularity (HOUR or DAY, default HOUR), job_type, and the
+    bucket window since/until (default: the last day of hours or 30 days).
+    """
+    params = request.query_params
+    granularity = params.get("granularity", "HOUR")
+    if granularity not in dict(JobStats.GRANULARITIES):
+        return Response(
+            {"error": f"granularity must be one of {list(dict(JobStats.GRANULARITIES))}"},
+            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        until = parse_time(params["until"], "until") if params.get("until") else None
+        since = (parse_time(params["since"], "since") if params.get("since")
+                 else (until or timezone.now()) - default_window(granularity))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    stats = JobStats.objects.filter(granularity=granularity, bucket_start__gte=since)
+    if until:
+        stats = stats.filter(bucket_start__lt=until)
+    if params.get("job_type"):
+        stats = stats.filter(job_type=params["job_type"])
+    stats = stats.order_by("bucket_start", "job_type")
+    return Response({"granularity": granularity,
+                     "results": JobStatsSerializer(stats, many=True).data})
+
+
+@api_view(["GET"])
+def competitor_index(request):
+    """Competitor price index of one sku, optionally limited to a date range."""
+    sku = request.query_params.get("sku")
+    if not sku:
+        return Response({"error": "sku is required"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        date_from, date_to = (
+            date.fromisoformat(value) if value else None
+            for value in (request.query_params.get("date_from"),
+                          request.query_params.get("date_to")))
+    except ValueError:
+        return Response({"error": "date_from and date_to must be YYYY-MM-DD dates"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    rows = read_competitor_index(sku, date_from, date_to)
+    return Response({"sku": sku, "results": rows})
+
+
+@api_view(["GET"])
+def product_features(request):
+    """
+    Page of product_pricing_features filtered by sku, material_group,
+    price_bucket, low_margin and date_from/date_to, newest day first. Served
+    from the features cache, which every successful product ETL run refreshes.
+    """
+    try:
+        query = parse_feature_query(request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    page, hit = cached_features(query)
+    return Response(page, headers={"X-Cache": "HIT" if hit else "MISS"})
@@ -0,0 +1,49 @@
+"""
+Persistence of per-table high-water marks for incremental pipelines.
+
+The marks themselves are read from the source DB by the pipeline (see
+``etl.read_high_water_marks``); this module only stores and retrieves them
+through the SourceWatermark model.
+"""
+
+from typing import Iterable, Optional
+
+from .models import JobRun, SourceWatermark
+
+
+def get_watermarks(pipeline: str, tables: Iterable[str],
+                   columns: Optional[dict] = None) -> Optional[dict]:
+    """
+    Return the stored marks of ``tables`` for ``pipeline``.
+
+    Returns None unless every table has a mark, so callers fall back to a
+    full run instead of extracting an incomplete delta. With ``columns``,
+    marks stored for another column than ``columns[table]`` (e.g. before
+    the pipeline switched columns) count as missing.
+    """
+    tables = list(tables)
+    marks = {
+        table: value for table, column, value in
+        SourceWatermark.objects
+        .filter(pipeline=pipeline, table_name__in=tables)
+        .values_list("table_name", "column_name", "value")
+        if columns is None or column == columns[table]
+    }
+    if any(marks.get(table) is None for table in tables):
+        return None
+    return marks
+
+
+def save_watermarks(pipeline: str, marks: dict, columns: dict,
+                    job_run: Optional[JobRun] = None) -> None:
+    """Store the marks reached by a successful run of ``pipeline``."""
+    for table, value in marks.items():
+        SourceWatermark.objects.update_or_create(
+            pipeline=pipeline,
+            table_name=table,
+            defaults={
+                "column_name": columns[table],
+                "value": value,
+                "job_run": job_run,
+            },
+        )
@@ -0,0 +1,83 @@
+"""
+Benchmark loading product_pricing_features rows into the analytics DB.
+
+Compares the DataFrame.to_sql paths used so far (per-row executemany and
+method="multi" as in seed_source_db.py) with the bulk loader in
+pricing.loaders (multi-row INSERTs and LOAD DATA LOCAL INFILE).
+
+Run:
+    docker compose exec backend bash -lc "uv run python scripts/bench_analytics_load.py --rows 500000"
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pricing import loaders  # noqa: E402
+from pricing.db import ANALYTICS_URL  # noqa: E402
+from pricing.etl import features_table  # noqa: E402
+
+
+def synthetic_features(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(15, 1200, n_rows).round(4)
+    cost = (price * rng.uniform(0.5, 0.95, n_rows)).round(4)
+    margin = price - cost
+    return pd.DataFrame({
+        "dt": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(n_rows) // 1000, unit="D"),
+        "sales_org_id": 1,
+        "customer_id": 1,
+        "material_id": np.arange(n_rows) % 1000 + 1,
+        "sku": "SKU0001",
+        "material_group": "NOTEBOOK",
+        "price": price,
+        "cost": cost,
+        "margin": margin,
+        "margin_pct": margin / price,
+        "is_low_margin": margin / price < 0.10,
+        "price_bucket": "(500.0, 1000.0]",
+    })
+
+
+def bench(name, engine, df, load):
+    table = loaders.create_staging_table(features_table, engine)
+    started = time.perf_counter()
+    load(table)
+    seconds = time.perf_counter() - started
+    table.drop(engine)
+    print(f"{name:<28} {seconds:8.2f}s  {len(df) / seconds:12,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--url", default=ANALYTICS_URL,
+                        help="SQLAlchemy URL of the target DB")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url, connect_args={"local_infile": True}
+                           if args.url.startswith("mysql") else {})
+    df = synthetic_features(args.rows)
+    print(f"Loading {len(df):,} rows into {engine.url.render_as_string()}")
+
+    bench("to_sql (executemany)", engine, df, lambda t: df.to_sql(
+        t.name, engine, if_exists="append", index=False, chunksize=5000))
+    bench("to_sql (method='multi')", engine, df, lambda t: df.to_sql(
+        t.name, engine, if_exists="append", index=False, chunksize=5000,
+        method="multi"))
+    bench("bulk_load (multirow)", engine, df, lambda t: loaders.bulk_load(
+        df, t, engine, method="multirow"))
+    if engine.dialect.name == "mysql":
+        bench("bulk_load (LOAD DATA)", engine, df, lambda t: loaders.bulk_load(
+            df, t, engine, method="load_data"))
+
+
+if __name__ == "__main__":
+    main()
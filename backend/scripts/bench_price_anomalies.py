@@ -0,0 +1,59 @@
+"""
+Benchmark pricing.anomalies scoring on synthetic daily prices.
+
+Scores growing numbers of price series to check that the grouped rolling
+pass scales linearly with the row count. Runs entirely in memory; no
+database needed.
+
+Run:
+    docker compose exec backend bash -lc "uv run python scripts/bench_price_anomalies.py --rows 10000000"
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pricing.anomalies import flag_anomalies, score_prices  # noqa: E402
+
+
+def synthetic_prices(n_rows: int, days: int, rng) -> pd.DataFrame:
+    """``n_rows // days`` series of ``days`` noisy prices, sorted like the extract."""
+    n_series = max(n_rows // days, 1)
+    series = np.repeat(np.arange(n_series), days)
+    baseline = rng.uniform(15, 1200, n_series)[series]
+    return pd.DataFrame({
+        "dt": pd.Timestamp("2024-01-01")
+        + pd.to_timedelta(np.tile(np.arange(days), n_series), unit="D"),
+        "sales_org_id": series % 4 + 1,
+        "customer_id": series // 4 % 50 + 1,
+        "material_id": series // 200 + 1,
+        "price": (baseline * rng.uniform(0.97, 1.03, len(series))).round(4),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--steps", type=int, default=3,
+                        help="also time rows/2, rows/4, ... for the scaling check")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for step in reversed(range(args.steps)):
+        prices = synthetic_prices(args.rows >> step, args.days, rng)
+        started = time.perf_counter()
+        flagged = flag_anomalies(score_prices(prices))
+        seconds = time.perf_counter() - started
+        print(f"{len(prices):>12,} rows {seconds:8.2f}s  "
+              f"{len(prices) / seconds:12,.0f} rows/s  {len(flagged):,} flagged")
+
+
+if __name__ == "__main__":
+    main()
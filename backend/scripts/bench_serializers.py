@@ -0,0 +1,114 @@
+"""
+Benchmark the list serialization paths at 10k rows.
+
+For job runs, task runs and products, times the DRF ModelSerializer +
+JSONRenderer path against the value-row serializers + ORJSONRenderer used by
+the list endpoints, from the queryset to the response bytes, and checks
+both produce the same data. Prints the best of --repeat runs.
+
+By default it runs against an in-memory SQLite DB (config.settings_test);
+pass --settings config.settings to measure against the configured database.
+
+Run:
+    docker compose exec backend bash -lc "uv run python scripts/bench_serializers.py --rows 10000"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def seed(rows):
+    from django.utils import timezone
+    from pricing.models import JobRun, JobStage
+    from task_manager.models import Job
+    from testing.models import Product
+
+    now = timezone.now()
+    JobRun.objects.bulk_create(
+        JobRun(job_type="JOB_NIGHTLY_ETL", job_status="SUCCESS", mode="FULL",
+               rows_processed=i, rows_per_second=i / 3, finished_at=now)
+        for i in range(rows))
+    JobStage.objects.bulk_create(
+        JobStage(job=run, position=position, name=name, calls=1, wall_seconds=0.1)
+        for run in JobRun.objects.all()
+        for position, name in enumerate(("extract", "transform", "load")))
+    Job.objects.bulk_create(
+        Job(job_type="JOB_MANUAL_ETL", job_status="SUCCESS", rows_processed=i,
+            finished_at=now)
+        for i in range(rows))
+    Product.objects.bulk_create(
+        Product(name=f"Product {i}", price=f"{i % 997 + 0.99:.2f}", stock_count=i % 50 + 1)
+        for i in range(rows))
+
+
+def best_of(repeat, fn):
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        seconds.append(time.perf_counter() - started)
+    return min(seconds), body
+
+
+def compare(label, rows, repeat, model_path, values_path):
+    model_seconds, model_body = best_of(repeat, model_path)
+    values_seconds, values_body = best_of(repeat, values_path)
+    assert json.loads(model_body) == json.loads(values_body), f"{label}: outputs differ"
+    print(f"{label:<12} ModelSerializer {model_seconds * 1e3:8.1f} ms   "
+          f"values + orjson {values_seconds * 1e3:8.1f} ms   "
+          f"{model_seconds / values_seconds:5.1f}x   ({rows:,} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--settings", default="config.settings_test")
+    args = parser.parse_args()
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = args.settings
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+
+    from rest_framework.renderers import JSONRenderer
+    from pricing.models import JobRun
+    from pricing.renderers import ORJSONRenderer
+    from pricing.serializers import (
+        CHILD_PROGRESS_ANNOTATIONS, JobRunSerializer, serialize_job_runs,
+    )
+    from task_manager.models import Job
+    from task_manager.serializers import TASK_RUN_VALUES, TaskRunSerializer
+    from testing.models import Product
+    from testing.serializers import TestingProductSerializer
+    from testing.views import PRODUCT_VALUES
+
+    if not Product.objects.exists():
+        seed(args.rows)
+
+    drf, fast = JSONRenderer(), ORJSONRenderer()
+    runs = JobRun.objects.annotate(**CHILD_PROGRESS_ANNOTATIONS).order_by("-id")[:args.rows]
+    jobs = Job.objects.order_by("-id")[:args.rows]
+    products = Product.objects.order_by("id")[:args.rows]
+
+    compare("job runs", args.rows, args.repeat,
+            lambda: drf.render(JobRunSerializer(runs.prefetch_related("stages"), many=True).data),
+            lambda: fast.render(serialize_job_runs(runs)))
+    compare("task runs", args.rows, args.repeat,
+            lambda: drf.render(TaskRunSerializer(jobs, many=True).data),
+            lambda: fast.render(TASK_RUN_VALUES.serialize(jobs)))
+    compare("products", args.rows, args.repeat,
+            lambda: drf.render(TestingProductSerializer(products, many=True).data),
+            lambda: fast.render(PRODUCT_VALUES.serialize(products)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark the overhead per TaskLogger.update() call.
+
+Simulates a chunked job that reports progress after every batch and compares
+writing on every update (flush_interval=0, the previous behaviour) with the
+default coalesced writes. Prints the time per update() and the number of
+UPDATE statements issued.
+
+By default it runs against an in-memory SQLite DB (config.settings_test);
+pass --settings config.settings to measure against the configured database.
+
+Run:
+    docker compose exec backend bash -lc "uv run python scripts/bench_task_logger.py --updates 20000"
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def bench(label, updates, rows_per_update, **logger_kwargs):
+    from django.db import connection
+    from task_manager.logger import TaskLogger
+
+    writes = 0
+
+    def count_updates(execute, sql, params, many, context):
+        nonlocal writes
+        writes += sql.startswith("UPDATE")
+        return execute(sql, params, many, context)
+
+    logger = TaskLogger("bench", "JOB_MANUAL_ETL", **logger_kwargs)
+    logger.start()
+
+    with connection.execute_wrapper(count_updates):
+        started = time.perf_counter()
+        for i in range(1, updates + 1):
+            logger.update(rows_processed=i * rows_per_update)
+        seconds = time.perf_counter() - started
+        logger.success()
+
+    print(f"{label:<28} {seconds / updates * 1e6:10.1f} us/update  {writes:8,} UPDATEs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--rows-per-update", type=int, default=1_000,
+                        help="rows each simulated batch adds")
+    parser.add_argument("--settings", default="config.settings_test")
+    args = parser.parse_args()
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = args.settings
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", "task_manager", verbosity=0)
+
+    bench("save() on every update", args.updates, args.rows_per_update, flush_interval=0)
+    bench("coalesced (defaults)", args.updates, args.rows_per_update)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,40 @@
+"""
+Seed the source DB with a synthetic SAP-like dataset.
+
+The fact tables (daily_prices, competitor_prices) are generated with NumPy,
+one day at a time as a vectorized block of materials x sales orgs x customers
+(or competitors x materials), and streamed to MySQL in chunks of about
+--chunk-rows rows through the bulk loader in pricing.loaders. Every day draws
+from its own random stream derived from --seed, so a dataset is reproducible
+and independent of the chunk size.
+
+--scale multiplies the default volumes (60 products, 3 customers,
+3 competitors); --products/--customers/--competitors/--days override them.
+E.g. ``--products 20000 --customers 25 --days 100`` gives 100M daily prices.
+
+Anomalies as before: a share of the skus gets price spikes (days 10 and 20)
+and too-low prices (days 15 and 30), another share competitor divergences
+(days 12, 28 and 40); the pattern repeats every 45 days.
+
+Run:
+    docker compose exec backend bash -lc "uv run python scripts/seed_source_db.py"
+    docker compose exec backend bash -lc "uv run python scripts/seed_source_db.py --scale 100 --days 365"
+"""
+
+import argparse
 import os
-import random
+import sys
+import time
 from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import MetaData, Table, create_engine, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-random.seed(42)
+from pricing.loaders import bulk_load  # noqa: E402
 
 MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
@@ -12,13 +42,32 @@ MYSQL_SOURCE_HOST = os.getenv("MYSQL_SOURCE_HOST", "mysql_source")
 MYSQL_SOURCE_DB = os.getenv("MYSQL_SOURCE_DB", "source_db")
 
 ENGINE = create_engine(
-    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_SOURCE_HOST}:3306/{MYSQL_SOURCE_DB}"
+    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_SOURCE_HOST}:3306/{MYSQL_SOURCE_DB}",
+    connect_args={"local_infile": True},
 )
 
+BASE_PRODUCTS = 60
+BASE_CUSTOMERS = 3
+BASE_COMPETITORS = 3
 
-def main():
+GROUPS = ["NOTEBOOK", "MONITOR", "MOUSE", "KEYBOARD", "STORAGE", "NETWORK"]
+BRANDS = ["BrandX", "BrandY", "BrandZ", "Lenovoish", "HPish", "Dellish"]
+
+# Anomalies, in the proportions of the original 60-product dataset
+ANOMALY_SKU_SHARE = 8 / 60
+COMP_ANOMALY_SKU_SHARE = 10 / 60
+ANOMALY_PERIOD = 45
+SPIKE_DAYS = (10, 20)
+LOW_DAYS = (15, 30)
+COMP_ANOMALY_DAYS = (12, 28, 40)
+COMP_ANOMALY_FACTORS = np.array([0.65, 0.75, 1.30, 1.45])
+
+# Independent random streams: (seed, stream, day) seeds every daily block
+MASTER_STREAM, PRICES_STREAM, COMP_STREAM = 0, 1, 2
+
+
+def insert_master_data(n_customers: int, n_competitors: int):
     with ENGINE.begin() as conn:
-        # Master data
         conn.execute(text(
             "INSERT IGNORE INTO sales_orgs(code,name) VALUES ('DE01','Germany Sales'),('AT01','Austria Sales')"))
         conn.execute(text(
@@ -35,161 +84,233 @@ def main():
             ('C2000','Reseller Two','RESELLER','DE'),
             ('C3000','Key Account','KEY','AT')
         """))
+        if n_customers > BASE_CUSTOMERS:
+            conn.execute(text(
+                "INSERT IGNORE INTO customers(customer_no,name,customer_group,country)"
+                " VALUES (:no, :name, 'RETAIL', 'DE')"
+            ), [{"no": f"C{n:05d}", "name": f"Load Test Customer {n}"}
+                for n in range(BASE_CUSTOMERS + 1, n_customers + 1)])
 
         conn.execute(text("""
             INSERT IGNORE INTO competitors(name,country) VALUES
             ('CompOne','DE'),('CompTwo','DE'),('CompThree','AT')
         """))
+        if n_competitors > BASE_COMPETITORS:
+            conn.execute(text(
+                "INSERT IGNORE INTO competitors(name,country) VALUES (:name, 'DE')"
+            ), [{"name": f"Comp{n:04d}"}
+                for n in range(BASE_COMPETITORS + 1, n_competitors + 1)])
+
 
-    # Pull IDs
+def ids(query: str, limit: int = None) -> np.ndarray:
     with ENGINE.connect() as conn:
-        vendors = pd.read_sql("SELECT vendor_id FROM vendors", conn)[
-            "vendor_id"].tolist()
-        sales_orgs = pd.read_sql("SELECT sales_org_id FROM sales_orgs", conn)[
-            "sales_org_id"].tolist()
-        plants = pd.read_sql("SELECT plant_id FROM plants", conn)[
-            "plant_id"].tolist()
-        customers = pd.read_sql("SELECT customer_id FROM customers", conn)[
-            "customer_id"].tolist()
-        competitors = pd.read_sql("SELECT competitor_id FROM competitors", conn)[
-            "competitor_id"].tolist()
-
-    # Create 60 products (>=50)
-    n_products = 60
-    groups = ["NOTEBOOK", "MONITOR", "MOUSE", "KEYBOARD", "STORAGE", "NETWORK"]
-    brands = ["BrandX", "BrandY", "BrandZ", "Lenovoish", "HPish", "Dellish"]
-
-    materials = []
-    for i in range(1, n_products + 1):
-        sku = f"SKU{i:04d}"
-        materials.append({
-            "sku": sku,
-            "description": f"Product {i}",
-            "material_group": random.choice(groups),
-            "brand": random.choice(brands),
-            "vendor_id": random.choice(vendors),
-            "base_uom": "EA",
-        })
-    df_mat = pd.DataFrame(materials)
+        values = pd.read_sql(query, conn).iloc[:, 0].to_numpy()
+    return values[:limit] if limit else values
+
+
+def material_rows(n_products: int, vendors: np.ndarray, rng) -> pd.DataFrame:
+    """Master data of SKU0001..SKUnnnn."""
+    return pd.DataFrame({
+        "sku": [f"SKU{i:04d}" for i in range(1, n_products + 1)],
+        "description": [f"Product {i}" for i in range(1, n_products + 1)],
+        "material_group": rng.choice(GROUPS, n_products),
+        "brand": rng.choice(BRANDS, n_products),
+        "vendor_id": rng.choice(vendors, n_products),
+        "base_uom": "EA",
+    })
 
+
+def insert_materials(materials: pd.DataFrame) -> pd.DataFrame:
+    """Insert the ``materials`` that are missing and return them by material_id."""
+    with ENGINE.connect() as conn:
+        existing = set(pd.read_sql("SELECT sku FROM materials", conn)["sku"])
+    missing = materials[~materials["sku"].isin(existing)]
     with ENGINE.begin() as conn:
-        df_mat.to_sql("materials", conn, if_exists="append", index=False)
+        missing.to_sql("materials", conn, if_exists="append", index=False,
+                       method="multi", chunksize=5000)
 
-    # Reload materials with IDs
     with ENGINE.connect() as conn:
         mats = pd.read_sql(
             "SELECT material_id, sku, material_group FROM materials", conn)
+    return (mats[mats["sku"].isin(materials["sku"])]
+            .sort_values("material_id").reset_index(drop=True))
 
-    # Cost history (simple: one cost range per plant)
+
+def cost_rows(mats: pd.DataFrame, plants: np.ndarray, rng) -> pd.DataFrame:
+    """One cost range per material and plant, with slight plant variance."""
     today = date.today()
-    valid_from = today - timedelta(days=120)
-    valid_to = today + timedelta(days=365)
-
-    cost_rows = []
-    for _, row in mats.iterrows():
-        base_cost = random.uniform(8, 900)
-        for plant_id in plants:
-            # slight plant variance
-            cost_rows.append({
-                "material_id": int(row["material_id"]),
-                "plant_id": int(plant_id),
-                "cost": round(base_cost * random.uniform(0.98, 1.03), 4),
-                "cost_currency": "EUR",
-                "valid_from": valid_from,
-                "valid_to": valid_to
-            })
-    df_cost = pd.DataFrame(cost_rows)
-    with ENGINE.begin() as conn:
-        df_cost.to_sql("material_costs", conn, if_exists="append", index=False)
+    base_cost = np.repeat(rng.uniform(8, 900, len(mats)), len(plants))
+    return pd.DataFrame({
+        "material_id": np.repeat(mats["material_id"].to_numpy(), len(plants)),
+        "plant_id": np.tile(plants, len(mats)),
+        "cost": np.round(base_cost * rng.uniform(0.98, 1.03, len(base_cost)), 4),
+        "cost_currency": "EUR",
+        "valid_from": today - timedelta(days=120),
+        "valid_to": today + timedelta(days=365),
+    })
 
-    # Daily prices (last 45 days)
-    start = today - timedelta(days=45)
-    days = 45
 
-    price_rows = []
-    # 8 skus with deliberate weirdness
-    anomaly_skus = set(random.sample(mats["sku"].tolist(), 8))
+def price_block(d: int, dt: date, ctx: dict) -> pd.DataFrame:
+    """All daily prices of day ``d``: materials x sales orgs x customers."""
+    rng = np.random.default_rng([ctx["seed"], PRICES_STREAM, d])
+    material_ids, sales_orgs, customers = ctx["material_ids"], ctx["sales_orgs"], ctx["customers"]
+    per_material = len(sales_orgs) * len(customers)
 
-    # create a "baseline" price per material then add noise per customer/day
-    baseline = {}
-    for _, m in mats.iterrows():
-        # baseline markup over cost roughly
-        base = random.uniform(15, 1200)
-        baseline[m["sku"]] = base
+    price = np.repeat(ctx["baseline"], per_material) * rng.uniform(0.97, 1.03, len(material_ids) * per_material)
+    anomalous = np.repeat(ctx["anomaly_mask"], per_material)
+    if d % ANOMALY_PERIOD in SPIKE_DAYS:
+        price[anomalous] *= rng.uniform(1.25, 1.60, anomalous.sum())
+    if d % ANOMALY_PERIOD in LOW_DAYS:
+        price[anomalous] *= rng.uniform(0.45, 0.70, anomalous.sum())
 
-    for d in range(days):
-        dt = start + timedelta(days=d)
-        for _, m in mats.iterrows():
-            sku = m["sku"]
-            for so in sales_orgs:
-                for cust in customers:
-                    p = baseline[sku] * random.uniform(0.97, 1.03)
-
-                    # Inject anomalies:
-                    if sku in anomaly_skus:
-                        # 1) price spike on a random day
-                        if d in (10, 20):
-                            p *= random.uniform(1.25, 1.60)
-                        # 2) occasional too-low price (potential negative margin)
-                        if d in (15, 30):
-                            p *= random.uniform(0.45, 0.70)
-
-                    price_rows.append({
-                        "dt": dt,
-                        "sales_org_id": int(so),
-                        "customer_id": int(cust),
-                        "material_id": int(m["material_id"]),
-                        "net_price": round(p, 4),
-                        "currency": "EUR",
-                        "source": "SAP"
-                    })
-
-    df_prices = pd.DataFrame(price_rows)
-    with ENGINE.begin() as conn:
-        # replace for repeatable learning runs
-        conn.execute(text("DELETE FROM daily_prices"))
-        df_prices.to_sql("daily_prices", conn, if_exists="append",
-                         index=False, method="multi", chunksize=5000)
+    return pd.DataFrame({
+        "dt": dt,
+        "sales_org_id": np.tile(np.repeat(sales_orgs, len(customers)), len(material_ids)),
+        "customer_id": np.tile(customers, len(material_ids) * len(sales_orgs)),
+        "material_id": np.repeat(material_ids, per_material),
+        "net_price": np.round(price, 4),
+        "currency": "EUR",
+        "source": "SAP",
+    })
+
+
+def competitor_block(d: int, dt: date, ctx: dict) -> pd.DataFrame:
+    """All competitor prices of day ``d``: competitors x skus."""
+    rng = np.random.default_rng([ctx["seed"], COMP_STREAM, d])
+    competitors, skus = ctx["competitors"], ctx["skus"]
+    n = len(competitors) * len(skus)
+
+    price = np.tile(ctx["baseline"], len(competitors)) * rng.uniform(0.92, 1.08, n)
+    if d % ANOMALY_PERIOD in COMP_ANOMALY_DAYS:
+        # competitor suddenly way cheaper or more expensive
+        anomalous = np.tile(ctx["comp_anomaly_mask"], len(competitors))
+        price[anomalous] *= rng.choice(COMP_ANOMALY_FACTORS, anomalous.sum())
 
-    # Competitor prices (match some SKUs, add divergence anomalies)
-    comp_rows = []
-    comp_anomaly_skus = set(random.sample(mats["sku"].tolist(), 10))
+    return pd.DataFrame({
+        "dt": dt,
+        "competitor_id": np.repeat(competitors, len(skus)),
+        "sku": np.tile(skus, len(competitors)),
+        "comp_price": np.round(price, 4),
+        "currency": "EUR",
+        # 3 in 4 in stock
+        "availability": np.where(rng.random(n) < 0.75, "IN_STOCK", "OOS"),
+    })
+
+
+def stream_fact_table(name: str, make_block, start: date, days: int, ctx: dict,
+                      chunk_rows: int, dry_run: bool) -> int:
+    """Generate ``days`` daily blocks and load them in chunks of ~chunk_rows."""
+    table = None if dry_run else Table(name, MetaData(), autoload_with=ENGINE)
+    if not dry_run:
+        with ENGINE.begin() as conn:
+            # replace for repeatable runs
+            conn.execute(text(f"TRUNCATE TABLE {name}"))
+
+    started = time.perf_counter()
+    rows, pending, pending_rows = 0, [], 0
+
+    def flush():
+        nonlocal rows, pending, pending_rows
+        chunk = pd.concat(pending, ignore_index=True)
+        if not dry_run:
+            bulk_load(chunk, table, ENGINE)
+        rows += len(chunk)
+        pending, pending_rows = [], 0
+        seconds = time.perf_counter() - started
+        print(f"  {name}: {rows:>13,} rows  {rows / seconds:12,.0f} rows/s", flush=True)
 
     for d in range(days):
-        dt = start + timedelta(days=d)
-        for comp in competitors:
-            for sku, base in baseline.items():
-                # competitor price baseline near ours
-                cp = base * random.uniform(0.92, 1.08)
-
-                # Inject competitor divergence anomalies
-                if sku in comp_anomaly_skus and d in (12, 28, 40):
-                    # competitor suddenly way cheaper or more expensive
-                    cp *= random.choice([0.65, 0.75, 1.30, 1.45])
-
-                comp_rows.append({
-                    "dt": dt,
-                    "competitor_id": int(comp),
-                    "sku": sku,
-                    "comp_price": round(cp, 4),
-                    "currency": "EUR",
-                    "availability": random.choice(["IN_STOCK", "IN_STOCK", "IN_STOCK", "OOS"]),
-                })
-
-    df_comp = pd.DataFrame(comp_rows)
-    with ENGINE.begin() as conn:
-        conn.execute(text("DELETE FROM competitor_prices"))
-        df_comp.to_sql("competitor_prices", conn, if_exists="append",
-                       index=False, method="multi", chunksize=5000)
+        block = make_block(d, start + timedelta(days=d), ctx)
+        pending.append(block)
+        pending_rows += len(block)
+        if pending_rows >= chunk_rows:
+            flush()
+    if pending:
+        flush()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplies products, customers and competitors")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--competitors", type=int)
+    parser.add_argument("--days", type=int, default=45)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000,
+                        help="rows per bulk load into the source DB")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="generate every table without writing to the source DB")
+    args = parser.parse_args()
+
+    n_products = args.products or max(1, round(BASE_PRODUCTS * args.scale))
+    n_customers = args.customers or max(1, round(BASE_CUSTOMERS * args.scale))
+    n_competitors = args.competitors or max(1, round(BASE_COMPETITORS * args.scale))
+    rng = np.random.default_rng([args.seed, MASTER_STREAM])
+
+    # Every row is generated in both modes, in the same order, so a dry run
+    # draws the same numbers from rng as a real run with the same --seed
+    if args.dry_run:
+        # the ids a fresh source DB assigns
+        vendors, sales_orgs, plants = np.arange(1, 5), np.array([1, 2]), np.array([1, 2])
+        customers = np.arange(1, n_customers + 1)
+        competitors = np.arange(1, n_competitors + 1)
+    else:
+        insert_master_data(n_customers, n_competitors)
+        vendors = ids("SELECT vendor_id FROM vendors")
+        sales_orgs = ids("SELECT sales_org_id FROM sales_orgs ORDER BY sales_org_id")
+        plants = ids("SELECT plant_id FROM plants ORDER BY plant_id")
+        customers = ids("SELECT customer_id FROM customers ORDER BY customer_id", n_customers)
+        competitors = ids("SELECT competitor_id FROM competitors ORDER BY competitor_id",
+                          n_competitors)
+
+    materials = material_rows(n_products, vendors, rng)
+    if args.dry_run:
+        mats = materials.assign(material_id=np.arange(1, n_products + 1))
+    else:
+        mats = insert_materials(materials)
+
+    costs = cost_rows(mats, plants, rng)
+    if not args.dry_run:
+        with ENGINE.begin() as conn:
+            conn.execute(text("TRUNCATE TABLE material_costs"))
+        bulk_load(costs, Table("material_costs", MetaData(), autoload_with=ENGINE), ENGINE)
+
+    skus = mats["sku"].to_numpy()
+    anomaly_skus = rng.choice(skus, max(1, round(len(skus) * ANOMALY_SKU_SHARE)), replace=False)
+    comp_anomaly_skus = rng.choice(skus, max(1, round(len(skus) * COMP_ANOMALY_SKU_SHARE)),
+                                   replace=False)
+    ctx = {
+        "seed": args.seed,
+        "material_ids": mats["material_id"].to_numpy(),
+        "skus": skus,
+        "sales_orgs": sales_orgs,
+        "customers": customers,
+        "competitors": competitors,
+        # a "baseline" price per material, noise is added per customer/day
+        "baseline": rng.uniform(15, 1200, len(skus)),
+        "anomaly_mask": np.isin(skus, anomaly_skus),
+        "comp_anomaly_mask": np.isin(skus, comp_anomaly_skus),
+    }
+
+    start = date.today() - timedelta(days=args.days)
+    print(f"Seeding {args.days} days x {n_products:,} products x {len(sales_orgs)} sales orgs"
+          f" x {len(customers):,} customers, {len(competitors):,} competitors")
+    n_prices = stream_fact_table("daily_prices", price_block, start, args.days, ctx,
+                                 args.chunk_rows, args.dry_run)
+    n_comp = stream_fact_table("competitor_prices", competitor_block, start, args.days, ctx,
+                               args.chunk_rows, args.dry_run)
 
     print("Seed complete.")
-    print(f"Products: {len(mats)}")
-    print(f"Daily prices rows: {len(df_prices)}")
-    print(f"Competitor prices rows: {len(df_comp)}")
+    print(f"Products: {len(mats):,}")
+    print(f"Daily prices rows: {n_prices:,}")
+    print(f"Competitor prices rows: {n_comp:,}")
     print(
-        f"Anomaly SKUs (pricing spikes/too low): {sorted(list(anomaly_skus))[:5]} ...")
+        f"Anomaly SKUs (pricing spikes/too low): {sorted(anomaly_skus)[:5]} ...")
     print(
-        f"Competitor divergence SKUs: {sorted(list(comp_anomaly_skus))[:5]} ...")
+        f"Competitor divergence SKUs: {sorted(comp_anomaly_skus)[:5]} ...")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""
+Admission control of the enqueue endpoints.
+
+Tasks are routed to one queue per workload class (CELERY_TASK_ROUTES: etl,
+ml, interactive), each consumed by its own workers. Before enqueueing, an
+endpoint asks ``check_admission`` whether the task's queue has room: a
+queue already holding its ``max_depth`` waiting tasks (TASK_QUEUE_ADMISSION)
+turns new work away with 429 instead of piling it up, and a broker that
+cannot be reached with 503. Both come with a Retry-After:
+
+- queue full: ``seconds_per_task`` for every task that has to leave the
+  queue before there is room again
+- broker unreachable: BROKER_RETRY_AFTER
+
+Queue depth is read with a passive queue declare, which the Redis transport
+answers with an LLEN per priority level, so a check costs one round trip.
+Queues without an entry in TASK_QUEUE_ADMISSION are never checked.
+"""
+
+import logging
+from typing import NamedTuple, Optional
+
+from amqp.exceptions import ChannelError
+from celery import current_app
+from django.conf import settings
+from kombu.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before retrying while the broker is unreachable
+BROKER_RETRY_AFTER = 30
+# Retry-After never exceeds this, however deep the backlog
+MAX_RETRY_AFTER = 60 * 60
+
+
+class Rejection(NamedTuple):
+    status: int                   # 429 (backlog) or 503 (broker down)
+    queue: str
+    retry_after: int              # seconds
+    depth: Optional[int] = None   # waiting tasks, if known
+
+
+def task_queue(task) -> str:
+    """Name of the queue ``task`` is routed to."""
+    return current_app.amqp.router.route({}, task.name)["queue"].name
+
+
+def queue_depth(queue: str) -> int:
+    """Number of tasks waiting in ``queue`` (not yet reserved by a worker)."""
+    with current_app.connection_or_acquire() as conn:
+        conn.ensure_connection(max_retries=1)
+        try:
+            return conn.default_channel.queue_declare(queue=queue, passive=True).message_count
+        except ChannelError:
+            # never declared, or drained (Redis drops empty lists)
+            return 0
+
+
+def check_admission(task) -> Optional[Rejection]:
+    """
+    Whether ``task`` may be enqueued now.
+
+    Returns:
+        None if it may, else why not and when to retry
+    """
+    queue = task_queue(task)
+    limits = settings.TASK_QUEUE_ADMISSION.get(queue)
+    if limits is None:
+        return None
+
+    try:
+        depth = queue_depth(queue)
+    except (OperationalError, OSError) as exc:
+        logger.warning("Cannot read the depth of queue %s: %s", queue, exc)
+        return Rejection(503, queue, BROKER_RETRY_AFTER)
+
+    excess = depth - limits["max_depth"]
+    if excess < 0:
+        return None
+    retry_after = min(MAX_RETRY_AFTER, max(1, round((excess + 1) * limits["seconds_per_task"])))
+    return Rejection(429, queue, retry_after, depth)
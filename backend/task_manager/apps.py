@@ -1,5 +1,9 @@
 from django.apps import AppConfig
 
 
-class JobManagerConfig(AppConfig):
-    name = 'job_manager'
+class TaskManagerConfig(AppConfig):
+    name = 'task_manager'
+
+    def ready(self):
+        # Connects the Celery and post_save handlers publishing task events
+        from . import events  # noqa: F401
@@ -0,0 +1,187 @@
+"""
+Task status events over Redis pub/sub, streamed to clients as Server-Sent Events.
+
+Every status change of a Celery task is published on ``task-events:<task_id>``:
+
+- ``task`` events from Celery's task signals (STARTED, SUCCESS, FAILURE,
+  REVOKED), with the result once the task succeeded
+- ``job`` events whenever the task's ``JobRun`` or ``task_manager.Job`` row is
+  written: created, progress (as often as the row is saved, so TaskLogger's
+  coalescing applies) and the final status
+
+The latest event of each kind is also kept in the hash
+``task-events:<task_id>:state`` for EVENT_TTL seconds, so a client subscribing
+late, or after the task finished, gets the current state first.
+
+``stream()`` turns the channel of one task into SSE frames for
+``GET /api/task/<task_id>/events``; the stream ends once the task is ready and
+its job, if it has one, has finished. Clients subscribe once per task instead
+of polling ``task/<task_id>`` and ``jobs/latest/``.
+
+Publishing is best effort: Redis errors are logged and never fail a task.
+An empty TASK_EVENTS_REDIS_URL disables events.
+"""
+
+import json
+import logging
+import time
+from functools import lru_cache
+
+import redis
+from celery import states
+from celery.signals import task_failure, task_prerun, task_revoked, task_success
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from pricing.models import JobRun
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds the last state of a task is kept for late subscribers
+EVENT_TTL = 60 * 60
+# Seconds between SSE keep-alive comments while no event arrives
+HEARTBEAT_INTERVAL = 15
+# Upper bound on the lifetime of one stream
+STREAM_TIMEOUT = 60 * 60
+
+JOB_FINISHED = {"SUCCESS", "FAILED", "SKIPPED"}
+JOB_EVENT_FIELDS = ("job_type", "job_status", "rows_processed", "rows_per_second",
+                    "started_at", "finished_at", "error_message")
+
+
+def channel(task_id: str) -> str:
+    return f"task-events:{task_id}"
+
+
+def state_key(task_id: str) -> str:
+    return f"task-events:{task_id}:state"
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    """Shared Redis client for publishing, None if events are disabled."""
+    url = settings.TASK_EVENTS_REDIS_URL
+    return redis.Redis.from_url(url) if url else None
+
+
+def publish(task_id: str, kind: str, payload: dict) -> None:
+    """Publish a ``kind`` ("task" or "job") event and store it as the task's latest."""
+    client = get_redis()
+    if client is None or not task_id:
+        return
+
+    message = json.dumps({"event": kind, "task_id": task_id, **payload}, default=str)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(state_key(task_id), kind, message)
+        pipe.expire(state_key(task_id), EVENT_TTL)
+        pipe.publish(channel(task_id), message)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Could not publish %s event of task %s: %s", kind, task_id, exc)
+
+
+def job_event(job) -> dict:
+    """Payload of a ``job`` event for a ``JobRun`` or ``Job``."""
+    return {
+        "job_id": job.pk,
+        **{field: getattr(job, field, None) for field in JOB_EVENT_FIELDS},
+    }
+
+
+def _on_job_saved(sender, instance, **kwargs):
+    if instance.celery_task_id and get_redis() is not None:
+        # The state as saved, published once committed: a rolled back write
+        # must not reach clients
+        task_id, payload = instance.celery_task_id, job_event(instance)
+        transaction.on_commit(lambda: publish(task_id, "job", payload))
+
+
+post_save.connect(_on_job_saved, sender=JobRun, dispatch_uid="task_events_jobrun")
+post_save.connect(_on_job_saved, sender=Job, dispatch_uid="task_events_job")
+
+
+@task_prerun.connect(dispatch_uid="task_events_prerun")
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    publish(task_id, "task", {"task": task.name, "status": states.STARTED})
+
+
+@task_success.connect(dispatch_uid="task_events_success")
+def _on_task_success(sender=None, result=None, **kwargs):
+    publish(sender.request.id, "task",
+            {"task": sender.name, "status": states.SUCCESS, "result": result})
+
+
+@task_failure.connect(dispatch_uid="task_events_failure")
+def _on_task_failure(sender=None, task_id=None, exception=None, **kwargs):
+    publish(task_id, "task",
+            {"task": sender.name, "status": states.FAILURE, "error": str(exception)})
+
+
+@task_revoked.connect(dispatch_uid="task_events_revoked")
+def _on_task_revoked(sender=None, request=None, **kwargs):
+    publish(request.id, "task", {"task": sender.name, "status": states.REVOKED})
+
+
+def is_finished(state: dict) -> bool:
+    """
+    Whether no more events are expected for a task whose latest events are
+    ``state`` ({kind: event}).
+
+    A task is finished once it is ready and its job, if any, has finished too:
+    partitioned runs return before their chord callback finishes the job.
+    """
+    task, job = state.get("task"), state.get("job")
+    if task is None or task["status"] not in states.READY_STATES:
+        return False
+    return job is None or job["job_status"] in JOB_FINISHED
+
+
+def sse_frame(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _stream_client():
+    return redis.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+
+
+def stream(task_id: str, timeout: float = STREAM_TIMEOUT,
+           heartbeat: float = HEARTBEAT_INTERVAL):
+    """
+    Yield the SSE frames of a task's events until it has finished or
+    ``timeout`` passed.
+
+    A plain generator: the WSGI handler sends each frame as it is yielded,
+    blocking in ``get_message`` for at most ``heartbeat`` seconds between them.
+    """
+    client = _stream_client()
+    pubsub = client.pubsub()
+    deadline = time.monotonic() + timeout
+    try:
+        # Subscribe before reading the state so no event falls in between;
+        # an event seen twice just repeats the same state
+        pubsub.subscribe(channel(task_id))
+        latest = client.hgetall(state_key(task_id))
+        state = {}
+        for _, message in sorted(latest.items()):
+            event = json.loads(message)
+            state[event["event"]] = event
+            yield sse_frame(event)
+
+        while not is_finished(state):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=min(heartbeat, remaining))
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = json.loads(message["data"])
+            state[event["event"]] = event
+            yield sse_frame(event)
+    finally:
+        pubsub.close()
+        client.close()
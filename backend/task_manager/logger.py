@@ -20,11 +20,27 @@ Usage in Celery tasks:
         except Exception as e:
             logger.failure(str(e))
             raise
+
+Progress updates are coalesced: update() only changes the Job in memory and
+writes the changed fields (with update_fields) once FLUSH_INTERVAL seconds
+have passed or FLUSH_ROWS rows have been processed since the last write.
+success(), failure() and leaving the context manager always write the final
+state.
 """
 
+import time
+
 from django.utils import timezone
 from .models import Job
 
+# Write buffered progress at most every FLUSH_INTERVAL seconds ...
+FLUSH_INTERVAL = 2.0
+# ... unless FLUSH_ROWS more rows were processed since the last write
+FLUSH_ROWS = 100_000
+
+# Fields update() may buffer; other attributes are set but never written
+_JOB_FIELDS = {field.name for field in Job._meta.concrete_fields}
+
 
 class TaskLogger:
     """
@@ -34,6 +50,8 @@ class TaskLogger:
         task_id: The Celery task ID
         task_type: One of the JOB_TYPES defined in the Job model
         job: The Job model instance (created on start())
+        flush_interval: Seconds between progress writes
+        flush_rows: Processed rows that force a progress write
     """
 
     TASK_TYPES = {
@@ -43,13 +61,19 @@ class TaskLogger:
         "JOB_ML_PREDICT": "Job ML Prediction",
     }
 
-    def __init__(self, task_id: str, task_type: str):
+    def __init__(self, task_id: str, task_type: str,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 flush_rows: int = FLUSH_ROWS):
         """
         Initialize the TaskLogger.
 
         Args:
             task_id: The Celery task ID (self.request.id in a bound task)
             task_type: The type of job (must be one of TASK_TYPES keys)
+            flush_interval: Seconds between progress writes (0 writes on
+                every update())
+            flush_rows: Processed rows since the last write that force a
+                write
         """
         if task_type not in self.TASK_TYPES:
             raise ValueError(
@@ -58,6 +82,12 @@ class TaskLogger:
         self.task_id = task_id
         self.task_type = task_type
         self.job = None
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+
+        self._dirty = set()
+        self._flushed_at = time.monotonic()
+        self._flushed_rows = 0
 
     def start(self) -> "Job":
         """
@@ -71,11 +101,16 @@ class TaskLogger:
             job_type=self.task_type,
             job_status="RUNNING",
         )
+        self._flushed_at = time.monotonic()
         return self.job
 
     def update(self, rows_processed: int = None, **kwargs) -> "Job":
         """
-        Update the Job record with progress information.
+        Record progress information on the Job.
+
+        The values are buffered on the in-memory Job and written by the
+        first update() after ``flush_interval`` seconds or ``flush_rows``
+        rows, or by flush(), success() or failure().
 
         Args:
             rows_processed: Number of rows processed so far
@@ -90,14 +125,31 @@ class TaskLogger:
 
         if rows_processed is not None:
             self.job.rows_processed = rows_processed
+            self._dirty.add("rows_processed")
 
         for key, value in kwargs.items():
             if hasattr(self.job, key):
                 setattr(self.job, key, value)
+                if key in _JOB_FIELDS:
+                    self._dirty.add(key)
+
+        rows_due = (self.job.rows_processed or 0) - self._flushed_rows >= self.flush_rows
+        if rows_due or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+        return self.job
 
-        self.job.save()
+    def flush(self) -> "Job":
+        """Write the buffered progress fields, if any."""
+        if self.job and self._dirty:
+            self._save(self._dirty)
         return self.job
 
+    def _save(self, fields) -> None:
+        self.job.save(update_fields=sorted({*fields, "updated_at"}))
+        self._dirty = set()
+        self._flushed_at = time.monotonic()
+        self._flushed_rows = self.job.rows_processed or 0
+
     def success(self, rows_processed: int = None) -> "Job":
         """
         Mark the Job as SUCCESS and set the finished timestamp.
@@ -117,8 +169,9 @@ class TaskLogger:
 
         if rows_processed is not None:
             self.job.rows_processed = rows_processed
+            self._dirty.add("rows_processed")
 
-        self.job.save()
+        self._save(self._dirty | {"job_status", "finished_at"})
         return self.job
 
     def failure(self, error_message: str) -> "Job":
@@ -144,7 +197,7 @@ class TaskLogger:
             self.job.job_status = "FAILED"
             self.job.finished_at = timezone.now()
             self.job.error_message = error_message
-            self.job.save()
+            self._save(self._dirty | {"job_status", "finished_at", "error_message"})
 
         return self.job
 
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['job_type', 'job_status', 'created_at'], name='job_type_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['created_at'], name='job_created'),
+        ),
+    ]
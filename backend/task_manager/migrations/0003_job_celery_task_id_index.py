@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0002_job_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='celery_task_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+    ]
@@ -18,7 +18,8 @@ class Job(models.Model):
         ("FAILED", "Failed"),
     ]
 
-    celery_task_id = models.CharField(max_length=255, blank=True, null=True)
+    celery_task_id = models.CharField(
+        max_length=255, blank=True, null=True, db_index=True)
     job_type = models.CharField(max_length=50, choices=JOB_TYPES)
     job_status = models.CharField(
         max_length=20, choices=JOB_STATUS, default="PENDING")
@@ -27,6 +28,16 @@ class Job(models.Model):
     rows_processed = models.IntegerField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Every save; partial saves must list it in update_fields. Part of the
+    # ETag of the run listing
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["job_type", "job_status", "created_at"],
+                         name="job_type_status_created"),
+            models.Index(fields=["created_at"], name="job_created"),
+        ]
 
     def __str__(self):
         return f"JobRun {self.job_type} [{self.job_status}] - {self.created_at:%Y-%m-%d %H:%M:%S}"
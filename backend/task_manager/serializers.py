@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from pricing.value_serializers import ValuesSerializer
+from .models import Job
+
+
+class TaskRunSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Job
+        fields = "__all__"
+
+
+# TaskRunSerializer's output for the run listing, built from value rows
+TASK_RUN_VALUES = ValuesSerializer(Job)
@@ -0,0 +1,148 @@
+"""
+Single-flight coalescing of duplicate task triggers.
+
+At most one run per flight key (pipeline + the parameters that make two runs
+equivalent, see ``flight_key``) is in flight at a time. The key is a Redis
+string holding the Celery task id of the run in flight:
+
+- ``trigger`` (endpoints) claims the key for a new task id before enqueueing
+  (and releases it if enqueueing fails); while another run holds it,
+  nothing is enqueued and the running task id is returned instead. With
+  ``follow_up=True`` exactly one follow-up run is queued behind it, however
+  many triggers ask for one.
+- ``claim`` (at the start of the task) lets a run enqueued by ``trigger``
+  proceed and turns away runs started around it, e.g. by beat.
+- ``land`` (when the run finishes, either way) releases the key, or hands it
+  to the queued follow-up run and enqueues that.
+
+Keys expire after FLIGHT_TTL seconds, so a worker killed mid-run cannot block
+a pipeline for longer than that. Redis errors fail open (the run proceeds),
+and an empty TASK_LOCKS_REDIS_URL disables coalescing.
+"""
+
+import json
+import logging
+import os
+import uuid
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import redis
+from celery import current_app
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds a flight key outlives a run that never landed
+FLIGHT_TTL = int(os.getenv("SINGLE_FLIGHT_TTL", 2 * 60 * 60))
+
+# Release KEYS[1] if ARGV[1] holds it; hand it to the follow-up run queued in
+# KEYS[2], if any, and return that run
+LAND_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return false
+end
+local follow_up = redis.call('GET', KEYS[2])
+if follow_up then
+    redis.call('DEL', KEYS[2])
+    redis.call('SET', KEYS[1], cjson.decode(follow_up)['task_id'], 'EX', ARGV[2])
+    return follow_up
+end
+redis.call('DEL', KEYS[1])
+return false
+"""
+
+
+class Flight(NamedTuple):
+    task_id: str                        # the run in flight for the key
+    started: bool                       # whether this trigger enqueued it
+    follow_up_id: Optional[str] = None  # the follow-up run queued behind it
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    """Shared Redis client, None if coalescing is disabled."""
+    url = settings.TASK_LOCKS_REDIS_URL
+    return redis.Redis.from_url(url, decode_responses=True) if url else None
+
+
+def flight_key(pipeline: str, **params) -> str:
+    """Key of the runs of ``pipeline`` with ``params``."""
+    return f"single-flight:{pipeline}:{json.dumps(params, sort_keys=True)}"
+
+
+def _follow_up_key(key: str) -> str:
+    return f"{key}:follow-up"
+
+
+def claim(key: str, task_id: str) -> Optional[str]:
+    """
+    Claim ``key`` for the run ``task_id``.
+
+    Returns:
+        None if the run may proceed, else the id of the run in flight
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        for _ in range(2):  # the holder may land between SET and GET
+            if client.set(key, task_id, nx=True, ex=FLIGHT_TTL):
+                return None
+            owner = client.get(key)
+            if owner is not None:
+                return None if owner == task_id else owner
+    except redis.RedisError as exc:
+        logger.warning("Single-flight claim of %s failed, running anyway: %s", key, exc)
+    return None
+
+
+def trigger(task, key: str, kwargs: dict, follow_up: bool = False) -> Flight:
+    """Enqueue ``task`` with ``kwargs`` unless a run of ``key`` is in flight."""
+    task_id = str(uuid.uuid4())
+    owner = claim(key, task_id)
+    if owner is None:
+        try:
+            task.apply_async(kwargs=kwargs, task_id=task_id)
+        except Exception:
+            # Never queued: release the key instead of having every trigger
+            # join a run that does not exist until the key expires
+            land(key, task_id)
+            raise
+        return Flight(task_id, started=True)
+
+    follow_up_id = None
+    if follow_up:
+        queued = json.dumps({"task_id": task_id, "task": task.name, "kwargs": kwargs})
+        client = get_redis()
+        try:
+            client.set(_follow_up_key(key), queued, nx=True, ex=FLIGHT_TTL)
+            follow_up_id = json.loads(client.get(_follow_up_key(key)) or queued)["task_id"]
+        except redis.RedisError as exc:
+            logger.warning("Could not queue a follow-up run of %s: %s", key, exc)
+    return Flight(owner, started=False, follow_up_id=follow_up_id)
+
+
+def land(key: str, task_id: str) -> Optional[str]:
+    """
+    Release ``key`` after the run ``task_id`` finished, enqueueing the
+    follow-up run if one was queued.
+
+    Returns:
+        the id of the follow-up run, if any
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        queued = client.eval(LAND_SCRIPT, 2, key, _follow_up_key(key), task_id, FLIGHT_TTL)
+    except redis.RedisError as exc:
+        logger.warning("Could not release %s, it expires in %ss: %s", key, FLIGHT_TTL, exc)
+        return None
+    if not queued:
+        return None
+
+    follow_up = json.loads(queued)
+    current_app.send_task(follow_up["task"], kwargs=follow_up["kwargs"],
+                          task_id=follow_up["task_id"])
+    return follow_up["task_id"]
@@ -0,0 +1,76 @@
+"""
+Status of many Celery tasks in a constant number of round trips.
+
+``AsyncResult(task_id).status`` costs one Redis GET per task and ``ready()`` /
+``result`` another each, so a dashboard showing hundreds of tasks makes
+hundreds of round trips. ``task_statuses`` reads all the result metadata with
+a single MGET on the result backend and resolves the ids without a result
+(expired after ``result_expires``, or never stored) with one query per job
+table on ``celery_task_id``. Ids nobody knows are PENDING, as in Celery.
+"""
+
+from celery import current_app, states
+
+from pricing.models import JobRun
+from .models import Job
+
+# Largest batch one request may ask for
+MAX_TASK_IDS = 1000
+
+# Job status -> the Celery state it corresponds to
+JOB_TASK_STATES = {
+    "PENDING": states.PENDING,
+    "RUNNING": states.STARTED,
+    "SUCCESS": states.SUCCESS,
+    "FAILED": states.FAILURE,
+    "SKIPPED": states.SUCCESS,
+}
+
+
+def _result_backend():
+    return current_app.backend
+
+
+def _backend_metas(task_ids, backend) -> dict:
+    """Result metadata of the ``task_ids`` the backend still has, with one MGET."""
+    if not hasattr(backend, "mget"):
+        # Not a key-value backend (or results disabled): leave it to the jobs
+        return {}
+    keys = [backend.get_key_for_task(task_id) for task_id in task_ids]
+    values = backend.mget(keys)
+    if hasattr(values, "items"):
+        # Cache backends return {key: value} without the misses
+        values = [values.get(key) for key in keys]
+    return {
+        task_id: backend.meta_from_decoded(backend.decode_result(value))
+        for task_id, value in zip(task_ids, values) if value
+    }
+
+
+def task_statuses(task_ids, include_result: bool = False) -> dict:
+    """
+    Celery state of every id in ``task_ids``.
+
+    Returns:
+        ``{"statuses": {task_id: state}}``, plus ``"results": {task_id:
+        result}`` of the succeeded tasks whose result is still stored if
+        ``include_result``
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    metas = _backend_metas(task_ids, _result_backend()) if task_ids else {}
+    statuses = {task_id: meta["status"] for task_id, meta in metas.items()}
+
+    missing = [task_id for task_id in task_ids if task_id not in statuses]
+    for model in (JobRun, Job) if missing else ():
+        jobs = model.objects.filter(celery_task_id__in=missing).order_by("created_at")
+        # the latest job wins if a task id was reused
+        for task_id, job_status in jobs.values_list("celery_task_id", "job_status"):
+            statuses[task_id] = JOB_TASK_STATES[job_status]
+        missing = [task_id for task_id in missing if task_id not in statuses]
+
+    response = {"statuses": {task_id: statuses.get(task_id, states.PENDING)
+                             for task_id in task_ids}}
+    if include_result:
+        response["results"] = {task_id: meta["result"] for task_id, meta in metas.items()
+                               if meta["status"] == states.SUCCESS}
+    return response
@@ -1,3 +1,482 @@
-from django.test import TestCase
+import json
+import time
+from unittest.mock import ANY, MagicMock, patch
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from celery.backends.cache import CacheBackend
+
+from config.celery_app import app as celery_app
+from pricing.models import JobRun
+from pricing.tasks import (
+    background_product_etl, detect_price_anomalies_job, nightly_product_etl,
+    rollup_job_stats, test_task,
+)
+from . import admission, events, singleflight
+from .logger import TaskLogger
+from .models import Job
+
+
+class TestTaskLoggerCoalescing(TestCase):
+
+    def make_logger(self, **kwargs):
+        logger = TaskLogger("task-1", "JOB_MANUAL_ETL", **kwargs)
+        logger.start()
+        return logger
+
+    def test_updates_within_interval_are_buffered(self):
+        logger = self.make_logger(flush_interval=60, flush_rows=10_000)
+
+        with self.assertNumQueries(0):
+            for rows in range(0, 5_000, 100):
+                logger.update(rows_processed=rows)
+
+        self.assertIsNone(Job.objects.get().rows_processed)
+        self.assertEqual(logger.job.rows_processed, 4_900)
+
+    def test_flushes_after_flush_rows_with_update_fields(self):
+        logger = self.make_logger(flush_interval=60, flush_rows=1_000)
+
+        with patch.object(Job, "save", autospec=True, side_effect=Job.save) as save:
+            for rows in range(100, 2_600, 100):
+                logger.update(rows_processed=rows)
+
+        # at 1000 and 2000 rows
+        self.assertEqual(save.call_count, 2)
+        self.assertEqual(save.call_args.kwargs, {"update_fields": ["rows_processed", "updated_at"]})
+        self.assertEqual(Job.objects.get().rows_processed, 2_000)
+
+    def test_flushes_after_flush_interval(self):
+        logger = self.make_logger(flush_interval=2, flush_rows=10_000)
+
+        with patch("task_manager.logger.time.monotonic", return_value=logger._flushed_at + 1):
+            logger.update(rows_processed=10)
+        self.assertIsNone(Job.objects.get().rows_processed)
+
+        with patch("task_manager.logger.time.monotonic", return_value=logger._flushed_at + 3):
+            logger.update(rows_processed=20)
+        self.assertEqual(Job.objects.get().rows_processed, 20)
+
+    def test_success_writes_buffered_state(self):
+        logger = self.make_logger(flush_interval=60)
+        logger.update(rows_processed=42, error_message="retrying")
+
+        with self.assertNumQueries(1):
+            logger.success()
+
+        job = Job.objects.get()
+        self.assertEqual(job.job_status, "SUCCESS")
+        self.assertEqual(job.rows_processed, 42)
+        self.assertEqual(job.error_message, "retrying")
+        self.assertIsNotNone(job.finished_at)
+
+    def test_context_manager_writes_buffered_state_on_failure(self):
+        with self.assertRaises(RuntimeError):
+            with TaskLogger("task-2", "JOB_NIGHTLY_ETL", flush_interval=60) as logger:
+                logger.update(rows_processed=7)
+                raise RuntimeError("boom")
+
+        job = Job.objects.get()
+        self.assertEqual(job.job_status, "FAILED")
+        self.assertEqual(job.rows_processed, 7)
+        self.assertEqual(job.error_message, "boom")
+
+    def test_zero_interval_writes_every_update(self):
+        logger = self.make_logger(flush_interval=0)
+        with self.assertNumQueries(3):
+            for rows in (1, 2, 3):
+                logger.update(rows_processed=rows)
+
+    def test_update_before_start_raises(self):
+        with self.assertRaises(RuntimeError):
+            TaskLogger("task-3", "JOB_ML_TRAIN").update(rows_processed=1)
+
+
+def published(client):
+    """Events sent through a mocked publishing client, in order."""
+    return [json.loads(call.args[1])
+            for call in client.pipeline.return_value.publish.call_args_list]
+
+
+class TestTaskEventPublishing(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        patcher = patch.object(events, "get_redis", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_job_writes_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            logger = TaskLogger("task-1", "JOB_MANUAL_ETL", flush_interval=60)
+            logger.start()
+            logger.update(rows_processed=10)  # buffered, no write, no event
+            logger.success(rows_processed=20)
+
+        jobs = published(self.client)
+        self.assertEqual([(e["job_status"], e["rows_processed"]) for e in jobs],
+                         [("RUNNING", None), ("SUCCESS", 20)])
+        self.assertEqual(jobs[0]["task_id"], "task-1")
+        pipe = self.client.pipeline.return_value
+        pipe.hset.assert_called_with("task-events:task-1:state", "job", ANY)
+        pipe.publish.assert_called_with("task-events:task-1", ANY)
+
+    def test_celery_signals_publish_task_events(self):
+        result = test_task.apply(args=(0,), task_id="task-2")
+
+        tasks = published(self.client)
+        self.assertEqual([e["status"] for e in tasks], ["STARTED", "SUCCESS"])
+        self.assertEqual(tasks[1]["result"], result.get())
+
+    def test_redis_errors_do_not_fail_the_task(self):
+        self.client.pipeline.return_value.execute.side_effect = events.redis.ConnectionError
+        with self.assertLogs("task_manager.events", "WARNING"):
+            events.publish("task-3", "task", {"status": "STARTED"})
+
+
+class FakePubSub:
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.reads = 0
+
+    def subscribe(self, channel):
+        self.channel = channel
+
+    def get_message(self, ignore_subscribe_messages, timeout):
+        self.reads += 1
+        if not self.messages:
+            time.sleep(timeout)
+            return None
+        return {"data": json.dumps(self.messages.pop(0))}
+
+    def close(self):
+        pass
+
+
+class FakeStreamRedis:
+
+    def __init__(self, state, messages):
+        self.state = {kind.encode(): json.dumps(event) for kind, event in state.items()}
+        self._pubsub = FakePubSub(messages)
+
+    def pubsub(self):
+        return self._pubsub
+
+    def hgetall(self, key):
+        return self.state
+
+    def close(self):
+        pass
+
+
+def collect(client, **kwargs):
+    with patch.object(events, "_stream_client", return_value=client):
+        return list(events.stream("t1", **kwargs))
+
+
+class TestTaskEventStream(SimpleTestCase):
+
+    def test_replays_state_then_streams_until_finished(self):
+        client = FakeStreamRedis(
+            state={"task": {"event": "task", "status": "STARTED"}},
+            messages=[
+                {"event": "job", "job_status": "RUNNING", "rows_processed": 5},
+                # the task returns before its chord callback finishes the job
+                {"event": "task", "status": "SUCCESS"},
+                {"event": "job", "job_status": "SUCCESS", "rows_processed": 9},
+                {"event": "job", "job_status": "SUCCESS", "rows_processed": 9},
+            ])
+
+        frames = collect(client)
+
+        self.assertEqual(len(frames), 4)
+        self.assertTrue(frames[0].startswith("event: task\ndata: "))
+        self.assertEqual(json.loads(frames[-1].split("data: ")[1])["job_status"], "SUCCESS")
+
+    def test_finished_task_replays_and_closes(self):
+        client = FakeStreamRedis(
+            state={"task": {"event": "task", "status": "FAILURE"}}, messages=[])
+        self.assertEqual(len(collect(client)), 1)
+
+    def test_heartbeats_until_timeout(self):
+        client = FakeStreamRedis(state={}, messages=[])
+        frames = collect(client, timeout=0.05, heartbeat=0.02)
+        self.assertTrue(frames)
+        self.assertEqual(set(frames), {": keep-alive\n\n"})
+
+    def test_view_streams_events(self):
+        client = FakeStreamRedis(
+            state={"task": {"event": "task", "status": "SUCCESS"}}, messages=[])
+        with override_settings(TASK_EVENTS_REDIS_URL="redis://events"), \
+                patch.object(events, "_stream_client", return_value=client):
+            response = self.client.get("/api/task/t1/events")
+            body = b"".join(response.streaming_content)
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn(b'"status": "SUCCESS"', body)
+
+    def test_view_sends_events_before_the_job_finishes(self):
+        client = FakeStreamRedis(
+            state={"task": {"event": "task", "status": "STARTED"}},
+            messages=[{"event": "job", "job_status": "RUNNING", "rows_processed": 5},
+                      {"event": "task", "status": "SUCCESS"},
+                      {"event": "job", "job_status": "SUCCESS", "rows_processed": 9}])
+        with override_settings(TASK_EVENTS_REDIS_URL="redis://events"), \
+                patch.object(events, "_stream_client", return_value=client):
+            response = self.client.get("/api/task/t1/events")
+            self.assertFalse(response.is_async)
+            chunks = iter(response.streaming_content)
+
+            self.assertIn(b'"status": "STARTED"', next(chunks))
+            # the replayed state went out before any live event was read
+            self.assertEqual(client.pubsub().reads, 0)
+            self.assertIn(b'"job_status": "RUNNING"', next(chunks))
+            self.assertEqual(client.pubsub().reads, 1)
+            self.assertEqual(len(list(chunks)), 2)
+
+    def test_view_unavailable_without_redis(self):
+        response = self.client.get("/api/task/t1/events")
+        self.assertEqual(response.status_code, 503)
+
+
+class TestTaskStatuses(TestCase):
+
+    def setUp(self):
+        self.backend = CacheBackend(app=celery_app, backend="memory")
+        self.backend.store_result("done", {"rows": 3}, "SUCCESS")
+        self.backend.store_result("broken", ValueError("boom"), "FAILURE")
+        self.backend.store_result("busy", None, "STARTED")
+        patcher = patch("task_manager.status._result_backend", return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_backend_round_trip_and_one_query_per_job_table(self):
+        JobRun.objects.create(job_type="JOB_NIGHTLY_ETL", job_status="SUCCESS",
+                              celery_task_id="expired")
+        Job.objects.create(job_type="JOB_ML_TRAIN", job_status="RUNNING",
+                           celery_task_id="logged")
+        ids = ["done", "broken", "busy", "expired", "logged", "unknown", "done"]
+
+        with patch.object(self.backend, "mget", wraps=self.backend.mget) as mget, \
+                self.assertNumQueries(2):
+            response = self.client.post("/api/task/statuses",
+                                        {"task_ids": ids, "include_result": True},
+                                        content_type="application/json")
+
+        mget.assert_called_once()
+        self.assertEqual(response.json(), {
+            "statuses": {"done": "SUCCESS", "broken": "FAILURE", "busy": "STARTED",
+                         "expired": "SUCCESS", "logged": "STARTED", "unknown": "PENDING"},
+            "results": {"done": {"rows": 3}},
+        })
+
+    def test_all_in_backend_skips_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/task/statuses", {"task_ids": ["done"]},
+                                        content_type="application/json")
+        self.assertEqual(response.json(), {"statuses": {"done": "SUCCESS"}})
+
+    def test_rejects_bad_task_ids(self):
+        for body in ({}, {"task_ids": "done"}, {"task_ids": [1]},
+                     {"task_ids": ["t"] * 1001}):
+            with self.subTest(body=str(body)[:30]):
+                response = self.client.post("/api/task/statuses", body,
+                                            content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+
+
+class FakeLockRedis:
+    """The part of Redis the single-flight module uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, key, follow_up_key, task_id, ttl):
+        assert script == singleflight.LAND_SCRIPT
+        if self.data.get(key) != task_id:
+            return None
+        follow_up = self.data.pop(follow_up_key, None)
+        if follow_up:
+            self.data[key] = json.loads(follow_up)["task_id"]
+            return follow_up
+        del self.data[key]
+        return None
+
+
+class TestSingleFlight(TestCase):
+
+    KEY = "single-flight:product_pricing_features:{}"
+
+    def setUp(self):
+        self.redis = FakeLockRedis()
+        patcher = patch.object(singleflight, "get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_duplicate_triggers_return_the_run_in_flight(self, mock_apply):
+        first = self.client.post("/api/task/background-product-etl", {},
+                                 content_type="application/json").json()
+        job = JobRun.objects.create(job_type="JOB_MANUAL_ETL", job_status="RUNNING",
+                                    celery_task_id=first["task_id"])
+
+        for _ in range(4):
+            again = self.client.post("/api/task/background-product-etl", {},
+                                     content_type="application/json").json()
+            self.assertEqual(again, {"task_id": first["task_id"], "coalesced": True,
+                                     "job_run_id": job.id, "follow_up_task_id": None})
+        mock_apply.assert_called_once()
+        self.assertFalse(first["coalesced"])
+
+        # task_manager's trigger shares the flight
+        body = self.client.post("/api/task/product-etl/").json()
+        self.assertEqual(body["task_id"], first["task_id"])
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_task_manager_trigger_parses_mode_and_chunk_size(self, mock_apply):
+        full = self.client.post("/api/task/product-etl/", {"mode": "FULL", "chunk_size": 500},
+                                content_type="application/json").json()
+        self.assertFalse(full["coalesced"])
+        self.assertEqual(mock_apply.call_args.kwargs["kwargs"],
+                         {"manual": True, "chunk_size": 500, "mode": "FULL"})
+
+        for data in ({"mode": "DELTA"}, {"chunk_size": 0}):
+            response = self.client.post("/api/task/product-etl/", data,
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+        mock_apply.assert_called_once()
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_runs_of_either_mode_share_the_flight(self, mock_apply):
+        incremental = self.client.post("/api/task/product-etl/").json()
+        full = self.client.post("/api/task/background-product-etl", {"mode": "FULL"},
+                                content_type="application/json").json()
+
+        self.assertTrue(full["coalesced"])
+        self.assertEqual(full["task_id"], incremental["task_id"])
+        mock_apply.assert_called_once()
+        # a beat FULL run started meanwhile is turned away as well
+        self.assertEqual(nightly_product_etl.apply(kwargs={"mode": "FULL"}).get(),
+                         {"coalesced_with": incremental["task_id"]})
+
+    def test_failed_publish_releases_the_key(self):
+        with patch.object(background_product_etl, "apply_async",
+                          side_effect=admission.OperationalError("broker down")):
+            with self.assertRaises(admission.OperationalError):
+                singleflight.trigger(background_product_etl, self.KEY, {})
+        self.assertNotIn(self.KEY, self.redis.data)
+
+        with patch.object(background_product_etl, "apply_async") as mock_apply:
+            self.assertTrue(singleflight.trigger(background_product_etl, self.KEY, {}).started)
+        mock_apply.assert_called_once()
+
+    @patch("task_manager.singleflight.current_app.send_task")
+    @patch("pricing.views.background_product_etl.apply_async")
+    def test_exactly_one_follow_up_runs_after_landing(self, mock_apply, mock_send):
+        flight = singleflight.trigger(background_product_etl, self.KEY, {})
+        follow_ups = {singleflight.trigger(background_product_etl, self.KEY, {"chunk_size": n},
+                                           follow_up=True).follow_up_id
+                      for n in (1, 2, 3)}
+        self.assertEqual(len(follow_ups), 1)
+        follow_up_id = follow_ups.pop()
+
+        self.assertEqual(singleflight.land(self.KEY, flight.task_id), follow_up_id)
+        mock_send.assert_called_once_with(
+            "pricing.tasks.background_product_etl", kwargs={"chunk_size": 1},
+            task_id=follow_up_id)
+        # the follow-up owns the flight when it starts ...
+        self.assertIsNone(singleflight.claim(self.KEY, follow_up_id))
+        # ... and releases it when done
+        self.assertIsNone(singleflight.land(self.KEY, follow_up_id))
+        self.assertEqual(self.redis.data, {})
+
+    def test_scheduled_run_is_skipped_while_another_is_in_flight(self):
+        self.redis.set(self.KEY, "manual-run")
+        result = nightly_product_etl.apply().get()
+        self.assertEqual(result, {"coalesced_with": "manual-run"})
+        self.assertFalse(JobRun.objects.exists())
+
+    def test_failed_run_releases_the_flight(self):
+        with patch("pricing.tasks.run_product_etl", side_effect=RuntimeError("boom")):
+            background_product_etl.apply(task_id="run-1")
+        self.assertEqual(self.redis.data, {})
+        self.assertEqual(JobRun.objects.get().job_status, "FAILED")
+
+    def test_redis_errors_fail_open(self):
+        self.redis.set = MagicMock(side_effect=events.redis.ConnectionError)
+        with self.assertLogs("task_manager.singleflight", "WARNING"):
+            self.assertIsNone(singleflight.claim(self.KEY, "run-1"))
+
+
+@override_settings(TASK_QUEUE_ADMISSION={
+    "etl": {"max_depth": 3, "seconds_per_task": 60},
+    "interactive": {"max_depth": 100, "seconds_per_task": 2},
+})
+class TestAdmissionControl(TestCase):
+
+    def test_tasks_are_routed_per_workload_class(self):
+        self.assertEqual(admission.task_queue(test_task), "interactive")
+        self.assertEqual(admission.task_queue(nightly_product_etl), "etl")
+        self.assertEqual(admission.task_queue(detect_price_anomalies_job), "ml")
+        self.assertEqual(admission.task_queue(rollup_job_stats), "celery")
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    @patch.object(admission, "queue_depth", return_value=2)
+    def test_admits_below_the_limit(self, mock_depth, mock_apply):
+        response = self.client.post("/api/task/background-product-etl", {},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        mock_depth.assert_called_once_with("etl")
+        mock_apply.assert_called_once()
+
+    @patch("pricing.views.background_product_etl.apply_async")
+    @patch.object(admission, "queue_depth", return_value=5)
+    def test_full_queue_is_rejected_with_retry_after(self, mock_depth, mock_apply):
+        for url in ("/api/task/background-product-etl", "/api/task/product-etl/"):
+            response = self.client.post(url, {}, content_type="application/json")
+            self.assertEqual(response.status_code, 429)
+            # 3 tasks have to drain before there is room for one more
+            self.assertEqual(response["Retry-After"], "180")
+            self.assertEqual(response.json()["queue_depth"], 5)
+        mock_apply.assert_not_called()
+
+    @patch("pricing.views.test_task.delay")
+    @patch.object(admission, "queue_depth", side_effect=admission.OperationalError("down"))
+    def test_unreachable_broker_is_unavailable(self, mock_depth, mock_delay):
+        with self.assertLogs("task_manager.admission", "WARNING"):
+            response = self.client.post("/api/task", {"duration": 1},
+                                        content_type="application/json")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], str(admission.BROKER_RETRY_AFTER))
+        mock_delay.assert_not_called()
+
+    @patch.object(admission, "queue_depth")
+    def test_queues_without_limits_are_not_checked(self, mock_depth):
+        self.assertIsNone(admission.check_admission(detect_price_anomalies_job))
+        mock_depth.assert_not_called()
+
+    @patch("task_manager.views.test_task.delay")
+    @patch.object(admission, "queue_depth", return_value=0)
+    def test_test_task_duration_is_bounded(self, mock_depth, mock_delay):
+        for duration in (-1, 10 ** 6, "soon"):
+            for url in ("/api/task", "/api/task/test/"):
+                response = self.client.post(url, {"duration": duration},
+                                            content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+        mock_delay.assert_not_called()
+
+        mock_delay.return_value.id = "task-1"
+        response = self.client.post("/api/task/test/", {"duration": 2},
+                                    content_type="application/json")
+        self.assertEqual(response.json(), {"task_id": "task-1"})
+        mock_delay.assert_called_once_with(2.0)
@@ -0,0 +1,64 @@
+"""
+Request parsing and response bodies shared by the task trigger endpoints.
+
+The enqueue endpoints exist twice, as function views in ``pricing.views``
+and as class-based views in ``task_manager.views``; both validate their
+input and answer admission rejections and single-flight triggers with the
+helpers here, so the two APIs cannot drift apart.
+"""
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from pricing.etl import DEFAULT_CHUNK_SIZE
+from pricing.models import JobRun
+
+
+def test_task_duration(value) -> float:
+    """Validated ``duration`` of a test_task request."""
+    duration = float(value)
+    if not 0 <= duration <= settings.MAX_TEST_TASK_DURATION:
+        raise ValueError
+    return duration
+
+
+def product_etl_options(data) -> tuple:
+    """
+    Validated ``(chunk_size, mode)`` of a product ETL trigger request.
+
+    Raises:
+        ValueError: the message for the client
+    """
+    try:
+        chunk_size = int(data.get("chunk_size", DEFAULT_CHUNK_SIZE))
+        if chunk_size <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("chunk_size must be a positive integer") from None
+
+    mode = data.get("mode", "INCREMENTAL")
+    if mode not in dict(JobRun.ETL_MODES):
+        raise ValueError(f"mode must be one of {list(dict(JobRun.ETL_MODES))}")
+    return chunk_size, mode
+
+
+def rejection_response(rejection) -> Response:
+    """429/503 of an enqueue request turned away by admission control."""
+    if rejection.status == status.HTTP_429_TOO_MANY_REQUESTS:
+        body = {"error": f"Queue {rejection.queue} is full, retry later",
+                "queue": rejection.queue, "queue_depth": rejection.depth}
+    else:
+        body = {"error": "Task queue unavailable, retry later", "queue": rejection.queue}
+    return Response(body, status=rejection.status,
+                    headers={"Retry-After": str(rejection.retry_after)})
+
+
+def flight_response(flight) -> dict:
+    """Response body of an ETL trigger: the run in flight, new or coalesced."""
+    body = {"task_id": flight.task_id, "coalesced": not flight.started}
+    if not flight.started:
+        job = JobRun.objects.filter(celery_task_id=flight.task_id).only("id").first()
+        body["job_run_id"] = job.id if job else None
+        body["follow_up_task_id"] = flight.follow_up_id
+    return body
@@ -1,18 +1,38 @@
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from celery.result import AsyncResult
 
-from .models import TaskRun
-from .serializers import TaskRunSerializer
-from .tasks import test_task, background_product_etl
+from pricing.conditional import Validators, latest
+from pricing.pagination import filter_jobs, keyset_page, parse_limit
+from pricing.renderers import FAST_RENDERERS
+from pricing.tasks import PRODUCT_ETL_FLIGHT_KEY, test_task, background_product_etl
+
+from .admission import check_admission
+from .models import Job
+from .serializers import TASK_RUN_VALUES, TaskRunSerializer
+from .singleflight import trigger
+from .triggers import (
+    flight_response, product_etl_options, rejection_response, test_task_duration,
+)
 
 
 class TaskManagerTestTask(APIView):
     """POST: Run a test task with optional duration parameter."""
 
     def post(self, request):
-        duration = request.data.get('duration', 5)
+        try:
+            duration = test_task_duration(request.data.get('duration', 5))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": f"duration must be between 0 and {settings.MAX_TEST_TASK_DURATION} seconds"},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        rejection = check_admission(test_task)
+        if rejection:
+            return rejection_response(rejection)
         task = test_task.delay(duration)
         return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
 
@@ -31,26 +51,55 @@ class TaskManagerTaskStatus(APIView):
 
 
 class TaskManagerProductEtl(APIView):
-    """POST: Trigger the background product ETL task."""
+    """POST: Trigger the background product ETL task (chunk_size, mode, follow_up)."""
 
     def post(self, request):
-        task = background_product_etl.delay(manual=True)
-        return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+        try:
+            chunk_size, mode = product_etl_options(request.data)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rejection = check_admission(background_product_etl)
+        if rejection:
+            return rejection_response(rejection)
+        # A run in flight, of either mode, is returned instead of starting another
+        flight = trigger(background_product_etl, PRODUCT_ETL_FLIGHT_KEY,
+                         {"manual": True, "chunk_size": chunk_size, "mode": mode},
+                         follow_up=bool(request.data.get("follow_up", False)))
+        return Response(flight_response(flight), status=status.HTTP_202_ACCEPTED)
 
 
 class TaskManagerRunList(APIView):
-    """GET: List the most recent task runs."""
+    """
+    GET: List task runs newest first, filtered and keyset paginated. Pages
+    carry an ETag; an If-None-Match that still matches gets a 304.
+    """
+    renderer_classes = FAST_RENDERERS
 
     def get(self, request):
-        runs = TaskRun.objects.order_by("-created_at")[:50]
-        return Response(TaskRunSerializer(runs, many=True).data)
+        params = request.query_params
+        try:
+            limit = parse_limit(params.get("limit"))
+            runs = filter_jobs(Job.objects.all(), params)
+            page, next_cursor = keyset_page(runs, params.get("cursor"), limit,
+                                            serialize=TASK_RUN_VALUES.serialize)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        validators = Validators.of(
+            request, [(run["id"], run["updated_at"]) for run in page], next_cursor,
+            last_modified=latest(*(parse_datetime(run["updated_at"]) for run in page)))
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+        return validators.apply(Response({"results": page, "next_cursor": next_cursor}))
 
 
 class TaskManagerRunLatest(APIView):
     """GET: Get the most recent task run."""
 
     def get(self, request):
-        run = TaskRun.objects.order_by("-created_at").first()
+        run = Job.objects.order_by("-created_at", "-id").first()
         if not run:
             return Response(None)
         return Response(TaskRunSerializer(run).data)
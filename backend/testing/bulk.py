@@ -0,0 +1,131 @@
+"""
+Bulk creation and update of products.
+
+A request carries thousands of products, so they are validated column by
+column with pandas instead of one serializer (and one INSERT) per product.
+The checks mirror the model and its ``price_gt_zero`` / ``stock_count_gt_zero``
+constraints, so a batch that passes validation never fails in the database.
+Valid batches are written with ``bulk_create`` / ``bulk_update`` in
+``batch_size`` statements inside one transaction: either every product is
+written or none is.
+
+Usage:
+    products, errors = validate_products(rows, upsert=True)
+    if not errors:
+        counts = write_products(products, upsert=True)
+"""
+
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+from django.db import transaction
+
+from .models import Product
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10_000
+# Products one request may carry
+MAX_PRODUCTS = 50_000
+
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+# DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = 10 ** 8
+MAX_STOCK_COUNT = 2 ** 31 - 1
+
+
+def _invalid(ok: pd.Series) -> list:
+    return ok.index[~ok.fillna(False).astype(bool)].tolist()
+
+
+def _numbers(values: pd.Series) -> pd.Series:
+    """``values`` as numbers, NaN where not numeric; booleans are not numbers."""
+    values = values.astype(object)
+    return pd.to_numeric(values.mask(values.map(lambda value: isinstance(value, bool))),
+                         errors="coerce")
+
+
+def _has_cents_at_most(value) -> bool:
+    # exact: a float tolerance would let 1000.004 through and round it later
+    try:
+        return Decimal(str(value)).normalize().as_tuple().exponent >= -2
+    except (InvalidOperation, TypeError):
+        return False
+
+
+def validate_products(rows: list, upsert: bool = False) -> tuple:
+    """
+    Check ``rows`` (dicts with name, price and stock_count) all at once.
+
+    Returns:
+        ``(products, errors)``: a frame of the cleaned name / price /
+        stock_count, and ``[{"index": i, field: [message]}, ...]`` for the
+        invalid rows, in row order
+    """
+    is_object = pd.Series([isinstance(row, dict) for row in rows], dtype=bool)
+    df = pd.DataFrame.from_records(
+        [row if isinstance(row, dict) else {} for row in rows],
+        columns=["name", "price", "stock_count"])
+
+    names = df["name"].astype(object)
+    names = names.where(names.map(lambda value: isinstance(value, str))).str.strip()
+    price = _numbers(df["price"])
+    stock = _numbers(df["stock_count"])
+
+    checks = [
+        ("name", names.str.len().between(1, NAME_MAX_LENGTH),
+         f"must be a non-empty string of at most {NAME_MAX_LENGTH} characters"),
+        ("price", price.gt(0) & price.lt(MAX_PRICE)
+         & df["price"].map(_has_cents_at_most).astype(bool),
+         f"must be greater than 0 and below {MAX_PRICE}, with at most 2 decimals"),
+        ("stock_count", stock.between(1, MAX_STOCK_COUNT) & stock.eq(stock.round()),
+         "must be a positive integer"),
+    ]
+    if upsert:
+        checks.append(("name", ~(names.notna() & names.duplicated(keep="first")),
+                       "appears more than once in this request"))
+
+    errors = {index: {"index": index, "non_field_errors": ["must be an object"]}
+              for index in _invalid(is_object)}
+    for field, ok, message in checks:
+        for index in _invalid(ok | ~is_object):
+            errors.setdefault(index, {"index": index}).setdefault(field, []).append(message)
+
+    products = pd.DataFrame({"name": names, "price": price, "stock_count": stock})
+    return products, [errors[index] for index in sorted(errors)]
+
+
+def _product(row, pk=None) -> Product:
+    return Product(id=pk, name=row.name, price=Decimal(f"{row.price:.2f}"),
+                   stock_count=int(row.stock_count))
+
+
+def write_products(products: pd.DataFrame, upsert: bool = False,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Insert the validated ``products``; with ``upsert``, products whose name
+    exists already (the oldest of that name, if several) are updated instead.
+
+    Returns:
+        ``{"created": n, "updated": m}``
+    """
+    with transaction.atomic():
+        existing = {}
+        if upsert:
+            names = products["name"].tolist()
+            for start in range(0, len(names), batch_size):
+                # the lowest id is written last and wins
+                existing.update(
+                    Product.objects.filter(name__in=names[start:start + batch_size])
+                    .order_by("-id").values_list("name", "id"))
+
+        new, changed = [], []
+        for row in products.itertuples(index=False):
+            pk = existing.get(row.name)
+            if pk is None:
+                new.append(_product(row))
+            else:
+                changed.append(_product(row, pk))
+
+        Product.objects.bulk_create(new, batch_size=batch_size)
+        Product.objects.bulk_update(changed, ["price", "stock_count"], batch_size=batch_size)
+    return {"created": len(new), "updated": len(changed)}
@@ -0,0 +1,91 @@
+from decimal import Decimal
+from unittest.mock import ANY, patch
+
+from django.test import TestCase
+from testing.models import Product
+
+
+class TestTestingProductBulkView(TestCase):
+
+    URL = '/testing/products/bulk/'
+
+    def post(self, **data):
+        return self.client.post(self.URL, data=data, content_type='application/json')
+
+    def test_creates_all_products_in_batches(self):
+        products = [{"name": f"Product {i}", "price": f"{i}.50", "stock_count": i}
+                    for i in range(1, 26)]
+        with patch.object(Product.objects, "bulk_create",
+                          wraps=Product.objects.bulk_create) as bulk_create, \
+                self.assertNumQueries(5):  # savepoint, 3 INSERTs of <= 10, release
+            response = self.post(products=products, batch_size=10)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"created": 25, "updated": 0})
+        bulk_create.assert_called_once()
+        self.assertEqual(Product.objects.get(name="Product 7").price, Decimal("7.50"))
+
+    def test_reports_every_invalid_row_and_writes_nothing(self):
+        response = self.post(products=[
+            {"name": "Fine", "price": 10, "stock_count": 1},
+            {"name": "", "price": "-50.00", "stock_count": 5},
+            {"name": "Cheap", "price": 9.999, "stock_count": 0},
+            "not a product",
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [
+            {"index": 1, "name": [ANY], "price": [ANY]},
+            {"index": 2, "price": [ANY], "stock_count": ["must be a positive integer"]},
+            {"index": 3, "non_field_errors": ["must be an object"]},
+        ])
+        self.assertFalse(Product.objects.exists())
+
+    def test_rejects_sub_cent_prices_of_any_size(self):
+        response = self.post(products=[
+            {"name": "Big", "price": 1000.004, "stock_count": 1},
+            {"name": "Bigger", "price": "123456.789", "stock_count": 1},
+            {"name": "Exact", "price": "123456.780", "stock_count": 1},
+            {"name": "Float", "price": 19.99, "stock_count": 1},
+        ])
+
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [0, 1])
+        self.assertFalse(Product.objects.exists())
+
+    def test_rejects_booleans(self):
+        response = self.post(products=[
+            {"name": "Price", "price": True, "stock_count": 1},
+            {"name": "Stock", "price": 5, "stock_count": True},
+        ])
+
+        self.assertEqual(response.json()["errors"], [
+            {"index": 0, "price": [ANY]},
+            {"index": 1, "stock_count": ["must be a positive integer"]},
+        ])
+
+    def test_upsert_updates_by_name(self):
+        old = Product.objects.create(name="Mouse", price=10, stock_count=1)
+        response = self.post(mode="upsert", products=[
+            {"name": "Mouse", "price": 12, "stock_count": 7},
+            {"name": "Monitor", "price": 150, "stock_count": 2},
+        ])
+
+        self.assertEqual(response.json(), {"created": 1, "updated": 1})
+        old.refresh_from_db()
+        self.assertEqual((old.price, old.stock_count), (Decimal("12.00"), 7))
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_upsert_rejects_duplicate_names(self):
+        response = self.post(mode="upsert", products=[
+            {"name": "Mouse", "price": 12, "stock_count": 7},
+            {"name": " Mouse ", "price": 13, "stock_count": 7},
+        ])
+        self.assertEqual(response.json()["errors"],
+                         [{"index": 1, "name": ["appears more than once in this request"]}])
+
+    def test_rejects_bad_requests(self):
+        product = {"name": "Mouse", "price": 12, "stock_count": 7}
+        for data in ({"products": []}, {"products": product},
+                     {"products": [product], "mode": "merge"},
+                     {"products": [product], "batch_size": 0}):
+            self.assertEqual(self.post(**data).status_code, 400)
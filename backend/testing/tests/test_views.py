@@ -1,3 +1,6 @@
+import csv
+import json
+
 from django.forms import ValidationError
 from django.test import TestCase, SimpleTestCase
 from django.urls import reverse
@@ -41,14 +44,64 @@ class TestTestingProductView(TestCase):
                 "price": "150.00",
             }
         ]
-        self.assertEqual(response.json(), expected_data)
+        self.assertEqual(response.json(), {"results": expected_data, "next_cursor": None})
 
     def test_testing_product_view_no_products(self):
         # Delete all products to test empty response
         Product.objects.all().delete()
         response = self.client.get('/testing/products/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), [])
+        self.assertEqual(response.json(), {"results": [], "next_cursor": None})
+
+    def test_testing_product_view_pages_by_id(self):
+        product3 = Product.objects.create(name="Product 3", price=5, stock_count=1)
+        first = self.client.get('/testing/products/', {"limit": 2}).json()
+        self.assertEqual([p["id"] for p in first["results"]],
+                         [self.product1.id, self.product2.id])
+        self.assertEqual(first["next_cursor"], str(self.product2.id))
+
+        second = self.client.get(
+            '/testing/products/', {"limit": 2, "cursor": first["next_cursor"]}).json()
+        self.assertEqual(second, {"results": [{"id": product3.id, "name": "Product 3",
+                                               "price": "5.00"}],
+                                  "next_cursor": None})
+
+    def test_testing_product_view_conditional_get(self):
+        response = self.client.get('/testing/products/')
+        cached = self.client.get('/testing/products/', HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        self.product2.price = 175
+        self.product2.save()
+        changed = self.client.get('/testing/products/', HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+
+    def test_testing_product_view_rejects_bad_paging(self):
+        for params in ({"limit": "0"}, {"cursor": "abc"}, {"stream": "xml"}):
+            response = self.client.get('/testing/products/', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_testing_product_view_streams_jsonl(self):
+        with patch("testing.views.STREAM_CHUNK_SIZE", 1):
+            response = self.client.get('/testing/products/', {"stream": "jsonl"})
+            # one keyset page per product, and the empty page after them
+            with self.assertNumQueries(3):
+                lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line) for line in lines], [
+            {"id": self.product1.id, "name": "Product 1", "price": "100.00"},
+            {"id": self.product2.id, "name": "Product 2", "price": "150.00"},
+        ])
+
+    def test_testing_product_view_streams_csv(self):
+        response = self.client.get('/testing/products/', {"stream": "csv"})
+        self.assertIn('filename="products.csv"', response["Content-Disposition"])
+        rows = list(csv.reader(
+            b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows, [["id", "name", "price"],
+                                [str(self.product1.id), "Product 1", "100.00"],
+                                [str(self.product2.id), "Product 2", "150.00"]])
 
     def test_testing_product_view_post_valid_data(self):
         valid_data = {
@@ -1,5 +1,6 @@
 from django.urls import path
 from .views import (
+    TestingProductBulkView,
     TestingProductView,
     TestingThirdPartyView,
     TestingUserProfileView,
@@ -11,6 +12,8 @@ urlpatterns = [
     path("testing/", TestingView.as_view(), name="testing-view"),
     path("testing/products/", TestingProductView.as_view(),
          name="testing-product-view"),
+    path("testing/products/bulk/", TestingProductBulkView.as_view(),
+         name="testing-product-bulk-view"),
     path("testing/users/", TestingUserProfileView.as_view(),
          name="testing-user-profile-view"),
     path("testing/users/login/", TestingUserLoginView.as_view(),
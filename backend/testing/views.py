@@ -1,10 +1,21 @@
-from django.http import JsonResponse
+import csv
+import json
+
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .serializers import TestingProductSerializer, TestingProductsCreateSerializer, TestingUserSerializer
 from .models import Product, User
 from rest_framework.permissions import IsAuthenticated
+from pricing.conditional import Validators
+from pricing.pagination import parse_limit
+from pricing.renderers import FAST_RENDERERS
+from pricing.value_serializers import ValuesSerializer
+from .bulk import (
+    DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, MAX_PRODUCTS, validate_products,
+    write_products,
+)
 from requests.exceptions import Timeout, RequestException
 import requests
 
@@ -18,15 +29,105 @@ class TestingView(APIView):
         return Response({"message": "Testing app is working!"})
 
 
+# Rows fetched from the database per query when streaming the catalog
+STREAM_CHUNK_SIZE = 2000
+STREAM_FIELDS = TestingProductSerializer.Meta.fields
+# TestingProductSerializer's output for the product pages, built from value rows
+PRODUCT_VALUES = ValuesSerializer(Product, STREAM_FIELDS)
+STREAM_FORMATS = {
+    "jsonl": ("application/x-ndjson", "products.jsonl"),
+    "csv": ("text/csv", "products.csv"),
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def product_page(after: int, limit: int) -> list:
+    """
+    Serialized products with an id above ``after``, at most ``limit``, in id
+    order. id is the primary key: every page is one index range scan.
+    """
+    return PRODUCT_VALUES.serialize(
+        Product.objects.filter(id__gt=after).order_by("id")[:limit])
+
+
+def stream_products(fmt: str):
+    """
+    Yield every product as a JSON line or CSV row, id order.
+
+    The catalog is read in keyset pages of STREAM_CHUNK_SIZE rows, one query
+    each, so memory stays flat for any catalog. (``.iterator()`` would not
+    do: mysqlclient buffers the whole result set on the client.)
+    """
+    def rows():
+        after = 0
+        while True:
+            page = product_page(after, STREAM_CHUNK_SIZE)
+            yield from page
+            if len(page) < STREAM_CHUNK_SIZE:
+                return
+            after = page[-1]["id"]
+
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(STREAM_FIELDS)
+        for row in rows():
+            yield writer.writerow([row[field] for field in STREAM_FIELDS])
+    else:
+        for row in rows():
+            yield json.dumps(row) + "\n"
+
+
 class TestingProductView(APIView):
     """
     A simple view to test product-related functionality.
     """
+    renderer_classes = FAST_RENDERERS
 
     def get(self, request):
-        products = Product.objects.all()
-        serializer = TestingProductSerializer(products, many=True)
-        return Response(serializer.data)
+        """
+        Products in id order, one page at a time: ``limit`` (default 50, max
+        500) and the ``next_cursor`` of the previous page as ``cursor``.
+        With ``stream=jsonl`` or ``stream=csv`` the whole catalog is
+        streamed instead. Pages carry an ETag; an ``If-None-Match`` that
+        still matches gets a 304.
+        """
+        fmt = request.query_params.get("stream")
+        if fmt:
+            if fmt not in STREAM_FORMATS:
+                return Response({"error": f"stream must be one of {list(STREAM_FORMATS)}"},
+                                status=400)
+            content_type, filename = STREAM_FORMATS[fmt]
+            response = StreamingHttpResponse(stream_products(fmt), content_type=content_type)
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        try:
+            limit = parse_limit(request.query_params.get("limit"))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+        cursor = request.query_params.get("cursor") or "0"
+        if not cursor.isdigit():
+            return Response({"error": "cursor must be a product id"}, status=400)
+
+        products = product_page(int(cursor), limit + 1)
+        next_cursor = str(products[limit - 1]["id"]) if len(products) > limit else None
+        products = products[:limit]
+
+        # Products have no update time, so (min id, max id, count) of the page
+        # would miss an edited price or name: the page's own columns are its
+        # only sound validator. They are the rows the page reads anyway, and
+        # hashing at most MAX_PAGE_SIZE of them is cheap next to rendering.
+        validators = Validators.of(request, products, next_cursor)
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+        return validators.apply(Response({"results": products, "next_cursor": next_cursor}))
 
     def post(self, request):
         serializer = TestingProductsCreateSerializer(data=request.data)
@@ -36,6 +137,44 @@ class TestingProductView(APIView):
         return Response(serializer.errors, status=400)
 
 
+class TestingProductBulkView(APIView):
+    """
+    Create (or upsert by name) many products in one request.
+    """
+
+    def post(self, request):
+        """
+        Body: ``{"products": [{"name", "price", "stock_count"}, ...],
+        "mode": "create" | "upsert", "batch_size": 1000}``. Nothing is written
+        unless every product is valid; otherwise the per-row errors are
+        returned.
+        """
+        rows = request.data.get("products")
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "products must be a non-empty list"}, status=400)
+        if len(rows) > MAX_PRODUCTS:
+            return Response({"error": f"at most {MAX_PRODUCTS} products per request"},
+                            status=400)
+
+        mode = request.data.get("mode", "create")
+        if mode not in ("create", "upsert"):
+            return Response({"error": "mode must be 'create' or 'upsert'"}, status=400)
+        try:
+            batch_size = int(request.data.get("batch_size", DEFAULT_BATCH_SIZE))
+            if not 0 < batch_size <= MAX_BATCH_SIZE:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": f"batch_size must be an integer between 1 and {MAX_BATCH_SIZE}"},
+                status=400)
+
+        products, errors = validate_products(rows, upsert=mode == "upsert")
+        if errors:
+            return Response({"errors": errors}, status=400)
+        counts = write_products(products, upsert=mode == "upsert", batch_size=batch_size)
+        return Response(counts, status=201)
+
+
 class TestingUserProfileView(APIView):
     """
     A simple view to test user-related functionality.